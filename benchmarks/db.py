@@ -0,0 +1,192 @@
+# benchmarks/db.py
+"""
+数据库访问基准测试（SQLite）
+
+在临时 SQLite 文件上比较:
+    statements - 注册检查、添加持仓、修改持仓每次操作执行的 SQL 语句数与耗时
+                 （旧: 用户名/邮箱两次查询、commit 后 refresh；新: 一次 or_ 查询、expire_on_commit=False 不 refresh）
+    pool       - 并发请求在两次查询之间有一段慢操作（模拟密码哈希、请求上游）时，
+                 一直持有连接与查询后归还连接（read_and_release）两种方式的耗时与取连接等待；连接池越小差别越明显
+
+用法（在项目根目录执行）:
+    python -m benchmarks.db
+    python -m benchmarks.db --ops 500 --requests 200 --concurrency 16 --pool-size 4 --work-ms 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.run import percentile
+
+
+class StatementCounter:
+    """统计引擎执行的 SQL 语句数"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def bench_statements(engine, ops: int) -> List[Dict]:
+    """各写入/查询方式每次操作的语句数与平均耗时"""
+    from sqlalchemy.orm import sessionmaker
+    from crud import user as user_crud
+    import schemas
+
+    old_session = sessionmaker(autoflush=False, bind=engine)
+    new_session = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+    counter = StatementCounter(engine)
+
+    def register_check_old(db, i):
+        user_crud.get_user_by_username(db, f"user{i}")
+        user_crud.get_user_by_email(db, f"user{i}@example.com")
+
+    def register_check_new(db, i):
+        user_crud.get_users_by_username_or_email(db, f"user{i}", f"user{i}@example.com")
+
+    def fund(i, shares=100):
+        return schemas.FundCreate(fund_code=f"{i % 1000:06d}", fund_name="基准基金", cost_price=1.0, shares=shares)
+
+    def create_fund_old(db, i):
+        db.refresh(user_crud.create_user_fund(db, fund(i), user_id=1))
+
+    def create_fund_new(db, i):
+        user_crud.create_user_fund(db, fund(i), user_id=1)
+
+    def update_fund_old(db, i):
+        db_fund = user_crud.update_user_fund(db, i % ops + 1, fund(i, shares=200), user_id=1)
+        db.refresh(db_fund)
+
+    def update_fund_new(db, i):
+        user_crud.update_user_fund(db, i % ops + 1, fund(i, shares=300), user_id=1)
+
+    scenarios = [
+        ("注册检查（两次查询）", old_session, register_check_old),
+        ("注册检查（一次 or_ 查询）", new_session, register_check_new),
+        ("添加持仓（commit + refresh）", old_session, create_fund_old),
+        ("添加持仓（不 refresh）", new_session, create_fund_new),
+        ("修改持仓（commit + refresh）", old_session, update_fund_old),
+        ("修改持仓（不 refresh）", new_session, update_fund_new),
+    ]
+    results = []
+    for name, session_factory, operation in scenarios:
+        counter.count = 0
+        start = time.perf_counter()
+        for i in range(ops):
+            db = session_factory()
+            try:
+                operation(db, i)
+            finally:
+                db.close()
+        elapsed = time.perf_counter() - start
+        results.append({
+            "scenario": name,
+            "statements_per_op": round(counter.count / ops, 2),
+            "mean_ms": round(elapsed / ops * 1000, 3),
+        })
+    return results
+
+
+def bench_pool(engine, requests: int, concurrency: int, work_ms: float) -> List[Dict]:
+    """并发请求：查询 -> 慢操作 -> 查询，比较持有连接与查询后归还连接"""
+    from sqlalchemy.orm import sessionmaker
+    from core.database import read_and_release
+    from core.db_pool import pool_stats
+    from crud import user as user_crud
+
+    session_factory = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+
+    def request(release: bool) -> float:
+        start = time.perf_counter()
+        db = session_factory()
+        try:
+            if release:
+                user = read_and_release(db, user_crud.get_user_by_username, "bench")
+            else:
+                user = user_crud.get_user_by_username(db, "bench")
+            time.sleep(work_ms / 1000)
+            user_crud.get_user_funds(db, user.id)
+        finally:
+            db.close()
+        return (time.perf_counter() - start) * 1000
+
+    results = []
+    for name, release in (("持有连接", False), ("查询后归还连接", True)):
+        before = dict(pool_stats)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(lambda _: request(release), range(requests)))
+        elapsed = time.perf_counter() - start
+        results.append({
+            "scenario": name,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "rps": round(requests / elapsed, 2),
+            "checkouts": pool_stats["checkouts"] - before["checkouts"],
+            "waits": pool_stats["waits"] - before["waits"],
+            "wait_ms_total": round(pool_stats["wait_ms_total"] - before["wait_ms_total"], 2),
+        })
+    return results
+
+
+def _print_table(rows: List[Dict]):
+    columns = list(rows[0])
+    print("  ".join(f"{column:>14}" if i else f"{column:<32}" for i, column in enumerate(columns)))
+    for row in rows:
+        print("  ".join(f"{row[column]:>14}" if i else f"{row[column]:<32}" for i, column in enumerate(columns)))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库访问基准测试（SQLite）")
+    parser.add_argument("--ops", type=int, default=300, help="语句数对比中每种操作的执行次数")
+    parser.add_argument("--requests", type=int, default=200, help="连接池对比的请求数")
+    parser.add_argument("--concurrency", type=int, default=16, help="连接池对比的并发数")
+    parser.add_argument("--pool-size", type=int, default=4, help="连接池大小（不允许溢出）")
+    parser.add_argument("--work-ms", type=float, default=20.0, help="两次查询之间慢操作的耗时")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fund_db_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from core.db_pool import TimedQueuePool, install_pool_listeners
+    from crud import user as user_crud
+    from models import base as models
+    from models.user import UserFund
+    import schemas
+
+    engine = create_engine(os.environ["DATABASE_URL"], poolclass=TimedQueuePool, pool_size=args.pool_size,
+                           max_overflow=0, pool_timeout=60)
+    install_pool_listeners(engine)
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        user = user_crud.create_user(db, schemas.UserCreate(
+            username="bench", email="bench@example.com", password="bench-password"), hashed_password="x")
+        db.add_all(UserFund(user_id=user.id, fund_code=f"{i:06d}", cost_price=1.0, shares=100) for i in range(20))
+        db.commit()
+
+    print(f"SQLite: {workdir}/bench.db, 连接池 {args.pool_size}, 并发 {args.concurrency}, 慢操作 {args.work_ms}ms\n")
+    _print_table(bench_statements(engine, args.ops))
+    _print_table(bench_pool(engine, args.requests, args.concurrency, args.work_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+jsonpgz({"fundcode":"000001","name":"华夏成长混合","jzrq":"2026-01-09","dwjz":"1.2340","gsz":"1.2411","gszzl":"0.58","gztime":"2026-01-12 15:00"});
@@ -0,0 +1 @@
+var apidata={ content:"<table class='w782 comm lsjz'><thead><tr><th class='first'>净值日期</th><th>单位净值</th><th>累计净值</th><th>日增长率</th><th>申购状态</th><th>赎回状态</th><th class='tor last'>分红送配</th></tr></thead><tbody><tr><td>2026-01-09</td><td class='tor bold'>1.2340</td><td class='tor bold'>3.5670</td><td class='tor bold grn'>-0.32%</td><td>开放申购</td><td>开放赎回</td><td class='red unbold'></td></tr><tr><td>2026-01-08</td><td class='tor bold'>1.2380</td><td class='tor bold'>3.5710</td><td class='tor bold red'>0.57%</td><td>开放申购</td><td>开放赎回</td><td class='red unbold'></td></tr></tbody></table>",records:2,pages:1,curpage:1};
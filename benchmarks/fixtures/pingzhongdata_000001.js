@@ -0,0 +1 @@
+/*2026-01-09 21:00:12*/var ishb=false;/*基金或股票信息*/var fS_name = "华夏成长混合";var fS_code = "000001";/*原费率*/var fund_sourceRate="1.50";/*现费率*/var fund_Rate="0.15";/*最小申购金额*/var fund_minsg="10";/*单位净值走势 equityReturn-净值回报 unitMoney-每万份收益*/var Data_netWorthTrend = [{"x":1767715200000,"y":1.2310,"equityReturn":0.41,"unitMoney":""},{"x":1767801600000,"y":1.2380,"equityReturn":0.57,"unitMoney":""},{"x":1767888000000,"y":1.2340,"equityReturn":-0.32,"unitMoney":""}];/*累计净值走势*/var Data_ACWorthTrend = [[1767715200000,3.5600],[1767801600000,3.5710],[1767888000000,3.5670]];
@@ -0,0 +1,103 @@
+# benchmarks/importtime.py
+"""
+导入耗时剖析
+
+在干净的子进程中以 `python -X importtime -c "import main"` 导入应用，
+统计总导入耗时和累计耗时最多的模块，并检查启动路径上不应出现的重量级依赖
+（aiohttp、bs4、lxml 应在首次使用时才导入）。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --top 30 --budget-ms 1500 --json importtime.json
+超过 --budget-ms 或导入了延迟加载的依赖时以非0状态码退出，可在CI中跟踪启动回归。
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 应在首次使用时才导入的模块
+DEFERRED_MODULES = ("aiohttp", "bs4", "lxml")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def profile_import(target: str = "main", runs: int = 1) -> Dict:
+    """在子进程中导入目标模块，返回各模块的自身/累计耗时（微秒，多次取最小值）"""
+    workdir = tempfile.mkdtemp(prefix="fund_importtime_")
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        "DATABASE_URL": env.get("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+
+    best: Dict[str, Dict] = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                                cwd=workdir, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"导入 {target} 失败:\n{result.stderr[-2000:]}")
+
+        for line in result.stderr.splitlines():
+            match = _LINE_RE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, module = match.groups()
+            current = best.get(module)
+            if current is None or int(cumulative_us) < current["cumulative_us"]:
+                best[module] = {
+                    "module": module,
+                    "self_us": int(self_us),
+                    "cumulative_us": int(cumulative_us),
+                    "depth": len(indent) // 2,
+                }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="应用导入耗时剖析")
+    parser.add_argument("--target", default="main", help="导入的模块")
+    parser.add_argument("--runs", type=int, default=3, help="重复次数（取最小值，降低噪声）")
+    parser.add_argument("--top", type=int, default=20, help="显示累计耗时最多的模块数")
+    parser.add_argument("--budget-ms", type=float, help="总导入耗时预算（毫秒），超出时返回非0状态码")
+    parser.add_argument("--json", dest="json_path", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    modules = profile_import(args.target, args.runs)
+    total_ms = modules[args.target]["cumulative_us"] / 1000 if args.target in modules else 0.0
+    # 只统计项目内模块与顶层第三方包，避免同一耗时在子模块中重复出现
+    top: List[Dict] = sorted(
+        (m for m in modules.values() if "." not in m["module"] or m["module"].split(".")[0] in
+         ("core", "crud", "models", "routers", "schemas", "utils")),
+        key=lambda m: m["cumulative_us"], reverse=True,
+    )[:args.top]
+    deferred_loaded = sorted(name for name in DEFERRED_MODULES if name in modules)
+
+    print(f"import {args.target}: {total_ms:.1f}ms")
+    print(f"{'模块':<40}{'累计(ms)':>12}{'自身(ms)':>12}")
+    for m in top:
+        print(f"{m['module']:<40}{m['cumulative_us'] / 1000:>12.1f}{m['self_us'] / 1000:>12.1f}")
+    if deferred_loaded:
+        print(f"\n启动路径上导入了应延迟加载的模块: {', '.join(deferred_loaded)}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"target": args.target, "total_ms": round(total_ms, 2), "top": top,
+                       "deferred_loaded": deferred_loaded}, f, ensure_ascii=False, indent=2)
+
+    over_budget = args.budget_ms is not None and total_ms > args.budget_ms
+    if over_budget:
+        print(f"\n导入耗时 {total_ms:.1f}ms 超出预算 {args.budget_ms}ms")
+    if over_budget or deferred_loaded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# benchmarks/run.py
+"""
+离线基准测试
+
+启动本地上游模拟服务、fakeredis 与 SQLite，在进程内运行 uvicorn，
+对 /api/funds/calculate、/api/funds/search、/api/auth/login 进行压测，
+输出各持仓规模下的 p50/p99 延迟与吞吐量。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1,10,50,100,200 --requests 50 --concurrency 8 --latency-ms 30
+
+录制/回放:
+    python -m benchmarks.run --record day.jsonl.gz          # 录制本次压测的上游响应
+    python -m benchmarks.run --replay day.jsonl.gz --replay-speed 1.0
+回放模式下不访问网络，持仓基金代码取自归档中出现过的代码（如线上录制的一整天数据）。
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.upstream_simulator import UpstreamSimulator, SimulatorConfig
+
+BENCH_PASSWORD = "bench-password"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def archive_codes(path: str) -> List[str]:
+    """从上游归档中提取出现过的基金代码"""
+    codes = []
+    seen = set()
+    patterns = [r"/js/(\d{6})\.js", r"[?&]code=(\d{6})", r"/(\d{6})\.html"]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                url = json.loads(line)["url"]
+            except (json.JSONDecodeError, KeyError):
+                continue
+            for pattern in patterns:
+                match = re.search(pattern, url)
+                if match and match.group(1) not in seen:
+                    seen.add(match.group(1))
+                    codes.append(match.group(1))
+    return codes
+
+
+def build_catalog(path: str, size: int, seed: int = 42, codes: List[str] = None) -> List[Dict]:
+    """生成基准测试用的基金目录（data/funds.json）"""
+    rnd = random.Random(seed)
+    fund_types = ["混合型", "股票型", "债券型", "指数型", "QDII", "货币型"]
+    codes = codes or [f"{100000 + i:06d}" for i in range(size)]
+    funds = []
+    for i, code in enumerate(codes):
+        fund_type = rnd.choice(fund_types)
+        funds.append({
+            "fund_code": code,
+            "fund_name": f"基准{fund_type}基金{i}",
+            "fund_type": fund_type,
+        })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(funds, f, ensure_ascii=False)
+    return funds
+
+
+class BenchEnvironment:
+    """基准测试环境：模拟上游 + fakeredis + SQLite + 进程内 uvicorn"""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="fund_bench_")
+        self.simulator = UpstreamSimulator(config=SimulatorConfig(
+            args.latency_ms, args.jitter_ms, args.error_rate, args.tail_rate, args.tail_ms))
+        self.server = None
+        self.base_url = None
+
+    def setup(self):
+        self.simulator.start()
+
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(self.workdir, 'bench.db')}"
+        os.environ["FUNDGZ_BASE_URL"] = self.simulator.base_url
+        os.environ["EASTMONEY_BASE_URL"] = self.simulator.base_url
+        # 关闭按用户限流：否则超出突发额度后 /calculate 返回缓存的降级结果（X-Degraded），测到的不是真实计算
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        codes = None
+        if self.args.replay:
+            os.environ["UPSTREAM_MODE"] = "replay"
+            os.environ["UPSTREAM_ARCHIVE"] = self.args.replay
+            os.environ["UPSTREAM_REPLAY_SPEED"] = str(self.args.replay_speed)
+            codes = archive_codes(self.args.replay)
+        elif self.args.record:
+            os.environ["UPSTREAM_MODE"] = "record"
+            os.environ["UPSTREAM_ARCHIVE"] = self.args.record
+        os.chdir(self.workdir)
+        self.catalog = build_catalog(os.path.join(self.workdir, "data", "funds.json"), self.args.catalog_size,
+                                     codes=codes)
+
+        # 用 fakeredis 替换 Redis 客户端（需在导入应用模块之前完成）
+        import fakeredis
+        import core.database as database
+        server = fakeredis.FakeServer()
+        database.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+        database.async_redis_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        database.redis_bytes_client = fakeredis.FakeRedis(server=server)
+        database.async_redis_bytes_client = fakeredis.FakeAsyncRedis(server=server)
+        self.redis = database.redis_client
+
+        import uvicorn
+        import main
+
+        port = _free_port()
+        config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        threading.Thread(target=self.server.run, daemon=True, name="bench-uvicorn").start()
+        while not self.server.started:
+            time.sleep(0.01)
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    def teardown(self):
+        if self.server:
+            self.server.should_exit = True
+        self.simulator.stop()
+
+    def seed_user(self, username: str, fund_count: int) -> None:
+        """创建用户并写入指定数量的持仓"""
+        from core.database import SessionLocal
+        from crud import user as user_crud
+        from models.user import UserFund
+        import schemas
+
+        db = SessionLocal()
+        try:
+            user = user_crud.get_user_by_username(db, username)
+            if user is None:
+                user = user_crud.create_user(db, schemas.UserCreate(
+                    username=username, email=f"{username}@example.com", password=BENCH_PASSWORD))
+            db.query(UserFund).filter(UserFund.user_id == user.id).delete()
+            rnd = random.Random(fund_count)
+            for fund in rnd.sample(self.catalog, min(fund_count, len(self.catalog))):
+                db.add(UserFund(
+                    user_id=user.id,
+                    fund_code=fund["fund_code"],
+                    fund_name=fund["fund_name"],
+                    cost_price=round(rnd.uniform(0.5, 5.0), 4),
+                    shares=round(rnd.uniform(100, 10000), 2),
+                ))
+            db.commit()
+        finally:
+            db.close()
+
+    def login(self, session, username: str) -> str:
+        response = session.post(f"{self.base_url}/api/auth/login",
+                                data={"username": username, "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+
+def run_load(name: str, call: Callable[[], "requests.Response"], total: int, concurrency: int) -> Dict:
+    """并发执行 call，统计延迟分布和吞吐量；带 X-Degraded 头的降级响应单独计数"""
+    latencies = []
+    errors = 0
+    degraded = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors, degraded
+        start = time.perf_counter()
+        try:
+            response = call()
+            status, is_degraded = response.status_code, "X-Degraded" in response.headers
+        except Exception:
+            status, is_degraded = 0, False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if status >= 400 or status == 0:
+                errors += 1
+            elif is_degraded:
+                degraded += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+
+    return {
+        "name": name,
+        "requests": total,
+        "errors": errors,
+        "degraded": degraded,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies) if latencies else 0.0, 2),
+        "throughput_rps": round(total / wall, 2) if wall > 0 else 0.0,
+    }
+
+
+def print_results(results: List[Dict]):
+    header = f"{'场景':<36}{'请求数':>8}{'错误':>6}{'降级':>6}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'吞吐(rps)':>12}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['name']:<36}{r['requests']:>8}{r['errors']:>6}{r['degraded']:>6}{r['p50_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['max_ms']:>10}{r['throughput_rps']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基金平台离线基准测试")
+    parser.add_argument("--sizes", default="1,10,50,100,200", help="持仓规模列表（逗号分隔）")
+    parser.add_argument("--requests", type=int, default=30, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发客户端数")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="模拟上游平均延迟")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="模拟上游延迟抖动")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟上游错误率")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="模拟上游慢尾请求比例")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="模拟上游慢尾额外延迟")
+    parser.add_argument("--catalog-size", type=int, default=5000, help="基金目录规模")
+    parser.add_argument("--cold", action="store_true", help="每次计算前清空缓存（冷缓存场景）")
+    parser.add_argument("--json", dest="json_path", help="将结果写入JSON文件")
+    parser.add_argument("--record", help="录制上游响应到归档文件")
+    parser.add_argument("--replay", help="从归档文件回放上游响应（不访问网络）")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="回放延迟缩放（1为原始耗时，0为不等待）")
+    args = parser.parse_args()
+    for name in ("json_path", "record", "replay"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    import requests
+
+    env = BenchEnvironment(args).setup()
+    results = []
+    try:
+        session = requests.Session()
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+
+        # 登录
+        env.seed_user("bench_login", 0)
+        results.append(run_load(
+            "POST /api/auth/login",
+            lambda: session.post(f"{env.base_url}/api/auth/login",
+                                 data={"username": "bench_login", "password": BENCH_PASSWORD}),
+            args.requests, args.concurrency))
+
+        # 搜索
+        token = env.login(session, "bench_login")
+        headers = {"Authorization": f"Bearer {token}"}
+        keywords = ["1000", "混合", "基准股票", "QDII", "债券型基金1"]
+        results.append(run_load(
+            "GET /api/funds/search",
+            lambda: session.get(f"{env.base_url}/api/funds/search",
+                                params={"q": random.choice(keywords), "limit": 10},
+                                headers=headers),
+            args.requests, args.concurrency))
+
+        # 组合计算（按持仓规模）
+        for size in sizes:
+            username = f"bench_{size}"
+            env.seed_user(username, size)
+            token = env.login(session, username)
+            headers = {"Authorization": f"Bearer {token}"}
+
+            def calculate():
+                if args.cold:
+                    env.redis.flushdb()
+                return session.get(f"{env.base_url}/api/funds/calculate", headers=headers)
+
+            label = "cold" if args.cold else "warm"
+            results.append(run_load(f"GET /api/funds/calculate n={size} ({label})",
+                                    calculate, args.requests, args.concurrency))
+
+        print_results(results)
+        print(f"\n上游请求总数: {env.simulator.request_count}")
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    finally:
+        env.teardown()
+
+    degraded = [r["name"] for r in results if r["degraded"]]
+    if degraded:
+        # 降级响应走的是缓存兜底路径，延迟数据不可用
+        print(f"\n以下场景出现降级响应，结果无效: {', '.join(degraded)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
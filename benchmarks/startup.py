@@ -0,0 +1,173 @@
+# benchmarks/startup.py
+"""
+启动耗时基准测试
+
+在子进程中启动服务（SQLite + fakeredis + 本地上游模拟服务），测量:
+    cold_start_ms     - 从启动进程到 /health 返回 200 的耗时
+    first_request_ms  - 就绪后第一次 /api/funds/calculate 的耗时
+    second_request_ms - 紧接着第二次请求的耗时（对比首个请求的额外开销）
+
+用法（在项目根目录执行）:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --funds 20 --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.run import BENCH_PASSWORD, _free_port, build_catalog, percentile
+from benchmarks.upstream_simulator import UpstreamSimulator, SimulatorConfig
+
+
+def serve(port: int):
+    """子进程入口：用 fakeredis 替换 Redis 客户端后启动服务"""
+    import fakeredis
+    import core.database as database
+    server = fakeredis.FakeServer()
+    database.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    database.async_redis_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    database.redis_bytes_client = fakeredis.FakeRedis(server=server)
+    database.async_redis_bytes_client = fakeredis.FakeAsyncRedis(server=server)
+
+    import uvicorn
+    uvicorn.run("main:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def seed(workdir: str, fund_count: int) -> None:
+    """预先建表并写入基准用户及持仓（模拟已有数据的生产数据库）"""
+    import random
+    from core.database import SessionLocal, engine
+    from crud import user as user_crud
+    from models import base as models
+    from models.user import UserFund
+    import schemas
+
+    catalog = build_catalog(os.path.join(workdir, "data", "funds.json"), max(fund_count, 100))
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = user_crud.create_user(db, schemas.UserCreate(
+            username="bench_startup", email="bench_startup@example.com", password=BENCH_PASSWORD))
+        rnd = random.Random(fund_count)
+        for fund in rnd.sample(catalog, fund_count):
+            db.add(UserFund(
+                user_id=user.id,
+                fund_code=fund["fund_code"],
+                fund_name=fund["fund_name"],
+                cost_price=round(rnd.uniform(0.5, 5.0), 4),
+                shares=round(rnd.uniform(100, 10000), 2),
+            ))
+        db.commit()
+    finally:
+        db.close()
+    engine.dispose()
+
+
+def measure_once(session, env: Dict[str, str], workdir: str, timeout: float) -> Dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.startup", "--serve", str(port)],
+                               cwd=workdir, env=env)
+    try:
+        cold_start_ms = None
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"服务进程异常退出: {process.returncode}")
+            try:
+                if session.get(f"{base_url}/health", timeout=1).status_code == 200:
+                    cold_start_ms = (time.perf_counter() - start) * 1000
+                    break
+            except Exception:
+                pass
+            time.sleep(0.01)
+        if cold_start_ms is None:
+            raise RuntimeError("等待服务就绪超时")
+
+        response = session.post(f"{base_url}/api/auth/login",
+                                data={"username": "bench_startup", "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        timings = []
+        for _ in range(2):
+            request_start = time.perf_counter()
+            session.get(f"{base_url}/api/funds/calculate", headers=headers).raise_for_status()
+            timings.append((time.perf_counter() - request_start) * 1000)
+
+        return {
+            "cold_start_ms": round(cold_start_ms, 2),
+            "first_request_ms": round(timings[0], 2),
+            "second_request_ms": round(timings[1], 2),
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务启动耗时基准测试")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--runs", type=int, default=3, help="重复启动次数")
+    parser.add_argument("--funds", type=int, default=20, help="基准用户的持仓数量")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="模拟上游平均延迟")
+    parser.add_argument("--timeout", type=float, default=60.0, help="等待就绪的超时时间（秒）")
+    parser.add_argument("--json", dest="json_path", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)
+
+    import requests
+
+    workdir = tempfile.mkdtemp(prefix="fund_startup_")
+    simulator = UpstreamSimulator(config=SimulatorConfig(args.latency_ms)).start()
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "FUNDGZ_BASE_URL": simulator.base_url,
+        "EASTMONEY_BASE_URL": simulator.base_url,
+    })
+    os.environ.update(env)
+    os.chdir(workdir)
+    seed(workdir, args.funds)
+
+    runs: List[Dict] = []
+    try:
+        session = requests.Session()
+        for i in range(args.runs):
+            result = measure_once(session, env, workdir, args.timeout)
+            runs.append(result)
+            print(f"第{i + 1}次: 冷启动 {result['cold_start_ms']}ms, 首个请求 {result['first_request_ms']}ms, "
+                  f"第二个请求 {result['second_request_ms']}ms")
+    finally:
+        simulator.stop()
+
+    summary = {
+        name: round(percentile([r[name] for r in runs], 50), 2)
+        for name in ("cold_start_ms", "first_request_ms", "second_request_ms")
+    }
+    print(f"\n中位数: {summary}")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs, "median": summary}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# benchmarks/upstream_simulator.py
+"""
+本地上游模拟服务
+
+回放录制的 fundgz `jsonpgz(...)`、F10DataApi `lsjz`、pingzhongdata 以及 LOF 基金页面响应，
+可配置延迟与错误率，用于在无外网环境（CI）下进行基准测试。
+
+用法:
+    python -m benchmarks.upstream_simulator --port 9100 --latency-ms 40 --error-rate 0.01
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 录制样本对应的基金代码，回放时替换为请求的代码
+FUNDGZ_FIXTURE = ("fundgz_000001.js", "000001")
+LSJZ_FIXTURE = ("lsjz_000001.js", "000001")
+LOF_FIXTURE = ("lof_161725.html", "161725")
+PINGZHONGDATA_FIXTURE = ("pingzhongdata_000001.js", "000001")
+RECORDED_BASE_URL = "http://fund.eastmoney.com"
+# 以此前缀开头的代码模拟已退市/不存在的基金
+DELISTED_PREFIX = "9999"
+
+
+def _read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _code_seed(code: str) -> int:
+    """基于基金代码的稳定随机种子，保证同一代码每次回放结果一致"""
+    return int(hashlib.md5(code.encode()).hexdigest()[:8], 16)
+
+
+class SimulatorConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 tail_rate: float = 0.0, tail_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # 慢尾：按 tail_rate 比例额外延迟 tail_ms
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+
+
+class UpstreamSimulator:
+    """在后台线程中运行的上游模拟服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[SimulatorConfig] = None):
+        self.config = config or SimulatorConfig()
+        self.fundgz_template = _read_fixture(FUNDGZ_FIXTURE[0])
+        self.lsjz_template = _read_fixture(LSJZ_FIXTURE[0])
+        self.lof_template = _read_fixture(LOF_FIXTURE[0])
+        self.pingzhongdata_template = _read_fixture(PINGZHONGDATA_FIXTURE[0])
+        # 从录制的 lsjz 响应中提取行模板
+        self.lsjz_row = re.search(r"<tbody>(<tr>.*?</tr>)", self.lsjz_template).group(1)
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                simulator._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="upstream-simulator")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # ---- 响应渲染 ----
+
+    def render_fundgz(self, code: str) -> str:
+        rnd = random.Random(_code_seed(code))
+        dwjz = round(rnd.uniform(0.5, 5.0), 4)
+        gszzl = round(rnd.uniform(-4.0, 4.0), 2)
+        gsz = round(dwjz * (1 + gszzl / 100), 4)
+        body = self.fundgz_template.replace(FUNDGZ_FIXTURE[1], code)
+        body = re.sub(r'"dwjz":"[^"]*"', f'"dwjz":"{dwjz:.4f}"', body)
+        body = re.sub(r'"gsz":"[^"]*"', f'"gsz":"{gsz:.4f}"', body)
+        body = re.sub(r'"gszzl":"[^"]*"', f'"gszzl":"{gszzl:.2f}"', body)
+        return body
+
+    def render_lsjz(self, code: str, sdate: str, edate: str, page: int, per: int) -> str:
+        rnd = random.Random(_code_seed(code))
+        try:
+            start = datetime.strptime(sdate, "%Y-%m-%d").date()
+            end = datetime.strptime(edate, "%Y-%m-%d").date()
+        except ValueError:
+            end = datetime.now().date()
+            start = end - timedelta(days=30)
+
+        # 生成交易日（跳过周末），最新的在前
+        days = []
+        day = end
+        while day >= start:
+            if day.weekday() < 5:
+                days.append(day)
+            day -= timedelta(days=1)
+
+        nav = round(rnd.uniform(0.5, 5.0), 4)
+        rows = []
+        for d in days:
+            growth = round(rnd.uniform(-3.0, 3.0), 2)
+            rows.append((d, nav, growth))
+            nav = round(nav / (1 + growth / 100), 4)
+
+        records = len(rows)
+        pages = max(1, (records + per - 1) // per)
+        page_rows = rows[(page - 1) * per: page * per]
+
+        html_rows = []
+        for d, unit_nav, growth in page_rows:
+            row = re.sub(r"<td>\d{4}-\d{2}-\d{2}</td>", f"<td>{d.isoformat()}</td>", self.lsjz_row, count=1)
+            cells = re.findall(r"<td class='tor bold[^']*'>[^<]*</td>", row)
+            row = row.replace(cells[0], f"<td class='tor bold'>{unit_nav:.4f}</td>", 1)
+            row = row.replace(cells[1], f"<td class='tor bold'>{unit_nav * 2:.4f}</td>", 1)
+            row = row.replace(cells[2], f"<td class='tor bold'>{growth:.2f}%</td>", 1)
+            html_rows.append(row)
+
+        body = re.sub(r"<tbody>.*</tbody>", "<tbody>" + "".join(html_rows) + "</tbody>", self.lsjz_template, flags=re.S)
+        body = re.sub(r"records:\d+,pages:\d+,curpage:\d+",
+                      f"records:{records},pages:{pages},curpage:{page}", body)
+        return body
+
+    def render_pingzhongdata(self, code: str) -> str:
+        rnd = random.Random(_code_seed(code))
+        dwjz = round(rnd.uniform(0.5, 5.0), 4)
+        body = self.pingzhongdata_template.replace(PINGZHONGDATA_FIXTURE[1], code)
+        # 最后一个净值点替换为与 fundgz 一致的单位净值
+        return re.sub(r'"y":[\d.]+(,"equityReturn":[^}]*\}\];)', f'"y":{dwjz:.4f}\\1', body)
+
+    def render_lof(self, code: str) -> str:
+        body = self.lof_template.replace(LOF_FIXTURE[1], code)
+        return body.replace(RECORDED_BASE_URL, self.base_url)
+
+    # ---- 请求处理 ----
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        with self._lock:
+            self.request_count += 1
+
+        config = self.config
+        delay = config.latency_ms + (random.uniform(-config.jitter_ms, config.jitter_ms) if config.jitter_ms else 0)
+        if config.tail_rate and random.random() < config.tail_rate:
+            delay += config.tail_ms
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        if config.error_rate and random.random() < config.error_rate:
+            self._send(handler, 503, "Service Unavailable", "text/plain")
+            return
+
+        parsed = urlparse(handler.path)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+
+        match = re.match(r"^/js/([^/]+)\.js$", path)
+        if match and match.group(1).startswith(DELISTED_PREFIX):
+            self._send(handler, 200, "jsonpgz();", "application/javascript")
+            return
+        if match:
+            self._send(handler, 200, self.render_fundgz(match.group(1)), "application/javascript")
+            return
+
+        if path == "/f10/F10DataApi.aspx" and query.get("type", [""])[0] == "lsjz":
+            body = self.render_lsjz(
+                query.get("code", [""])[0],
+                query.get("sdate", [""])[0],
+                query.get("edate", [""])[0],
+                int(query.get("page", ["1"])[0]),
+                int(query.get("per", ["20"])[0]),
+            )
+            self._send(handler, 200, body, "text/html")
+            return
+
+        match = re.match(r"^/pingzhongdata/([^/]+)\.js$", path)
+        if match and not match.group(1).startswith(DELISTED_PREFIX):
+            self._send(handler, 200, self.render_pingzhongdata(match.group(1)), "application/javascript")
+            return
+
+        match = re.match(r"^/([A-Za-z0-9]+)\.html$", path)
+        if match:
+            self._send(handler, 200, self.render_lof(match.group(1)), "text/html")
+            return
+
+        self._send(handler, 404, "Not Found", "text/plain")
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, body: str, content_type: str):
+        data = body.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地上游模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="平均响应延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="延迟抖动范围（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的比例")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="慢尾请求比例")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="慢尾请求额外延迟（毫秒）")
+    args = parser.parse_args()
+
+    simulator = UpstreamSimulator(args.host, args.port, SimulatorConfig(
+        args.latency_ms, args.jitter_ms, args.error_rate, args.tail_rate, args.tail_ms))
+    print(f"上游模拟服务已启动: {simulator.base_url}")
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
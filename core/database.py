@@ -1,17 +1,22 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from core.config import settings
+from core.db_pool import TimedQueuePool, install_pool_listeners
 import redis
+import redis.asyncio as aioredis
 import os
 
 # 创建数据库引擎
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,
     pool_recycle=3600,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
 )
+install_pool_listeners(engine)
 
 # Redis 配置
 redis_client = redis.Redis(
@@ -21,13 +26,59 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+# 读写二进制缓存值（如压缩编码的净值历史，见 utils/nav_codec.py）的客户端，响应不解码为字符串
+redis_bytes_client = redis.Redis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=int(os.getenv("REDIS_DB", 0)),
+)
+
+# 异步 Redis 配置（异步路由中使用，不阻塞事件循环）
+# 连接池大小固定，连接用尽时等待空闲连接而不是无限创建新连接
+async_redis_client = aioredis.Redis(
+    connection_pool=aioredis.BlockingConnectionPool(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        db=int(os.getenv("REDIS_DB", 0)),
+        decode_responses=True,
+        max_connections=settings.REDIS_ASYNC_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+    )
+)
+async_redis_bytes_client = aioredis.Redis(
+    connection_pool=aioredis.BlockingConnectionPool(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        db=int(os.getenv("REDIS_DB", 0)),
+        max_connections=settings.REDIS_ASYNC_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+    )
+)
+
 # 创建数据库会话
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: 提交后已加载的对象不过期，新增/修改后直接返回对象，不需要 refresh 再查询一次
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 def get_db():
+    """
+    请求内的数据库会话
+
+    FastAPI 在同一请求内缓存依赖结果，get_current_user 与路由函数依赖 get_db 时共用同一个会话。
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def read_and_release(db, query, *args, **kwargs):
+    """
+    执行只读查询后结束事务，把连接还给连接池
+
+    会话仍可继续使用（下次查询时再取连接），查询到的对象也不会过期；
+    用于查询之后还有较慢的操作（密码哈希、请求上游）的请求，避免这期间一直占用连接。
+    """
+    result = query(db, *args, **kwargs)
+    db.commit()
+    return result
+
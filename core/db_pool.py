@@ -0,0 +1,70 @@
+# core/db_pool.py
+"""
+数据库连接池统计
+
+TimedQueuePool 在 QueuePool 的基础上记录每次取连接的耗时（连接池用尽时的排队等待，以及新建连接），
+连接池事件记录取出/归还/新建连接的次数。通过 /api/admin/database 查看，用于判断连接池大小是否合适:
+    wait_ms 持续升高或出现 timeouts 说明连接不够用（或请求持有连接的时间过长）。
+"""
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+_stats_lock = threading.Lock()
+pool_stats = {
+    "checkouts": 0,  # 从连接池取出连接的次数
+    "checkins": 0,  # 归还次数
+    "connects": 0,  # 新建数据库连接的次数
+    "waits": 0,  # 取连接耗时超过 1ms 的次数
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0,
+    "timeouts": 0,  # 等待超时（pool_timeout）的次数
+}
+
+
+def _incr(name: str, value=1):
+    with _stats_lock:
+        pool_stats[name] += value
+
+
+class TimedQueuePool(QueuePool):
+    """记录取连接耗时的 QueuePool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _incr("timeouts")
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms > 1:
+                with _stats_lock:
+                    pool_stats["waits"] += 1
+                    pool_stats["wait_ms_total"] += elapsed_ms
+                    pool_stats["wait_ms_max"] = max(pool_stats["wait_ms_max"], elapsed_ms)
+
+
+def install_pool_listeners(engine: Engine):
+    """注册连接池事件，统计取出/归还/新建连接次数"""
+    event.listen(engine, "checkout", lambda *args: _incr("checkouts"))
+    event.listen(engine, "checkin", lambda *args: _incr("checkins"))
+    event.listen(engine, "connect", lambda *args: _incr("connects"))
+
+
+def get_pool_stats(engine: Engine) -> Dict:
+    pool = engine.pool
+    with _stats_lock:
+        stats = dict(pool_stats)
+    stats["wait_ms_total"] = round(stats["wait_ms_total"], 2)
+    stats["wait_ms_max"] = round(stats["wait_ms_max"], 2)
+    stats["pool"] = pool.status()
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    return stats
@@ -1,9 +1,11 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from core.database import get_db
+from core.database import get_db, read_and_release
 from utils.jwt import verify_token
 from crud.user import get_user_by_username
+from core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -17,13 +19,27 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    print("哈哈哈哈")
     username = verify_token(token)
     if username is None:
         raise credentials_exception
     
-    user = get_user_by_username(db, username=username)
+    # 同步数据库查询放到线程池，避免阻塞事件循环；查询后归还连接，路由后续需要时再取
+    user = await run_in_threadpool(read_and_release, db, get_user_by_username, username=username)
     if user is None:
         raise credentials_exception
     
-    return user
\ No newline at end of file
+    return user
+
+def is_admin(user) -> bool:
+    """判断用户是否为管理员"""
+    admins = {name.strip() for name in settings.ADMIN_USERNAMES.split(",") if name.strip()}
+    return user is not None and user.username in admins
+
+async def get_admin_user(current_user = Depends(get_current_user)):
+    """获取当前管理员用户"""
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return current_user
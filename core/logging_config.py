@@ -0,0 +1,192 @@
+# core/logging_config.py
+"""
+日志配置
+
+请求线程只把日志记录放入内存队列（QueueHandler），格式化和写文件/终端都在后台线程
+（QueueListener）中完成，请求路径上的日志开销只剩一次入队。
+
+    - 消息参数延迟格式化：请使用 logger.info("... %s", value) 形式，入队时不拼接字符串，
+      级别被过滤掉的日志也不会产生格式化开销（参数应为不可变值，格式化发生在后台线程）
+    - LOG_FORMAT=json 时每行一个JSON对象，包含时间、级别、logger、消息、request_id 以及 extra 中的字段
+    - 每个请求分配 request_id（沿用请求头 X-Request-ID），请求内的日志自动带上，并记录请求耗时
+    - 逐个基金的高频日志传入 extra=sampled(...)，每 LOG_SAMPLE_EVERY 条只输出1条（警告及以上不采样）
+    - LOG_FILE 为空时输出到标准错误；设置后追加写入该文件（兼容 logrotate）
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from core.config import settings
+
+# 当前请求的ID（由 RequestContextMiddleware 设置，跨 await 与线程池调用传递）
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord 自带的属性，JSON 输出时不作为 extra 字段
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+access_logger = logging.getLogger("access")
+
+
+def sampled(**fields) -> Dict:
+    """高频日志的 extra 参数：标记为可采样，并附带结构化字段"""
+    return dict(fields, sampled=True)
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            payload["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key != "sampled":
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """对标记了 sampled 的 INFO/DEBUG 日志按消息模板计数采样，每 N 条保留1条"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every <= 1 or not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        key = f"{record.name}:{record.msg}"
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sample_every = self.every
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    只入队、不格式化的 QueueHandler
+
+    标准 QueueHandler.prepare 会在调用线程中格式化消息（为了跨进程传递），
+    这里监听线程在同一进程内，直接传递记录对象，格式化留给后台线程。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # 队列满（输出端阻塞）时丢弃，不阻塞请求
+            pass
+
+
+def setup_logging():
+    """配置根 logger（可重复调用，只生效一次）"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        if settings.LOG_FILE:
+            output = logging.handlers.WatchedFileHandler(settings.LOG_FILE, encoding="utf-8")
+        else:
+            output = logging.StreamHandler(sys.stderr)
+        if settings.LOG_FORMAT == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+        handler = LazyQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_EVERY))
+
+        root = logging.getLogger()
+        for existing in root.handlers[:]:
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+
+        # uvicorn 的日志也走同一队列；访问日志由 RequestContextMiddleware 记录
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            logging.getLogger(name).handlers = []
+            logging.getLogger(name).propagate = True
+
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """停止后台写入线程（会先写完队列中剩余的日志）"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class RequestContextMiddleware:
+    """为每个请求设置 request_id，并在响应后记录方法、路径、状态码和耗时"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            access_logger.info(
+                "%s %s %s", scope["method"], scope["path"], status,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                },
+            )
+            request_id_var.reset(token)
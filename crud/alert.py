@@ -0,0 +1,38 @@
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models.alert import FundAlert
+from schemas.user import AlertCreate
+
+
+def get_user_alerts(db: Session, user_id: int) -> List[FundAlert]:
+    return db.query(FundAlert).filter(FundAlert.user_id == user_id).order_by(FundAlert.id).all()
+
+def get_user_alert(db: Session, user_id: int, alert_id: int) -> Optional[FundAlert]:
+    return db.query(FundAlert).filter(FundAlert.user_id == user_id, FundAlert.id == alert_id).first()
+
+def get_enabled_alerts(db: Session) -> List[FundAlert]:
+    """所有启用的提醒（重建倒排索引时使用）"""
+    return db.query(FundAlert).filter(FundAlert.enabled.is_(True)).all()
+
+def create_alert(db: Session, alert: AlertCreate, user_id: int) -> FundAlert:
+    db_alert = FundAlert(**alert.dict(), user_id=user_id)
+    db.add(db_alert)
+    db.commit()
+    return db_alert
+
+def update_alert(db: Session, user_id: int, alert_id: int, alert_update: AlertCreate) -> Optional[FundAlert]:
+    db_alert = get_user_alert(db, user_id, alert_id)
+    if db_alert:
+        for key, value in alert_update.dict().items():
+            setattr(db_alert, key, value)
+        db.commit()
+    return db_alert
+
+def delete_alert(db: Session, user_id: int, alert_id: int) -> Optional[FundAlert]:
+    db_alert = get_user_alert(db, user_id, alert_id)
+    if db_alert:
+        db.delete(db_alert)
+        db.commit()
+    return db_alert
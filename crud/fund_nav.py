@@ -0,0 +1,39 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from models.fund_nav import FundNavHistory
+
+
+def get_fund_nav_history(db: Session, fund_code: str, start_date: date, end_date: date):
+    """获取基金在日期区间内的净值（按日期升序）"""
+    return (
+        db.query(FundNavHistory.nav_date, FundNavHistory.unit_nav, FundNavHistory.daily_growth)
+        .filter(
+            FundNavHistory.fund_code == fund_code,
+            FundNavHistory.nav_date >= start_date,
+            FundNavHistory.nav_date <= end_date,
+        )
+        .order_by(FundNavHistory.nav_date)
+        .all()
+    )
+
+def replace_fund_navs(db: Session, rows: List[Dict]) -> int:
+    """批量写入净值；已存在的 (基金代码, 日期) 会被覆盖，重复回填同一区间不会产生重复行"""
+    # 同一批中重复的 (基金代码, 日期) 只保留最后一行（分页边界移动时可能出现）
+    rows = list({(row["fund_code"], row["nav_date"]): row for row in rows}.values())
+    if not rows:
+        return 0
+    dates_by_code = defaultdict(list)
+    for row in rows:
+        dates_by_code[row["fund_code"]].append(row["nav_date"])
+    for fund_code, nav_dates in dates_by_code.items():
+        db.query(FundNavHistory).filter(
+            FundNavHistory.fund_code == fund_code,
+            FundNavHistory.nav_date.in_(nav_dates),
+        ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(FundNavHistory, rows)
+    db.commit()
+    return len(rows)
@@ -0,0 +1,34 @@
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from models.portfolio import PortfolioSnapshot
+
+
+def get_portfolio_snapshots(db: Session, user_id: int, start_date: date, end_date: date):
+    """获取用户在日期区间内的组合快照（按日期升序）"""
+    return (
+        db.query(PortfolioSnapshot.snapshot_date, PortfolioSnapshot.cost,
+                 PortfolioSnapshot.value, PortfolioSnapshot.profit)
+        .filter(
+            PortfolioSnapshot.user_id == user_id,
+            PortfolioSnapshot.snapshot_date >= start_date,
+            PortfolioSnapshot.snapshot_date <= end_date,
+        )
+        .order_by(PortfolioSnapshot.snapshot_date)
+        .all()
+    )
+
+def replace_portfolio_snapshots(db: Session, snapshot_date: date, rows: List[Dict]):
+    """写入某一天的组合快照；重复执行时覆盖这些用户当天已有的快照"""
+    user_ids = [row["user_id"] for row in rows]
+    if not user_ids:
+        return 0
+    db.query(PortfolioSnapshot).filter(
+        PortfolioSnapshot.snapshot_date == snapshot_date,
+        PortfolioSnapshot.user_id.in_(user_ids),
+    ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(PortfolioSnapshot, [dict(row, snapshot_date=snapshot_date) for row in rows])
+    db.commit()
+    return len(rows)
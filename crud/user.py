@@ -1,8 +1,9 @@
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from models.user import User, UserFund
 from schemas.user import UserCreate, FundCreate
 from utils.password import get_password_hash, verify_password
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 
 def get_user_by_username(db: Session, username: str):
@@ -13,9 +14,14 @@ def get_user_by_email(db: Session, email: str):
     """通过邮箱获取用户"""
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, user: UserCreate):
-    """创建新用户"""
-    hashed_password = get_password_hash(user.password)
+def get_users_by_username_or_email(db: Session, username: str, email: str) -> List[User]:
+    """一次查询用户名或邮箱已被使用的用户（注册时检查冲突）"""
+    return db.query(User).filter(or_(User.username == username, User.email == email)).all()
+
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None):
+    """创建新用户（可传入已在哈希进程池中生成的密码哈希）"""
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -23,7 +29,6 @@ def create_user(db: Session, user: UserCreate):
     )
     db.add(db_user)
     db.commit()
-    db.refresh(db_user)
     return db_user
 
 def authenticate_user(db: Session, username: str, password: str):
@@ -35,6 +40,12 @@ def authenticate_user(db: Session, username: str, password: str):
         return False
     return user
 
+def update_user_password_hash(db: Session, user: User, hashed_password: str):
+    """更新用户密码哈希（登录时哈希参数变化后重新哈希）"""
+    user.hashed_password = hashed_password
+    db.commit()
+    return user
+
 
 # 基金 CRUD
 def get_user_funds(db: Session, user_id: int):
@@ -50,8 +61,6 @@ def create_user_fund(db: Session, fund: FundCreate, user_id: int):
     db_fund = UserFund(**fund.dict(), user_id=user_id)
     db.add(db_fund)
     db.commit()
-    db.refresh(db_fund)
-    print(db_fund)
     return db_fund
 
 
@@ -61,7 +70,6 @@ def update_user_fund(db: Session, fund_id: int, fund_update: FundCreate, user_id
         for key, value in fund_update.dict().items():
             setattr(db_fund, key, value)
         db.commit()
-        db.refresh(db_fund)
     return db_fund
 
 def delete_user_fund(db: Session, fund_id: int, user_id: int):
@@ -70,4 +78,46 @@ def delete_user_fund(db: Session, fund_id: int, user_id: int):
         db.delete(db_fund)
         db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
+
+def bulk_upsert_user_funds(db: Session, user_id: int, rows: List[Dict], chunk_size: int = 500,
+                           replace: bool = False) -> Tuple[int, int, int]:
+    """
+    批量导入持仓（按基金代码更新已有持仓，否则新增）
+
+    每块只执行一次查询，新增与更新分别用一条批量语句（executemany）写入，整个导入只提交一次。
+    replace=True 时删除导入数据中没有的持仓。
+
+    Returns:
+        (新增数, 更新数, 删除数)
+    """
+    inserted = updated = deleted = 0
+    imported_codes = set()
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        codes = [row["fund_code"] for row in chunk]
+        imported_codes.update(codes)
+        existing = {
+            fund_code: fund_id
+            for fund_id, fund_code in db.query(UserFund.id, UserFund.fund_code).filter(
+                UserFund.user_id == user_id,
+                UserFund.fund_code.in_(codes),
+            )
+        }
+        updates = [dict(row, id=existing[row["fund_code"]]) for row in chunk if row["fund_code"] in existing]
+        inserts = [dict(row, user_id=user_id) for row in chunk if row["fund_code"] not in existing]
+        if updates:
+            db.bulk_update_mappings(UserFund, updates)
+        if inserts:
+            db.bulk_insert_mappings(UserFund, inserts)
+        inserted += len(inserts)
+        updated += len(updates)
+
+    if replace:
+        query = db.query(UserFund).filter(UserFund.user_id == user_id)
+        if imported_codes:
+            query = query.filter(UserFund.fund_code.notin_(imported_codes))
+        deleted = query.delete(synchronize_session=False)
+
+    db.commit()
+    return inserted, updated, deleted
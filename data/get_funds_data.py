@@ -6,7 +6,6 @@ import logging
 from datetime import datetime
 import os
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def fetch_and_save_funds():
@@ -40,7 +39,7 @@ def fetch_and_save_funds():
         
         # 解析JSON
         raw_data = json.loads(array_str)
-        logger.info(f"获取到 {len(raw_data)} 条记录")
+        logger.info("获取到 %d 条记录", len(raw_data))
         
         # 转换格式
         funds = []
@@ -71,7 +70,7 @@ def fetch_and_save_funds():
                     "raw_type": raw_type
                 })
         
-        logger.info(f"去重后得到 {len(funds)} 个基金")
+        logger.info("去重后得到 %d 个基金", len(funds))
         
         # 保存数据
         result = {
@@ -104,8 +103,10 @@ def fetch_and_save_funds():
         return True
         
     except Exception as e:
-        logger.error(f"获取数据失败: {e}")
+        logger.error("获取数据失败: %s", e)
         return False
 
 if __name__ == "__main__":
+    # 只在作为脚本运行时配置日志，被导入时不影响调用方的日志配置
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     fetch_and_save_funds()
\ No newline at end of file
@@ -0,0 +1,66 @@
+# jobs/alert_refresher.py
+"""
+涨跌提醒行情刷新器（独立进程）
+
+Web 进程内的刷新器（ALERT_REFRESHER_ENABLED=true）已能满足单机部署；
+多机部署或希望 Web 进程不承担刷新任务时，设置 ALERT_REFRESHER_ENABLED=false 并单独运行:
+    python -m jobs.alert_refresher
+只刷新一轮（用于 cron 或排查）:
+    python -m jobs.alert_refresher --once
+从数据库重建提醒索引:
+    python -m jobs.alert_refresher --rebuild-index --once
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from core.config import settings
+from core.logging_config import setup_logging
+from core.database import engine, redis_client
+from models import base as models
+from models.alert import FundAlert  # noqa: F401  注册表结构
+from utils.alert_engine import REFRESHER_LOCK_KEY, ensure_index, rebuild_index, refresh_once
+
+logger = logging.getLogger(__name__)
+
+
+def run_forever(interval: float):
+    """按固定间隔刷新；与 Web 进程内的刷新器共用同一把锁，不会重复刷新"""
+    while True:
+        started = time.monotonic()
+        try:
+            if redis_client.set(REFRESHER_LOCK_KEY, os.getpid(), nx=True, ex=max(1, int(interval) - 1)):
+                refresh_once()
+        except Exception as e:
+            logger.error("提醒行情刷新失败: %s", e)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="涨跌提醒行情刷新器")
+    parser.add_argument("--interval", type=float, default=settings.ALERT_REFRESH_SECONDS, help="刷新间隔（秒）")
+    parser.add_argument("--once", action="store_true", help="只刷新一轮")
+    parser.add_argument("--rebuild-index", action="store_true", help="先从数据库重建提醒索引")
+    args = parser.parse_args()
+
+    setup_logging()
+    models.Base.metadata.create_all(bind=engine)
+    if args.rebuild_index:
+        rebuild_index()
+    else:
+        ensure_index()
+
+    if args.once:
+        refresh_once()
+    else:
+        run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    main()
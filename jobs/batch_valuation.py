@@ -0,0 +1,44 @@
+# jobs/batch_valuation.py
+"""
+所有用户的组合批量估值（命令行版本，逻辑见 utils/batch_valuation.py）
+
+输出到标准输出或文件:
+    python -m jobs.batch_valuation > valuation.ndjson
+    python -m jobs.batch_valuation --format csv --output valuation.csv
+"""
+import argparse
+import logging
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from core.config import settings
+from core.logging_config import setup_logging
+from utils.batch_valuation import format_valuations, iter_valuations
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="所有用户的组合批量估值")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson", help="输出格式")
+    parser.add_argument("--output", help="输出文件（默认标准输出）")
+    parser.add_argument("--fetch-workers", type=int, default=settings.BATCH_VALUATION_FETCH_WORKERS,
+                        help="行情预取并发数")
+    args = parser.parse_args()
+
+    setup_logging()
+    lines = format_valuations(iter_valuations(args.fetch_workers), args.format)
+    if args.output:
+        # CSV 带 BOM，便于 Excel 正确识别中文
+        with open(args.output, "w", encoding="utf-8-sig" if args.format == "csv" else "utf-8", newline="") as f:
+            f.writelines(lines)
+    else:
+        sys.stdout.writelines(lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+# jobs/nav_backfill.py
+"""
+历史净值分页回填
+
+F10DataApi 每页最多返回 per=50 条净值，多年历史需要逐页请求。本工具:
+    1. 对每个基金先请求第1页，从响应的 pages 字段得到总页数，再把其余页加入任务队列
+    2. 多个线程并发请求，按上游主机做令牌桶限速（--rate 每秒请求数），
+       请求同时经过 utils/upstream 的熔断与自适应并发控制；失败的页按指数退避重试
+    3. 解析后的净值由单独的写入线程攒批写入 fund_nav_history 表（每批 --batch-size 行）
+    4. 每批写入提交后把已完成的页追加到检查点文件，中断后再次执行同一命令会跳过已完成的页和基金
+
+检查点文件第一行记录回填的日期区间，续跑时沿用该区间，保证分页边界一致
+（结束日期固定，新公布的净值不会让页码整体后移）。更换日期区间请使用新的检查点文件。
+
+用法:
+    python -m jobs.nav_backfill --codes 000001,110022 --sdate 2015-01-01
+    python -m jobs.nav_backfill --all --workers 16 --rate 20    # 回填整个基金目录
+    python -m jobs.nav_backfill --codes-file codes.txt --checkpoint backfill_2024.jsonl
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from core.config import settings
+from core.logging_config import setup_logging
+from core.database import SessionLocal, engine
+from crud.fund_nav import replace_fund_navs
+from models import base as models
+from models.fund_nav import FundNavHistory
+from utils.fund_data_manager import fund_data_manager
+from utils.fund_parsers import parse_nav_history, parse_nav_page_count
+from utils.parse_executor import run_parse
+from utils.upstream import UpstreamUnavailable, upstream_get
+
+logger = logging.getLogger(__name__)
+
+# F10DataApi 单页最大条数
+PAGE_SIZE = 50
+
+
+class RateLimiter:
+    """令牌桶限速（线程安全），rate 为每秒请求数，burst 为允许的突发请求数"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class Checkpoint:
+    """
+    追加写入的检查点文件（JSON Lines）
+
+        {"sdate": ..., "edate": ...}                                  第一行，回填区间
+        {"fund_code": ..., "page": ..., "pages": ..., "rows": ...}    已写入数据库的页
+        {"fund_code": ..., "completed": true}                         所有页已写入的基金
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.header: Optional[Dict] = None
+        self.done_pages: Dict[str, Set[int]] = defaultdict(set)
+        self.page_counts: Dict[str, int] = {}
+        self.completed: Set[str] = set()
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程被强制终止时最后一行可能不完整
+                    continue
+                if "sdate" in record:
+                    self.header = record
+                elif record.get("completed"):
+                    self.completed.add(record["fund_code"])
+                else:
+                    self.done_pages[record["fund_code"]].add(record["page"])
+                    self.page_counts[record["fund_code"]] = record["pages"]
+
+    def _append(self, records: List[Dict]):
+        with self.lock:
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def write_header(self, sdate: str, edate: str):
+        self.header = {"sdate": sdate, "edate": edate}
+        self._append([self.header])
+
+    def record_pages(self, pages: List[Tuple[str, int, int, int]]):
+        """记录已写入数据库的页，返回本次全部完成的基金"""
+        records = []
+        finished = []
+        for fund_code, page, page_count, rows in pages:
+            records.append({"fund_code": fund_code, "page": page, "pages": page_count, "rows": rows})
+            self.done_pages[fund_code].add(page)
+            self.page_counts[fund_code] = page_count
+            if len(self.done_pages[fund_code]) >= page_count and fund_code not in self.completed:
+                self.completed.add(fund_code)
+                finished.append(fund_code)
+                records.append({"fund_code": fund_code, "completed": True})
+        self._append(records)
+        return finished
+
+    def close(self):
+        self._file.close()
+
+
+class NavWriter(threading.Thread):
+    """写入线程：攒批写入数据库，提交后再更新检查点"""
+
+    _STOP = object()
+
+    def __init__(self, checkpoint: Checkpoint, batch_size: int):
+        super().__init__(name="nav-backfill-writer", daemon=True)
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.queue: "queue.Queue" = queue.Queue(maxsize=256)
+        self.rows_written = 0
+        self.funds_completed = 0
+        self.failed_pages = 0
+
+    def put(self, fund_code: str, page: int, page_count: int, rows: List[Dict]):
+        self.queue.put((fund_code, page, page_count, rows))
+
+    def stop(self):
+        self.queue.put(self._STOP)
+        self.join()
+
+    def run(self):
+        rows: List[Dict] = []
+        pages: List[Tuple[str, int, int, int]] = []
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=1)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                stopping = True
+            elif item is not None:
+                fund_code, page, page_count, page_rows = item
+                rows.extend(page_rows)
+                pages.append((fund_code, page, page_count, len(page_rows)))
+
+            # 攒够一批、队列空闲或退出时写入
+            if pages and (stopping or item is None or len(rows) >= self.batch_size):
+                try:
+                    self._flush(rows, pages)
+                except Exception as e:
+                    # 写入失败的页不记录到检查点，续跑时会重新请求
+                    logger.error("写入净值失败: %d 页, 错误: %s", len(pages), e)
+                    self.failed_pages += len(pages)
+                rows, pages = [], []
+
+    def _flush(self, rows: List[Dict], pages: List[Tuple[str, int, int, int]]):
+        db = SessionLocal()
+        try:
+            self.rows_written += replace_fund_navs(db, rows)
+        finally:
+            db.close()
+        self.funds_completed += len(self.checkpoint.record_pages(pages))
+
+
+class NavBackfill:
+    def __init__(self, sdate: str, edate: str, checkpoint: Checkpoint, workers: int, rate: float,
+                 retries: int, batch_size: int):
+        self.sdate = sdate
+        self.edate = edate
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.retries = retries
+        self.rate = rate
+        self.writer = NavWriter(checkpoint, batch_size)
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        self.requests = 0
+        self.failed_pages: List[Tuple[str, int]] = []
+
+    def _limiter(self, url: str) -> RateLimiter:
+        host = urlsplit(url).netloc
+        with self._limiters_lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(self.rate)
+            return limiter
+
+    def _get(self, url: str, headers: Dict):
+        """按主机限速请求；上游熔断/并发已满/网络错误/5xx 时指数退避重试"""
+        for attempt in range(self.retries + 1):
+            self._limiter(url).acquire()
+            with self._limiters_lock:
+                self.requests += 1
+            try:
+                response = upstream_get(url, headers=headers, timeout=15)
+                response.raise_for_status()
+                return response
+            except (UpstreamUnavailable, requests.exceptions.RequestException) as e:
+                if attempt == self.retries:
+                    raise
+                delay = min(30.0, 0.5 * 2 ** attempt)
+                logger.warning("请求失败，%.1f秒后重试: %s, 错误: %s", delay, url, e)
+                time.sleep(delay)
+
+    def fetch_page(self, fund_code: str, page: int) -> Tuple[List[Dict], int]:
+        """请求并解析一页净值，返回 (净值行, 总页数)"""
+        url = (f"{settings.EASTMONEY_BASE_URL}/f10/F10DataApi.aspx?type=lsjz&code={fund_code}"
+               f"&page={page}&sdate={self.sdate}&edate={self.edate}&per={PAGE_SIZE}")
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': f'{settings.EASTMONEY_BASE_URL}/{fund_code}.html',
+        }
+        response = self._get(url, headers)
+        counts = parse_nav_page_count(response.content, response.encoding)
+        if counts is None:
+            # 不是正常的净值页，不能当作空基金标记完成，记为失败页
+            raise ValueError("响应中没有分页信息")
+        _, page_count = counts
+        parsed = run_parse(parse_nav_history, response.content, response.encoding)
+        rows = []
+        for nav_date, unit_nav, _, daily_growth_value in (parsed[0] if parsed else []):
+            try:
+                rows.append({
+                    "fund_code": fund_code,
+                    "nav_date": datetime.strptime(nav_date, "%Y-%m-%d").date(),
+                    "unit_nav": unit_nav,
+                    "daily_growth": daily_growth_value,
+                })
+            except ValueError:
+                continue
+        return rows, page_count
+
+    def run(self, fund_codes: List[str]) -> Dict:
+        start = time.perf_counter()
+        todo = [code for code in fund_codes if code not in self.checkpoint.completed]
+        skipped = len(fund_codes) - len(todo)
+
+        # 任务: (基金代码, 页码)；总页数已知的基金（上次中断）直接加入未完成的页
+        work = deque()
+        for code in todo:
+            page_count = self.checkpoint.page_counts.get(code)
+            if page_count is None:
+                work.append((code, 1))
+            else:
+                work.extend((code, page) for page in range(1, page_count + 1)
+                            if page not in self.checkpoint.done_pages[code])
+
+        self.writer.start()
+        max_in_flight = self.workers * 4
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="nav-backfill") as pool:
+            in_flight = {}
+            while work or in_flight:
+                # 有界提交，避免一次为整个目录创建任务
+                while work and len(in_flight) < max_in_flight:
+                    code, page = work.popleft()
+                    in_flight[pool.submit(self.fetch_page, code, page)] = (code, page)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    code, page = in_flight.pop(future)
+                    try:
+                        rows, page_count = future.result()
+                    except Exception as e:
+                        logger.error("回填失败: %s 第%s页, 错误: %s", code, page, e)
+                        self.failed_pages.append((code, page))
+                        continue
+                    # 没有净值的基金（records:0,pages:0）也记为1页，标记完成
+                    page_count = max(page_count, 1)
+                    if page == 1 and code not in self.checkpoint.page_counts:
+                        # 其余页放到队首，让基金尽快整体完成
+                        work.extendleft((code, p) for p in range(page_count, 1, -1))
+                    self.writer.put(code, page, page_count, rows)
+        self.writer.stop()
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "funds": len(fund_codes),
+            "skipped": skipped,
+            "completed": self.writer.funds_completed,
+            "rows": self.writer.rows_written,
+            "requests": self.requests,
+            "failed_pages": len(self.failed_pages) + self.writer.failed_pages,
+            "seconds": round(elapsed, 2),
+            "requests_per_second": round(self.requests / elapsed, 2) if elapsed else 0.0,
+        }
+        logger.info("净值回填完成: %s", stats)
+        return stats
+
+
+def _load_fund_codes(args) -> List[str]:
+    if args.codes:
+        codes = args.codes.split(",")
+    elif args.codes_file:
+        with open(args.codes_file, encoding="utf-8") as f:
+            codes = f.read().split()
+    else:
+        fund_data_manager.load()
+        codes = [fund.get("fund_code") for fund in fund_data_manager.funds_data]
+    # 去重并保持顺序
+    return list(dict.fromkeys(code.strip() for code in codes if code and code.strip()))
+
+
+def run_backfill(fund_codes: List[str], sdate: str = "", edate: Optional[str] = None,
+                 checkpoint_path: str = "nav_backfill.checkpoint.jsonl", workers: int = 8, rate: float = 10,
+                 retries: int = 3, batch_size: int = 2000) -> Dict:
+    """回填一组基金的历史净值，返回统计信息"""
+    models.Base.metadata.create_all(bind=engine, tables=[FundNavHistory.__table__])
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        header = checkpoint.header
+        if header is None:
+            checkpoint.write_header(sdate, edate or date.today().isoformat())
+        elif {"sdate": sdate or header["sdate"], "edate": edate or header["edate"]} != header:
+            raise ValueError(f"检查点 {checkpoint_path} 的回填区间为 {checkpoint.header}，更换区间请使用新的检查点文件")
+        backfill = NavBackfill(checkpoint.header["sdate"], checkpoint.header["edate"], checkpoint,
+                               workers, rate, retries, batch_size)
+        return backfill.run(fund_codes)
+    finally:
+        checkpoint.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分页回填基金历史净值")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--codes", help="逗号分隔的基金代码")
+    source.add_argument("--codes-file", help="基金代码文件（空白分隔）")
+    source.add_argument("--all", action="store_true", help="回填整个基金目录（默认）")
+    parser.add_argument("--sdate", default="", help="开始日期 YYYY-MM-DD（默认全部历史）")
+    parser.add_argument("--edate", help="结束日期 YYYY-MM-DD（默认今天，续跑时沿用检查点中的日期）")
+    parser.add_argument("--checkpoint", default="nav_backfill.checkpoint.jsonl", help="检查点文件")
+    parser.add_argument("--workers", type=int, default=8, help="并发请求线程数")
+    parser.add_argument("--rate", type=float, default=10, help="每个上游主机每秒最多请求数，0表示不限速")
+    parser.add_argument("--retries", type=int, default=3, help="每页失败重试次数")
+    parser.add_argument("--batch-size", type=int, default=2000, help="每批写入的行数")
+    args = parser.parse_args()
+
+    setup_logging()
+    stats = run_backfill(_load_fund_codes(args), args.sdate, args.edate, args.checkpoint,
+                         args.workers, args.rate, args.retries, args.batch_size)
+    if stats["failed_pages"]:
+        # 非0退出，便于 cron/CI 发现；再次执行同一命令会只重试失败的页
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
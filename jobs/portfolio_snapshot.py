@@ -0,0 +1,171 @@
+# jobs/portfolio_snapshot.py
+"""
+每日组合快照
+
+按当日最终净值为每个用户的持仓估值，把 (用户, 日期, 成本, 市值, 收益) 写入 portfolio_snapshots 表，
+历史走势图直接读表，不需要每次查看时用净值历史重新计算。
+
+流程:
+    1. 查询所有持仓涉及的基金代码（去重），取快照日期当天（或之前最近一个交易日）的单位净值：
+       先查 fund_nav_history 表（jobs.nav_backfill 回填），没有时只请求快照日期前后的一小段净值，任意历史日期都能补录
+    2. 按用户分块，多个线程并行处理：每块一次查询取出持仓，计算后批量写入
+
+重复执行同一天会覆盖当天已有的快照。建议在净值公布后（如每个交易日 23:30）由 cron 执行:
+    30 23 * * 1-5 cd /path/to/app && python -m jobs.portfolio_snapshot
+补录某一天:
+    python -m jobs.portfolio_snapshot --date 2024-05-10
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from core.logging_config import setup_logging
+from core.database import SessionLocal, engine
+from crud.fund_nav import get_fund_nav_history
+from crud.portfolio import replace_portfolio_snapshots
+from models import base as models
+from models.fund_nav import FundNavHistory
+from models.portfolio import PortfolioSnapshot
+from models.user import UserFund
+from utils.fund_calculator import FundCalculator
+
+logger = logging.getLogger(__name__)
+
+# 快照日期向前查找的天数（覆盖节假日，确保能找到快照日期之前最近的净值）
+NAV_LOOKBACK_DAYS = 10
+
+
+def _distinct_fund_codes() -> List[str]:
+    db = SessionLocal()
+    try:
+        return [row.fund_code for row in db.query(UserFund.fund_code).distinct().all()]
+    finally:
+        db.close()
+
+
+def _user_ids() -> List[int]:
+    db = SessionLocal()
+    try:
+        return [row.user_id for row in db.query(UserFund.user_id).distinct().order_by(UserFund.user_id).all()]
+    finally:
+        db.close()
+
+
+def _nav_on(calculator: FundCalculator, fund_code: str, snapshot_date: date) -> Optional[float]:
+    """快照日期当天（或之前最近一个交易日）的单位净值"""
+    start_date = snapshot_date - timedelta(days=NAV_LOOKBACK_DAYS)
+    db = SessionLocal()
+    try:
+        rows = get_fund_nav_history(db, fund_code, start_date, snapshot_date)
+    finally:
+        db.close()
+    # 表中按日期升序
+    for row in reversed(rows):
+        if row.unit_nav is not None:
+            return row.unit_nav
+
+    try:
+        navs = calculator.get_fund_nav_range(fund_code, start_date.isoformat(), snapshot_date.isoformat())
+    except Exception as e:
+        logger.error("获取净值失败: %s, 错误: %s", fund_code, e)
+        return None
+    navs = [row for row in navs if row["date"] <= snapshot_date.isoformat() and row.get("unit_nav") is not None]
+    return max(navs, key=lambda row: row["date"])["unit_nav"] if navs else None
+
+
+def fetch_navs(fund_codes: List[str], snapshot_date: date, workers: int) -> Dict[str, float]:
+    """并发获取所有基金的快照日净值（每个代码只请求一次）"""
+    calculator = FundCalculator()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot-nav") as pool:
+        navs = dict(zip(fund_codes, pool.map(lambda code: _nav_on(calculator, code, snapshot_date), fund_codes)))
+    missing = [code for code, nav in navs.items() if nav is None]
+    if missing:
+        logger.warning("%d 个基金没有 %s 的净值，估值时跳过: %s", len(missing), snapshot_date, missing[:20])
+    return {code: nav for code, nav in navs.items() if nav is not None}
+
+
+def snapshot_chunk(user_ids: List[int], navs: Dict[str, float], snapshot_date: date) -> int:
+    """计算并写入一块用户的快照"""
+    db = SessionLocal()
+    try:
+        holdings = (
+            db.query(UserFund.user_id, UserFund.fund_code, UserFund.cost_price, UserFund.shares)
+            .filter(UserFund.user_id.in_(user_ids))
+            .all()
+        )
+        totals = defaultdict(lambda: {"cost": 0.0, "value": 0.0, "fund_count": 0})
+        for user_id, fund_code, cost_price, shares in holdings:
+            nav = navs.get(fund_code)
+            if nav is None:
+                continue
+            total = totals[user_id]
+            total["cost"] += cost_price * shares
+            total["value"] += nav * shares
+            total["fund_count"] += 1
+
+        rows = [
+            {
+                "user_id": user_id,
+                "cost": round(total["cost"], 2),
+                "value": round(total["value"], 2),
+                "profit": round(total["value"] - total["cost"], 2),
+                "fund_count": total["fund_count"],
+            }
+            for user_id, total in totals.items()
+        ]
+        return replace_portfolio_snapshots(db, snapshot_date, rows)
+    finally:
+        db.close()
+
+
+def run_snapshot(snapshot_date: date, workers: int = 8, chunk_size: int = 500) -> Dict:
+    """生成某一天的组合快照，返回统计信息"""
+    start = time.perf_counter()
+    models.Base.metadata.create_all(bind=engine, tables=[PortfolioSnapshot.__table__, FundNavHistory.__table__])
+
+    fund_codes = _distinct_fund_codes()
+    navs = fetch_navs(fund_codes, snapshot_date, workers)
+    nav_elapsed = time.perf_counter() - start
+
+    user_ids = _user_ids()
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot-chunk") as pool:
+        written = sum(pool.map(lambda chunk: snapshot_chunk(chunk, navs, snapshot_date), chunks))
+
+    stats = {
+        "date": snapshot_date.isoformat(),
+        "funds": len(fund_codes),
+        "funds_valued": len(navs),
+        "users": len(user_ids),
+        "snapshots": written,
+        "nav_seconds": round(nav_elapsed, 2),
+        "total_seconds": round(time.perf_counter() - start, 2),
+    }
+    logger.info("组合快照完成: %s", stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成每日组合快照")
+    parser.add_argument("--date", help="快照日期 YYYY-MM-DD（默认今天）")
+    parser.add_argument("--workers", type=int, default=8, help="并行线程数")
+    parser.add_argument("--chunk-size", type=int, default=500, help="每块用户数")
+    args = parser.parse_args()
+
+    setup_logging()
+    snapshot_date = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else date.today()
+    run_snapshot(snapshot_date, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
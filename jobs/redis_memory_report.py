@@ -0,0 +1,117 @@
+# jobs/redis_memory_report.py
+"""
+Redis 内存按键命名空间统计
+
+命名空间取键名第一个冒号之前的部分（fund_info:000001 -> fund_info，没有冒号的键自成一类），
+用 SCAN 遍历键（不阻塞 Redis），每个命名空间最多对 --sample 个键执行 MEMORY USAGE，按平均值估算总量:
+    python -m jobs.redis_memory_report
+    python -m jobs.redis_memory_report --match "fund_nav*" --sample 0   # 0 表示逐个统计
+    python -m jobs.redis_memory_report --json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from core.logging_config import setup_logging
+from core.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 每批 MEMORY USAGE 的键数（一次管道往返）
+BATCH_SIZE = 500
+
+
+def namespace_of(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def collect(match: Optional[str] = None, sample: int = 200, scan_count: int = 1000) -> List[Dict]:
+    """按命名空间统计键数与内存占用（字节，抽样时为估算值），按占用从大到小排序"""
+    counts: Dict[str, int] = defaultdict(int)
+    measured: Dict[str, List[int]] = defaultdict(list)
+    batch: List[str] = []
+
+    def measure():
+        pipe = redis_client.pipeline(transaction=False)
+        for key in batch:
+            pipe.memory_usage(key, samples=0)
+        for key, usage in zip(batch, pipe.execute()):
+            # 遍历期间过期的键返回 None
+            if usage is not None:
+                measured[namespace_of(key)].append(usage)
+        batch.clear()
+
+    for key in redis_client.scan_iter(match=match, count=scan_count):
+        namespace = namespace_of(key)
+        counts[namespace] += 1
+        if sample <= 0 or counts[namespace] <= sample:
+            batch.append(key)
+            if len(batch) >= BATCH_SIZE:
+                measure()
+    if batch:
+        measure()
+
+    total = 0.0
+    report = []
+    for namespace, count in counts.items():
+        usages = measured.get(namespace) or [0]
+        average = sum(usages) / len(usages)
+        estimated = average * count
+        total += estimated
+        report.append({
+            "namespace": namespace,
+            "keys": count,
+            "sampled": len(measured.get(namespace, [])),
+            "bytes": int(estimated),
+            "avg_bytes": round(average, 1),
+        })
+    for row in report:
+        row["share"] = round(row["bytes"] / total * 100, 2) if total else 0.0
+    report.sort(key=lambda row: row["bytes"], reverse=True)
+    return report
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def print_report(report: List[Dict]):
+    print(f"{'命名空间':<28}{'键数':>10}{'抽样':>8}{'内存':>12}{'平均':>12}{'占比':>8}")
+    for row in report:
+        print(f"{row['namespace']:<32}{row['keys']:>10}{row['sampled']:>8}{_format_bytes(row['bytes']):>12}"
+              f"{_format_bytes(row['avg_bytes']):>12}{row['share']:>7.1f}%")
+    print(f"合计 {sum(row['keys'] for row in report)} 个键, {_format_bytes(sum(row['bytes'] for row in report))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis 内存按键命名空间统计")
+    parser.add_argument("--match", help="只统计匹配该模式的键（SCAN MATCH）")
+    parser.add_argument("--sample", type=int, default=200, help="每个命名空间最多统计的键数，0表示全部统计")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args()
+
+    setup_logging()
+    start = time.perf_counter()
+    report = collect(args.match, args.sample)
+    logger.info("Redis 内存统计完成，耗时 %.2f 秒", time.perf_counter() - start)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
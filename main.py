@@ -1,16 +1,137 @@
-from fastapi import FastAPI, Depends, HTTPException
+import argparse
+import asyncio
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from core.database import SessionLocal, engine
+from core.database import (
+    SessionLocal, engine, redis_client, async_redis_client, redis_bytes_client, async_redis_bytes_client,
+)
 from models import base as models
+from models.user import UserFund
 from core.config import settings
-from routers import auth, user, funds
+from core.logging_config import RequestContextMiddleware, setup_logging, shutdown_logging
+from routers import auth, user, funds, admin, portfolio, alerts, frontend
+from utils.alert_engine import ensure_index, run_refresher
+from utils.fund_calculator import FundCalculator, shutdown_hedge_executor
+from utils.fund_data_manager import fund_data_manager
+from utils.hot_funds import flush_accesses, run_maintainer, sync_hot_set
+from utils.parse_executor import shutdown_parse_executor
+from utils.password import shutdown_hash_executor
+from utils.static_assets import build_frontend, get_frontend
+from utils.upstream import close_sessions
+
+# 配置日志（队列 + 后台写入线程）
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def _popular_fund_codes(limit: int):
+    """持仓人数最多的基金代码"""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(UserFund.fund_code)
+            .group_by(UserFund.fund_code)
+            .order_by(func.count(UserFund.id).desc())
+            .limit(limit)
+            .all()
+        )
+        return [row.fund_code for row in rows]
+    finally:
+        db.close()
+
+
+async def _initialize():
+    """启动初始化（完成后才开始接受请求）：建表、检查Redis连接、构建前端资源、检查提醒索引"""
+    await asyncio.gather(
+        # 创建数据库表
+        run_in_threadpool(models.Base.metadata.create_all, bind=engine),
+        run_in_threadpool(redis_client.ping),
+        async_redis_client.ping(),
+        run_in_threadpool(build_frontend, settings.FRONTEND_DIR),
+    )
+    # Redis 中的提醒索引丢失时从数据库重建
+    await run_in_threadpool(ensure_index)
+
+
+async def _warm_up(app: FastAPI):
+    """
+    后台预热：加载基金目录索引、同步热门基金集合、预取热门基金行情。
+    预热期间服务已在处理请求（基金目录首次使用时按需加载），/health 返回 503，
+    负载均衡在预热完成后才把流量切过来。预热失败只影响性能，同样标记为就绪。
+    """
+    try:
+        await run_in_threadpool(fund_data_manager.load)
+        if settings.HOT_FUNDS_ENABLED:
+            await run_in_threadpool(sync_hot_set)
+
+        if settings.WARMUP_FUND_LIMIT > 0:
+            codes = await run_in_threadpool(_popular_fund_codes, settings.WARMUP_FUND_LIMIT)
+            calculator = FundCalculator()
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(run_in_threadpool(calculator.get_fund_info, code) for code in codes)),
+                    timeout=settings.WARMUP_TIMEOUT_SECONDS,
+                )
+                logger.info("预热完成，预取 %d 个基金行情", len(codes))
+            except asyncio.TimeoutError:
+                # 行情预热只是优化，超时不影响就绪
+                logger.warning("行情预热超时（%s秒），继续启动", settings.WARMUP_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("预热失败，继续启动")
+    app.state.ready = True
+    logger.info("服务已就绪")
+
+
+async def _release_resources():
+    """按依赖顺序关闭连接池与后台进程池"""
+    await funds.close_search_session()
+    shutdown_hedge_executor()
+    close_sessions()
+    await run_in_threadpool(shutdown_parse_executor)
+    await run_in_threadpool(shutdown_hash_executor)
+    redis_client.connection_pool.disconnect()
+    redis_bytes_client.connection_pool.disconnect()
+    await async_redis_client.aclose(close_connection_pool=True)
+    await async_redis_bytes_client.aclose(close_connection_pool=True)
+    engine.dispose()
+    shutdown_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    await _initialize()
+    background = [asyncio.create_task(_warm_up(app))]
+    if settings.ALERT_REFRESHER_ENABLED:
+        background.append(asyncio.create_task(run_refresher()))
+    if settings.HOT_FUNDS_ENABLED:
+        background.append(asyncio.create_task(run_maintainer()))
+    try:
+        yield
+    finally:
+        # 先标记为未就绪，使负载均衡停止分发新请求
+        app.state.ready = False
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        # 合并最后一批热门基金访问计数
+        await run_in_threadpool(flush_accesses)
+        await _release_resources()
+        logger.info("服务已关闭")
 
-# 创建数据库表
-models.Base.metadata.create_all(bind=engine)
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -19,7 +140,9 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    lifespan=lifespan,
 )
+app.state.ready = False
 
 # 配置CORS中间件
 app.add_middleware(
@@ -29,25 +152,71 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# 挂载静态文件目录
-# app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# 压缩较大的API响应（前端资源已预压缩，带 Content-Encoding 的响应不会重复压缩）
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=settings.GZIP_LEVEL)
+# 请求ID与访问日志（最外层，耗时包含其他中间件）
+app.add_middleware(RequestContextMiddleware)
 
 # 注册路由
 app.include_router(auth.router, prefix="/api")
 app.include_router(user.router, prefix="/api")
 app.include_router(funds.router, prefix="/api", tags=["funds"])
+app.include_router(admin.router, prefix="/api")
+app.include_router(portfolio.router, prefix="/api")
+app.include_router(alerts.router, prefix="/api")
 # app.include_router(funds.router, prefix="/api")
+# 前端页面与静态资源（/index.html、/static/...）
+app.include_router(frontend.router)
 
 @app.get("/")
-async def root():
+async def root(request: Request):
+    # 有前端页面时首页直接返回 index.html
+    frontend_assets = get_frontend()
+    if frontend_assets is not None and "index.html" in frontend_assets.pages:
+        return await frontend.page("index", request)
     return {"message": "欢迎使用基金查询网站API", "status": "运行正常"}
 
 @app.get("/health")
 async def health_check():
+    """就绪检查：后台预热完成前及关闭过程中返回 503"""
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
     return {"status": "healthy"}
-    
 
-if __name__ == "__main__":
+
+def _optional_impl(module: str, fallback: str) -> str:
+    """已安装可选加速实现（uvloop / httptools）时使用，否则回退到标准实现"""
+    if importlib.util.find_spec(module) is not None:
+        return module
+    logger.warning("未安装 %s，使用 %s", module, fallback)
+    return fallback
+
+
+def run():
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8888, reload=True)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="基金管理平台服务")
+    parser.add_argument("--prod", action="store_true", help="生产模式（多进程，不自动重载）")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS, help="生产模式的工作进程数")
+    args = parser.parse_args()
+
+    if args.prod or settings.APP_ENV == "production":
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=args.workers,
+            loop=_optional_impl("uvloop", "asyncio"),
+            http=_optional_impl("httptools", "h11"),
+            proxy_headers=True,
+            timeout_graceful_shutdown=settings.SHUTDOWN_TIMEOUT_SECONDS,
+            # 使用 core/logging_config 的日志配置，访问日志由 RequestContextMiddleware 记录
+            log_config=None,
+            access_log=False,
+        )
+    else:
+        uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, reload=True, log_config=None, access_log=False)
+
+
+if __name__ == "__main__":
+    run()
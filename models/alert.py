@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index
+from .base import Base
+from datetime import datetime
+
+class FundAlert(Base):
+    """用户设置的基金涨跌提醒（估算涨跌幅达到阈值时通知）"""
+    __tablename__ = 'fund_alerts'
+    __table_args__ = (
+        Index('ix_fund_alerts_user_fund', 'user_id', 'fund_code'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    fund_code = Column(String(20), nullable=False, index=True)
+    rise_threshold = Column(Float)  # 涨幅达到该值（%）时提醒，如 3.0
+    fall_threshold = Column(Float)  # 跌幅达到该值（%）时提醒，如 -3.0
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
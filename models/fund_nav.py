@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Float, Date, UniqueConstraint
+from .base import Base
+
+class FundNavHistory(Base):
+    """基金历史净值（由 jobs/nav_backfill.py 分页回填）"""
+    __tablename__ = 'fund_nav_history'
+    # (fund_code, nav_date) 唯一索引，按基金查询区间只需一次索引扫描
+    __table_args__ = (
+        UniqueConstraint('fund_code', 'nav_date', name='uq_fund_nav_history_code_date'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    fund_code = Column(String(20), nullable=False)
+    nav_date = Column(Date, nullable=False)
+    unit_nav = Column(Float, nullable=False)  # 单位净值
+    daily_growth = Column(Float)  # 日增长率（%），暂停申赎等情况为空
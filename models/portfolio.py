@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, UniqueConstraint
+from .base import Base
+from datetime import datetime
+
+class PortfolioSnapshot(Base):
+    """用户组合每日快照（由 jobs/portfolio_snapshot.py 每晚按当日最终净值生成）"""
+    __tablename__ = 'portfolio_snapshots'
+    # (user_id, snapshot_date) 唯一索引，区间查询只需一次索引扫描
+    __table_args__ = (
+        UniqueConstraint('user_id', 'snapshot_date', name='uq_portfolio_snapshot_user_date'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    snapshot_date = Column(Date, nullable=False)
+    cost = Column(Float, nullable=False)  # 持仓成本
+    value = Column(Float, nullable=False)  # 按当日净值计算的市值
+    profit = Column(Float, nullable=False)  # 持有收益
+    fund_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
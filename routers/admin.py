@@ -0,0 +1,78 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from core.database import engine
+from core.db_pool import get_pool_stats
+from core.dependencies import get_admin_user
+from utils.profiler import list_profiles, get_profile_file
+from utils.upstream import get_upstream_stats, get_gate_stats
+from utils.fund_calculator import get_hedge_stats
+from utils.hot_funds import get_hot_funds
+from utils.batch_valuation import MEDIA_TYPES, format_valuations, iter_valuations
+from utils.parse_executor import get_parse_stats
+from utils.password import get_hash_stats
+from utils.search_cache import get_search_cache_stats
+import schemas
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/profiles")
+def get_profiles(
+    limit: int = 50,
+    current_user: schemas.User = Depends(get_admin_user)
+):
+    """列出最近的请求性能剖析结果"""
+    return list_profiles(limit)
+
+@router.get("/profiles/{profile_id}")
+def download_profile(
+    profile_id: str,
+    current_user: schemas.User = Depends(get_admin_user)
+):
+    """下载剖析文件（.prof 或 .collapsed 火焰图数据）"""
+    path = get_profile_file(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.rsplit("/", 1)[-1])
+
+@router.get("/upstream")
+def upstream_status(current_user: schemas.User = Depends(get_admin_user)):
+    """各上游主机的熔断状态、自适应并发限制、全局并发排队、行情对冲、搜索缓存与预取以及解析进程池统计"""
+    return {
+        "hosts": get_upstream_stats(),
+        "global": get_gate_stats(),
+        "hedging": get_hedge_stats(),
+        "search": get_search_cache_stats(),
+        "parsing": get_parse_stats(),
+    }
+
+@router.get("/database")
+def database_status(current_user: schemas.User = Depends(get_admin_user)):
+    """数据库连接池：取出/归还/新建连接次数、取连接等待耗时与超时次数"""
+    return get_pool_stats(engine)
+
+@router.get("/hashing")
+def hashing_status(current_user: schemas.User = Depends(get_admin_user)):
+    """密码哈希进程池排队深度与降载统计"""
+    return get_hash_stats()
+
+@router.get("/hot-funds")
+def hot_funds(
+    limit: int = 100,
+    current_user: schemas.User = Depends(get_admin_user)
+):
+    """当前访问最多的基金（近似计数与误差上限）及热门集合，用于容量规划"""
+    return get_hot_funds(limit)
+
+@router.get("/valuation")
+def batch_valuation(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="输出格式 ndjson / csv"),
+    current_user: schemas.User = Depends(get_admin_user)
+):
+    """所有用户的组合估值（每个基金只获取一次行情，按用户逐行流式输出）"""
+    filename = f"valuation_{datetime.now():%Y%m%d}.{format}"
+    return StreamingResponse(
+        format_valuations(iter_valuations(), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,85 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+import schemas
+from core.database import get_db
+from core.dependencies import get_current_user
+from crud import alert as alert_crud
+from utils.alert_engine import index_alert, unindex_alert
+from utils.fund_data_manager import fund_data_manager
+from utils.notifier import LocalNotifier, get_notifier
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+
+
+def _validate_alert(alert: schemas.AlertCreate):
+    if alert.rise_threshold is None and alert.fall_threshold is None:
+        raise HTTPException(status_code=400, detail="涨幅和跌幅阈值至少设置一个")
+    if fund_data_manager.get_by_code(alert.fund_code) is None:
+        raise HTTPException(status_code=400, detail="基金目录中不存在该代码")
+
+
+@router.get("/", response_model=List[schemas.Alert])
+def get_alerts(
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    return alert_crud.get_user_alerts(db, current_user.id)
+
+
+@router.post("/", response_model=schemas.Alert)
+def create_alert(
+    alert: schemas.AlertCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    _validate_alert(alert)
+    db_alert = alert_crud.create_alert(db, alert, current_user.id)
+    index_alert(db_alert)
+    return db_alert
+
+
+@router.get("/notifications", response_model=List[schemas.AlertEvent])
+def get_notifications(
+    limit: int = Query(50, ge=1, le=100),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    最近触发的提醒（仅 ALERT_NOTIFIER=local 时保存在服务端 Redis 中，其他通知方式返回空列表）
+    """
+    notifier = get_notifier()
+    if not isinstance(notifier, LocalNotifier):
+        return []
+    return notifier.recent(current_user.id, limit)
+
+
+@router.put("/{alert_id}", response_model=schemas.Alert)
+def update_alert(
+    alert_id: int,
+    alert: schemas.AlertCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    _validate_alert(alert)
+    db_alert = alert_crud.get_user_alert(db, current_user.id, alert_id)
+    if not db_alert:
+        raise HTTPException(status_code=404, detail="提醒不存在")
+    previous_fund_code = db_alert.fund_code
+    db_alert = alert_crud.update_alert(db, current_user.id, alert_id, alert)
+    index_alert(db_alert, previous_fund_code)
+    return db_alert
+
+
+@router.delete("/{alert_id}")
+def delete_alert(
+    alert_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    db_alert = alert_crud.delete_alert(db, current_user.id, alert_id)
+    if not db_alert:
+        raise HTTPException(status_code=404, detail="提醒不存在")
+    unindex_alert(alert_id, db_alert.fund_code)
+    return {"message": "提醒已删除"}
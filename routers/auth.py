@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 import schemas
 from crud import user as user_crud
 from utils.jwt import create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from core.database import get_db
+from core.database import get_db, read_and_release
+from utils.password import hash_password_async, verify_and_update_async, HashingOverloaded
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -21,26 +23,49 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         )
     return user
 
+def _hashing_overloaded():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="请求过多，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
+
+# 登录/注册为异步路由：密码哈希在独立的进程池中执行，不占用共享线程池，数据库操作放到线程池中执行
 @router.post("/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = user_crud.get_user_by_username(db, username=user.username)
-    db_user_email = user_crud.get_user_by_email(db, email=user.email)
-    if db_user:
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    # 用户名与邮箱一次查询；查询后归还连接，密码哈希期间不占用
+    existing = await run_in_threadpool(
+        read_and_release, db, user_crud.get_users_by_username_or_email, user.username, user.email
+    )
+    if any(db_user.username == user.username for db_user in existing):
         raise HTTPException(status_code=400, detail="该用户名已存在！")
-    # db_user = user_crud.get_user_by_email(db, email=user.email)
-    if db_user_email:
+    if existing:
         raise HTTPException(status_code=400, detail="该邮箱已被使用！")
-    return user_crud.create_user(db=db, user=user)
+    try:
+        hashed_password = await hash_password_async(user.password)
+    except HashingOverloaded:
+        raise _hashing_overloaded()
+    return await run_in_threadpool(user_crud.create_user, db=db, user=user, hashed_password=hashed_password)
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = user_crud.authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Incorrect username or password",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user = await run_in_threadpool(read_and_release, db, user_crud.get_user_by_username, form_data.username)
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise credentials_exception
+    try:
+        verified, new_hash = await verify_and_update_async(form_data.password, user.hashed_password)
+    except HashingOverloaded:
+        raise _hashing_overloaded()
+    if not verified:
+        raise credentials_exception
+    if new_hash:
+        # 哈希轮数配置已变化，透明地更新存量哈希
+        await run_in_threadpool(user_crud.update_user_password_hash, db, user, new_hash)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
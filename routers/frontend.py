@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from utils.static_assets import Asset, get_frontend
+
+# 前端页面与静态资源（不属于API，不出现在接口文档中）
+router = APIRouter(include_in_schema=False)
+
+
+def _serve(asset: Asset, request: Request) -> Response:
+    headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == asset.etag:
+        return Response(status_code=304, headers=headers)
+    encoding, body = asset.select(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.media_type, headers=headers)
+
+
+@router.get("/static/{name}")
+async def static_asset(name: str, request: Request):
+    frontend = get_frontend()
+    asset = frontend.assets.get(name) if frontend else None
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _serve(asset, request)
+
+
+@router.get("/{page}.html")
+async def page(page: str, request: Request):
+    frontend = get_frontend()
+    asset = frontend.pages.get(f"{page}.html") if frontend else None
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _serve(asset, request)
@@ -1,20 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
+import json
+import logging
+from urllib.parse import quote
 from core.dependencies import get_current_user
 import schemas
 # from schemas import user as user_schemas
 from crud import user as user_crud
 from routers import auth
-from core.database import get_db
+from core.database import get_db, read_and_release, async_redis_client
+from core.config import settings
 from utils.fund_calculator import FundCalculator
 from datetime import datetime
-import aiohttp
 from utils.fund_data_manager import fund_data_manager
+from utils.portfolio_view import PortfolioView, SORT_FIELDS, FILTERS
+from utils.profiler import RequestProfiler
+from utils.rate_limit import RateLimitResult, calculate_limiter, search_api_limiter
+from utils.search_cache import (
+    get_cached_search, set_cached_search, invalidate_local_search_cache, prefetch_quotes,
+)
+from utils.holdings_io import (
+    HoldingsFormatError, detect_format, parse_holdings, export_holdings_csv, export_holdings_json,
+)
 
+if TYPE_CHECKING:
+    import aiohttp
+
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/funds", tags=["funds"])
 
+# 第三方搜索接口共享的HTTP连接池（在事件循环中按需创建，应用退出时关闭）
+# aiohttp 导入较慢，只在第一次调用第三方搜索时导入
+_search_session: Optional["aiohttp.ClientSession"] = None
+
+
+def _get_search_session() -> "aiohttp.ClientSession":
+    global _search_session
+    if _search_session is None or _search_session.closed:
+        import aiohttp
+
+        _search_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=settings.UPSTREAM_CONCURRENCY_MAX)
+        )
+    return _search_session
+
+
+async def close_search_session():
+    """关闭第三方搜索接口的连接池"""
+    global _search_session
+    if _search_session is not None and not _search_session.closed:
+        await _search_session.close()
+    _search_session = None
+
 @router.post("/", response_model=schemas.Fund)
 def create_fund(
     fund: schemas.FundCreate,
@@ -30,109 +72,258 @@ def get_funds(
 ):
     return user_crud.get_user_funds(db=db, user_id=current_user.id)
 
+def _to_funds_data(funds) -> List[dict]:
+    return [
+        {
+            'fund_code': fund.fund_code,
+            'cost_price': fund.cost_price,
+            'shares': fund.shares
+        }
+        for fund in funds
+    ]
+
+
+@router.post("/import", response_model=schemas.HoldingsImportResult)
+async def import_funds(
+    file: UploadFile = File(..., description="CSV 或 JSON 持仓文件"),
+    replace: bool = Query(False, description="是否删除导入文件中没有的持仓"),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    批量导入持仓
+
+    按基金代码更新已有持仓，否则新增；分块批量写入，一次提交，最后只重新计算一次组合。
+    """
+    content = await file.read(settings.IMPORT_MAX_BYTES + 1)
+    if len(content) > settings.IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"导入文件不能超过 {settings.IMPORT_MAX_BYTES} 字节")
+
+    try:
+        rows, errors = await run_in_threadpool(
+            parse_holdings, content, detect_format(file.filename, file.content_type), settings.IMPORT_MAX_ROWS
+        )
+    except HoldingsFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if replace and not rows:
+        raise HTTPException(status_code=400, detail="没有有效的持仓，未执行替换")
+
+    inserted, updated, deleted = await run_in_threadpool(
+        user_crud.bulk_upsert_user_funds, db, current_user.id, rows, settings.IMPORT_CHUNK_SIZE, replace
+    )
+
+    # 导入完成后重新计算一次组合（同时预热行情缓存）
+    funds = await run_in_threadpool(read_and_release, db, user_crud.get_user_funds, user_id=current_user.id)
+    summary = await FundCalculator().calculate_portfolio_async(_to_funds_data(funds))
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "errors": errors,
+        "summary": summary,
+    }
+
+
+@router.get("/export")
+def export_funds(
+    format: str = Query("csv", pattern="^(csv|json)$", description="导出格式 csv / json"),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """导出持仓（导出文件可直接用于批量导入）"""
+    funds = user_crud.get_user_funds(db=db, user_id=current_user.id)
+    # 响应头只能是 latin-1：filename 用用户ID的 ASCII 文件名兜底，filename* 按 RFC 5987 携带含用户名的 UTF-8 文件名
+    today = f"{datetime.now():%Y%m%d}"
+    filename = f"holdings_{current_user.username}_{today}.{format}"
+    headers = {"Content-Disposition": f"attachment; filename=\"holdings_{current_user.id}_{today}.{format}\"; "
+                                      f"filename*=UTF-8''{quote(filename)}"}
+    if format == "json":
+        return JSONResponse(export_holdings_json(funds), headers=headers)
+    # 带 BOM，便于 Excel 正确识别中文
+    return Response(content="\ufeff" + export_holdings_csv(funds), media_type="text/csv; charset=utf-8",
+                    headers=headers)
+
+
 @router.get("/fund_info/{fund_code}")
-def get_fund_info(fund_code: str):
+async def get_fund_info(fund_code: str):
     calculator = FundCalculator()
-    return calculator.get_fund_info(fund_code)
+    return await calculator.get_fund_info_async(fund_code)
+
+
+def _summary_cache_key(user_id: int, view: PortfolioView) -> str:
+    return (f"portfolio_summary:{user_id}:{view.sort}:{view.order}:{view.filter or ''}:{view.fund_type or ''}"
+            f":{view.page}:{view.limit or ''}")
+
+
+def _calculate_profiled(profiler: RequestProfiler, calculator: FundCalculator, funds_data: List[dict],
+                        view: PortfolioView) -> dict:
+    with profiler:
+        return calculator.calculate_portfolio(funds_data, view)
 
 
 @router.get("/calculate", response_model=schemas.PortfolioSummary)
-def calculate_portfolio(
+async def calculate_portfolio(
+    request: Request,
+    response: Response,
+    sort: str = Query("change_rate", pattern=f"^({'|'.join(SORT_FIELDS)})$", description="明细排序字段"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    filter: Optional[str] = Query(None, pattern=f"^({'|'.join(FILTERS)})$", description="gainers 今日上涨 / losers 今日下跌"),
+    fund_type: Optional[str] = Query(None, description="按基金类型筛选，如 混合、货币"),
+    page: int = Query(1, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="每页基金数，不传时返回全部"),
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user),
+    rate_limit: RateLimitResult = Depends(calculate_limiter)
 ):
-    funds = user_crud.get_user_funds(db=db, user_id=current_user.id)
+    """
+    计算组合收益
+
+    汇总数据始终按整个组合计算；fund_details 按 sort / order 排序、按 filter / fund_type 筛选后分页返回，
+    净值历史只为返回的这一页获取。
+    """
+    view = PortfolioView(sort=sort, order=order, filter=filter, fund_type=fund_type, page=page, limit=limit)
+    if not rate_limit.allowed:
+        # 被限流时返回上次的计算结果，没有缓存时才返回429
+        cached = await async_redis_client.get(_summary_cache_key(current_user.id, view))
+        if cached:
+            response.headers["X-Degraded"] = "rate-limited"
+            return json.loads(cached)
+        raise HTTPException(
+            status_code=429,
+            detail="请求过于频繁，请稍后再试",
+            headers={"Retry-After": response.headers["Retry-After"]},
+        )
+
+    # 查询持仓后归还连接，计算期间（可能请求上游）不占用
+    funds = await run_in_threadpool(read_and_release, db, user_crud.get_user_funds, user_id=current_user.id)
     # if not funds:
     #     raise HTTPException(status_code=404, detail="No funds found")
     
-    funds_data = [
-        {
-            'fund_code': fund.fund_code,
-            'cost_price': fund.cost_price,
-            'shares': fund.shares
-        }
-        for fund in funds
-    ]
+    funds_data = _to_funds_data(funds)
     
     calculator = FundCalculator()
-    summary = calculator.calculate_portfolio(funds_data)
+    profiler = RequestProfiler.for_request(request, current_user, label="funds.calculate")
+    if profiler.enabled:
+        # 剖析器只记录当前线程：被剖析的请求在线程池中走同步计算，上游请求与解析都在这个工作线程内完成，
+        # 不会混入事件循环上其他请求的协程
+        summary = await run_in_threadpool(_calculate_profiled, profiler, calculator, funds_data, view)
+    else:
+        summary = await calculator.calculate_portfolio_async(funds_data, view)
+    await async_redis_client.setex(_summary_cache_key(current_user.id, view), settings.PORTFOLIO_SUMMARY_CACHE_TTL,
+                                   json.dumps(summary, ensure_ascii=False, default=str))
+
+    if profiler.enabled:
+        profiler.tag(
+            user_id=current_user.id,
+            portfolio_size=len(funds_data),
+            cache_hit_ratio=calculator.cache_hit_ratio(),
+        )
+        if profiler.save():
+            response.headers["X-Profile-Id"] = profiler.profile_id
     return summary
 
 
 @router.get("/search", response_model=List[dict])
 async def search_fund(
     q: str,
+    background_tasks: BackgroundTasks,
     limit: int = 10,
     current_user: schemas.User = Depends(get_current_user),
     use_api: bool = Query(False, description="是否使用第三方API")
 ):
     """
     搜索基金
+
+    本地目录的搜索结果会缓存（见 utils/search_cache.py），返回后在后台预取前几个结果的行情。
     """
     try:
-        if use_api:
-            # 使用第三方API
-            funds = await search_funds_from_api(q, limit)
-            # 将API返回的数据保存到本地
-            for fund in funds:
-                fund_data_manager.add_fund(
-                    fund["fund_code"],
-                    fund["fund_name"],
-                    fund.get("fund_type", "其他")
-                )
-        else:
-            # 使用本地数据
-            funds = fund_data_manager.search(q, limit)
-            
-            # 如果本地数据不足，自动调用API补充
-            if len(funds) < 5 and q:
-                try:
-                    api_funds = await search_funds_from_api(q, limit)
-                    funds = api_funds[:limit]  # 使用API结果
-                except:
-                    pass
-        
-        logger.info(f"搜索成功，返回 {len(funds)} 个结果")
+        funds = None if use_api else await get_cached_search(q, limit)
+        if funds is None:
+            funds = await _search_uncached(q, limit, use_api, current_user)
+        if settings.SEARCH_PREFETCH_COUNT > 0 and len(q.strip()) >= settings.SEARCH_PREFETCH_MIN_QUERY:
+            codes = [fund["fund_code"] for fund in funds[:settings.SEARCH_PREFETCH_COUNT] if fund.get("fund_code")]
+            background_tasks.add_task(prefetch_quotes, codes)
+        logger.debug("搜索成功，返回 %d 个结果", len(funds))
         return funds
     except Exception as e:
-        # logger.error(f"搜索失败: {str(e)}", exc_info=True)
-        print(f"搜索失败: {str(e)}")
+        logger.error("搜索失败: %s", e, exc_info=True)
         # 返回本地数据作为兜底
         return fund_data_manager.search(q, limit)
 
 
-async def search_funds_from_api(keyword: str, limit: int = 10) -> List[dict]:
+async def _search_uncached(q: str, limit: int, use_api: bool, current_user: schemas.User) -> List[dict]:
+    """搜索基金（未命中缓存时），只有本地目录的结果会写入缓存"""
+    # 第三方接口按用户限流，超出时只查本地目录
+    api_limited = use_api and not (await search_api_limiter.acquire(current_user.id)).allowed
+    if api_limited:
+        use_api = False
+
+    if use_api:
+        # 使用第三方API
+        funds = await search_funds_from_api(q, limit)
+        # 将API返回的数据保存到本地
+        for fund in funds:
+            fund_data_manager.add_fund(
+                fund["fund_code"],
+                fund["fund_name"],
+                fund.get("fund_type", "其他")
+            )
+        if funds:
+            invalidate_local_search_cache()
+    else:
+        # 使用本地数据
+        funds = fund_data_manager.search(q, limit)
+        
+        # 如果本地数据不足，自动调用API补充
+        if len(funds) < 5 and q:
+            if api_limited or not (await search_api_limiter.acquire(current_user.id)).allowed:
+                # 被限流跳过了第三方补充，结果不完整，不写入缓存
+                return funds
+            try:
+                api_funds = await search_funds_from_api(q, limit, raise_errors=True)
+            except Exception as e:
+                # 第三方补充失败，返回本地结果但不写入缓存，下次搜索再重试补充
+                logger.warning("搜索补充失败: %s, 错误: %s", q, e)
+                return funds
+            funds = api_funds[:limit]  # 使用API结果
+        await set_cached_search(q, limit, funds)
+    return funds
+
+
+async def search_funds_from_api(keyword: str, limit: int = 10, raise_errors: bool = False) -> List[dict]:
     """
     从第三方API搜索基金
     这里以天天基金网为例，实际请替换为您的第三方接口
+    raise_errors 为 True 时接口失败抛出异常，否则返回空结果
     """
-    async with aiohttp.ClientSession() as session:
-        try:
-            # 示例：调用天天基金搜索接口
-            url = f"http://fundgz.1234567.com.cn/js/{keyword}.js"
-            async with session.get(url, timeout=10) as response:
-                data = await response.json()
-                
-                # 解析返回数据
-                funds = []
-                if data.get("Datas"):
-                    for item in data["Datas"]:
-                        funds.append({
-                            "fund_code": item.get("CODE", ""),  # 基金代码
-                            "fund_name": item.get("NAME", ""),  # 基金名称
-                            "fund_type": item.get("FTYPE", ""), # 基金类型
-                        })
-                return funds
-        except Exception as e:
-            # 如果第三方接口失败，可以返回空结果或使用本地缓存
-            logging.error(f"搜索基金失败: {e}")
-            return []
+    session = _get_search_session()
+    try:
+        # 示例：调用天天基金搜索接口
+        url = f"{settings.FUNDGZ_BASE_URL}/js/{keyword}.js"
+        async with session.get(url, timeout=10) as response:
+            data = await response.json()
+            
+            # 解析返回数据
+            funds = []
+            if data.get("Datas"):
+                for item in data["Datas"]:
+                    funds.append({
+                        "fund_code": item.get("CODE", ""),  # 基金代码
+                        "fund_name": item.get("NAME", ""),  # 基金名称
+                        "fund_type": item.get("FTYPE", ""), # 基金类型
+                    })
+            return funds
+    except Exception as e:
+        # 如果第三方接口失败，可以返回空结果或使用本地缓存
+        logger.error("搜索基金失败: %s", e)
+        if raise_errors:
+            raise
+        return []
 
 # 先添加一个简单的测试路由
 @router.get("/test")
 async def test_route():
-    # logger.info(f"测试路由被访问: {datetime.now()}")
-    print(f"测试路由被访问: {datetime.now()}")
+    logger.info("测试路由被访问")
     return {"message": "Funds router is working", "timestamp": datetime.now().isoformat()}
 
 @router.put("/{fund_id}", response_model=schemas.Fund)
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+import schemas
+from core.database import get_db
+from core.dependencies import get_current_user
+from crud import portfolio as portfolio_crud
+
+router = APIRouter(prefix="/portfolio", tags=["portfolio"])
+
+# 单次查询的最大日期跨度（天）
+MAX_HISTORY_DAYS = 3660
+
+
+@router.get("/history", response_model=schemas.PortfolioHistory)
+def get_portfolio_history(
+    start_date: Optional[date] = Query(None, description="开始日期，默认结束日期前90天"),
+    end_date: Optional[date] = Query(None, description="结束日期，默认今天"),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    组合历史走势（来自每日快照表，一次索引查询）
+    """
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=90)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    if (end_date - start_date).days > MAX_HISTORY_DAYS:
+        raise HTTPException(status_code=400, detail=f"日期跨度不能超过 {MAX_HISTORY_DAYS} 天")
+
+    rows = portfolio_crud.get_portfolio_snapshots(db, current_user.id, start_date, end_date)
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "points": [
+            {"date": snapshot_date, "cost": cost, "value": value, "profit": profit}
+            for snapshot_date, cost, value, profit in rows
+        ],
+    }
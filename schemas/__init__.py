@@ -1 +1 @@
-from .user import User, UserBase, UserCreate, UserLogin, Token, TokenData, Fund, FundCreate, FundBase, FundCalculator, PortfolioSummary
\ No newline at end of file
+from .user import User, UserBase, UserCreate, UserLogin, Token, TokenData, Fund, FundCreate, FundBase, FundCalculator, PortfolioSummary, PortfolioSnapshotPoint, PortfolioHistory, HoldingsImportError, HoldingsImportResult, AlertCreate, Alert, AlertEvent
@@ -3,7 +3,7 @@
 from pydantic import BaseModel, EmailStr, Field
 # from typing import Optional
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, date
 
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -83,4 +83,59 @@ class PortfolioSummary(BaseModel):
     today_holding_amount: float
     low_fund_list: List[str]
     high_fund_list: List[str]
-    fund_details: List[FundCalculator]
\ No newline at end of file
+    fund_details: List[FundCalculator]
+    # 分页信息：fund_count 为整个组合的基金数，matched_count 为符合筛选条件的基金数
+    matched_count: Optional[int] = None
+    page: int = 1
+    limit: Optional[int] = None
+
+# 持仓批量导入结果
+class HoldingsImportError(BaseModel):
+    row: int
+    fund_code: Optional[str] = None
+    error: str
+
+class HoldingsImportResult(BaseModel):
+    inserted: int
+    updated: int
+    deleted: int
+    errors: List[HoldingsImportError]
+    summary: PortfolioSummary
+
+# 基金涨跌提醒
+class AlertCreate(BaseModel):
+    fund_code: str
+    rise_threshold: Optional[float] = Field(None, gt=0, description="涨幅达到该值（%）时提醒")
+    fall_threshold: Optional[float] = Field(None, lt=0, description="跌幅达到该值（%）时提醒，负数")
+    enabled: bool = True
+
+class Alert(AlertCreate):
+    id: int
+    user_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class AlertEvent(BaseModel):
+    alert_id: int
+    user_id: int
+    fund_code: str
+    fund_name: Optional[str] = None
+    direction: str
+    threshold: float
+    gszzl: float
+    gztime: Optional[str] = None
+    triggered_at: datetime
+
+# 组合历史（每日快照）
+class PortfolioSnapshotPoint(BaseModel):
+    date: date
+    cost: float
+    value: float
+    profit: float
+
+class PortfolioHistory(BaseModel):
+    start_date: date
+    end_date: date
+    points: List[PortfolioSnapshotPoint]
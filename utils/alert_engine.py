@@ -0,0 +1,205 @@
+# utils/alert_engine.py
+"""
+基金涨跌提醒引擎
+
+Redis 倒排索引（基金代码 -> 订阅的提醒规则）:
+    alert_funds              - 有启用提醒的基金代码集合（即行情刷新范围）
+    alert_rules:{fund_code}  - hash，alert_id -> {"user_id", "rise", "fall"}
+
+行情刷新器每 ALERT_REFRESH_SECONDS 秒从上游刷新 alert_funds 中基金的行情，
+只有行情发生变化（估值时间或涨跌幅不同）的基金才读取其订阅规则并判断，
+每轮开销为 O(变化的基金数 + 其订阅数)，与用户数 × 持仓数无关。
+同一提醒同一方向每个交易日只通知一次。多个工作进程时通过 Redis 锁保证每轮只有一个进程刷新。
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+
+from core.config import settings
+from core.database import SessionLocal, redis_client, async_redis_client
+from crud import alert as alert_crud
+from utils.fund_calculator import FundCalculator
+from utils.notifier import get_notifier
+
+logger = logging.getLogger(__name__)
+
+ALERT_FUNDS_KEY = "alert_funds"
+ALERT_LAST_QUOTE_KEY = "alert_last_quote"
+ALERT_INDEX_READY_KEY = "alert_index_ready"
+REFRESHER_LOCK_KEY = "alert_refresher_lock"
+
+
+def _rules_key(fund_code: str) -> str:
+    return f"alert_rules:{fund_code}"
+
+
+def _rule_payload(alert) -> str:
+    return json.dumps({"user_id": alert.user_id, "rise": alert.rise_threshold, "fall": alert.fall_threshold})
+
+
+# ---- 倒排索引维护 ----
+
+def index_alert(alert, previous_fund_code: Optional[str] = None):
+    """提醒新增或修改后更新索引（修改了基金代码时需传入原代码）"""
+    if previous_fund_code and previous_fund_code != alert.fund_code:
+        unindex_alert(alert.id, previous_fund_code)
+    if not alert.enabled:
+        unindex_alert(alert.id, alert.fund_code)
+        return
+    pipe = redis_client.pipeline()
+    pipe.hset(_rules_key(alert.fund_code), str(alert.id), _rule_payload(alert))
+    pipe.sadd(ALERT_FUNDS_KEY, alert.fund_code)
+    pipe.execute()
+
+
+def unindex_alert(alert_id: int, fund_code: str):
+    """提醒删除或停用后从索引中移除；基金已无订阅时不再刷新其行情"""
+    key = _rules_key(fund_code)
+    redis_client.hdel(key, str(alert_id))
+    if redis_client.hlen(key) == 0:
+        redis_client.srem(ALERT_FUNDS_KEY, fund_code)
+
+
+def rebuild_index() -> int:
+    """从数据库重建倒排索引，返回索引的提醒数"""
+    db = SessionLocal()
+    try:
+        alerts = alert_crud.get_enabled_alerts(db)
+    finally:
+        db.close()
+
+    rules: Dict[str, Dict[str, str]] = {}
+    for alert in alerts:
+        rules.setdefault(alert.fund_code, {})[str(alert.id)] = _rule_payload(alert)
+
+    pipe = redis_client.pipeline()
+    for fund_code in redis_client.smembers(ALERT_FUNDS_KEY):
+        pipe.delete(_rules_key(fund_code))
+    pipe.delete(ALERT_FUNDS_KEY)
+    for fund_code, mapping in rules.items():
+        pipe.hset(_rules_key(fund_code), mapping=mapping)
+        pipe.sadd(ALERT_FUNDS_KEY, fund_code)
+    pipe.set(ALERT_INDEX_READY_KEY, int(time.time()))
+    pipe.execute()
+    logger.info("重建提醒索引: %d 条提醒, %d 个基金", len(alerts), len(rules))
+    return len(alerts)
+
+
+def ensure_index():
+    """索引不存在（如 Redis 被清空）时从数据库重建"""
+    if not redis_client.exists(ALERT_INDEX_READY_KEY):
+        rebuild_index()
+
+
+# ---- 提醒判断 ----
+
+def _quote_signature(quote: Dict) -> str:
+    return f"{quote.get('gztime') or quote.get('jzrq')}|{quote.get('gszzl')}"
+
+
+def evaluate_fund(fund_code: str, quote: Dict) -> Tuple[int, int]:
+    """检查一个基金的所有订阅，返回 (发出的通知数, 发送失败数)"""
+    if quote.get("gszzl") in (None, ""):
+        return 0, 0
+    gszzl = float(quote["gszzl"])
+    trade_date = (quote.get("gztime") or quote.get("jzrq") or date.today().isoformat())[:10]
+
+    notifier = get_notifier()
+    sent = failed = 0
+    for alert_id, payload in redis_client.hgetall(_rules_key(fund_code)).items():
+        rule = json.loads(payload)
+        if rule["rise"] is not None and gszzl >= rule["rise"]:
+            direction, threshold = "rise", rule["rise"]
+        elif rule["fall"] is not None and gszzl <= rule["fall"]:
+            direction, threshold = "fall", rule["fall"]
+        else:
+            continue
+
+        # 同一提醒同一方向每个交易日只通知一次（先占位，避免多个进程重复发送；发送失败时释放，下一轮重试）
+        sent_key = f"alert_sent:{alert_id}:{direction}:{trade_date}"
+        if not redis_client.set(sent_key, 1, nx=True, ex=86400 * 2):
+            continue
+        event = {
+            "alert_id": int(alert_id),
+            "user_id": rule["user_id"],
+            "fund_code": fund_code,
+            "fund_name": quote.get("name"),
+            "direction": direction,
+            "threshold": threshold,
+            "gszzl": gszzl,
+            "gztime": quote.get("gztime"),
+            "triggered_at": datetime.now(),
+        }
+        try:
+            notifier.send(event)
+            sent += 1
+        except Exception as e:
+            redis_client.delete(sent_key)
+            failed += 1
+            logger.error("发送提醒失败: alert_id=%s, 错误: %s", alert_id, e)
+    return sent, failed
+
+
+def process_quotes(quotes: Dict[str, Optional[Dict]]) -> Dict:
+    """对比上一轮的行情，只检查发生变化的基金"""
+    codes = [code for code, quote in quotes.items() if quote]
+    if not codes:
+        return {"changed": 0, "notified": 0}
+    previous = dict(zip(codes, redis_client.hmget(ALERT_LAST_QUOTE_KEY, codes)))
+
+    changed = {code: quotes[code] for code in codes if previous[code] != _quote_signature(quotes[code])}
+    notified = 0
+    evaluated = {}
+    for code, quote in changed.items():
+        try:
+            sent, failed = evaluate_fund(code, quote)
+        except Exception as e:
+            logger.error("检查提醒失败: %s, 错误: %s", code, e)
+            continue
+        notified += sent
+        if not failed:
+            evaluated[code] = _quote_signature(quote)
+    # 检查完成且通知全部发出后才记录行情签名，否则下一轮仍视为有变化并重试（已发出的通知按交易日去重，不会重复发送）
+    if evaluated:
+        redis_client.hset(ALERT_LAST_QUOTE_KEY, mapping=evaluated)
+    return {"changed": len(changed), "notified": notified}
+
+
+# ---- 行情刷新器 ----
+
+def refresh_once(fund_codes: Optional[Iterable[str]] = None) -> Dict:
+    """从上游刷新有订阅的基金行情（同时更新行情缓存），并检查行情变化的基金"""
+    start = time.perf_counter()
+    codes = sorted(fund_codes if fund_codes is not None else redis_client.smembers(ALERT_FUNDS_KEY))
+    if not codes:
+        return {"funds": 0, "changed": 0, "notified": 0, "seconds": 0.0}
+
+    calculator = FundCalculator()
+    with ThreadPoolExecutor(max_workers=settings.ALERT_REFRESH_WORKERS, thread_name_prefix="alert-refresh") as pool:
+        quotes = dict(zip(codes, pool.map(calculator.refresh_fund_info, codes)))
+
+    stats = dict(process_quotes(quotes), funds=len(codes), seconds=round(time.perf_counter() - start, 2))
+    logger.info("提醒行情刷新: %s", stats)
+    return stats
+
+
+async def run_refresher():
+    """后台循环刷新（在应用生命周期中作为任务运行）"""
+    interval = settings.ALERT_REFRESH_SECONDS
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        try:
+            # 多个工作进程中只有拿到锁的进程执行本轮刷新
+            if await async_redis_client.set(REFRESHER_LOCK_KEY, os.getpid(), nx=True, ex=max(1, int(interval) - 1)):
+                await loop.run_in_executor(None, refresh_once)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("提醒行情刷新失败: %s", e)
+        await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
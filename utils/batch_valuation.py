@@ -0,0 +1,104 @@
+# utils/batch_valuation.py
+"""
+所有用户的组合批量估值（管理员接口 /api/admin/valuation 与 python -m jobs.batch_valuation 共用）
+
+与逐个用户调用 /api/funds/calculate 相比:
+    1. 所有持仓涉及的基金代码（去重）只获取一次行情：缓存按批 MGET，未命中的并发请求上游
+    2. 持仓用一个按用户排序的流式查询读取（yield_per），按用户分组后在生成器中直接估值：
+       估值是纯 Python 的 CPU 计算，线程池受 GIL 限制并不能并行，只会增加调度开销
+    3. 结果按用户顺序逐行输出（NDJSON / CSV），一次只持有一个用户的持仓，内存占用与用户总数无关
+估值只使用行情，不获取净值历史。
+"""
+import csv
+import io
+import json
+import time
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from core.config import settings
+from core.database import SessionLocal
+from models.user import User, UserFund
+from utils.fund_calculator import FundCalculator
+
+logger = logging.getLogger(__name__)
+
+VALUATION_FIELDS = (
+    "user_id", "username", "holding_count", "fund_count", "missing_quotes", "total_cost",
+    "yesterday_holding_amount", "today_revenue", "today_holding_amount", "total_revenue",
+)
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+Portfolio = Tuple[int, Optional[str], List[Dict]]
+
+
+def _stream_portfolios(db, yield_rows: int) -> Iterator[Portfolio]:
+    """按用户顺序流式读取持仓，每个用户输出一次 (用户ID, 用户名, 持仓列表)"""
+    query = (
+        db.query(UserFund.user_id, User.username, UserFund.fund_code, UserFund.cost_price, UserFund.shares)
+        .outerjoin(User, User.id == UserFund.user_id)
+        .order_by(UserFund.user_id, UserFund.id)
+        .yield_per(yield_rows)
+    )
+    for (user_id, username), rows in groupby(query, key=lambda row: (row.user_id, row.username)):
+        yield user_id, username, [
+            {"fund_code": row.fund_code, "cost_price": row.cost_price, "shares": row.shares} for row in rows
+        ]
+
+
+def _value_portfolio(calculator: FundCalculator, portfolio: Portfolio,
+                     quotes: Dict[str, Optional[Dict]]) -> Dict:
+    user_id, username, funds_data = portfolio
+    summary = calculator.calculate_portfolio_with_quotes(funds_data, quotes)
+    return {
+        "user_id": user_id,
+        "username": username,
+        "holding_count": len(funds_data),
+        "fund_count": summary["fund_count"],
+        "missing_quotes": sum(1 for fund in funds_data if not quotes.get(fund["fund_code"])),
+        "total_cost": summary["total_cost"],
+        "yesterday_holding_amount": summary["yesterday_holding_amount"],
+        "today_revenue": summary["today_revenue"],
+        "today_holding_amount": summary["today_holding_amount"],
+        "total_revenue": round(summary["yesterday_holding_income"] + summary["today_revenue"], 2),
+    }
+
+
+def iter_valuations(fetch_workers: Optional[int] = None) -> Iterator[Dict]:
+    """按用户ID顺序逐个输出每个用户的组合估值"""
+    start = time.perf_counter()
+    users = 0
+    db = SessionLocal()
+    try:
+        fund_codes = [row.fund_code for row in db.query(UserFund.fund_code).distinct()]
+        calculator = FundCalculator()
+        quotes = calculator.get_fund_infos(fund_codes, fetch_workers or settings.BATCH_VALUATION_FETCH_WORKERS)
+        quote_seconds = time.perf_counter() - start
+
+        for portfolio in _stream_portfolios(db, settings.BATCH_VALUATION_YIELD_ROWS):
+            users += 1
+            yield _value_portfolio(calculator, portfolio, quotes)
+    finally:
+        db.close()
+    logger.info("批量估值完成: %d 个基金, %d 个用户, 行情 %.2f 秒, 合计 %.2f 秒",
+                len(fund_codes), users, quote_seconds, time.perf_counter() - start)
+
+
+def format_valuations(valuations: Iterable[Dict], format: str) -> Iterator[str]:
+    """把估值结果逐行格式化为 NDJSON 或 CSV（含表头）"""
+    if format == "ndjson":
+        for valuation in valuations:
+            yield json.dumps(valuation, ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=VALUATION_FIELDS)
+    writer.writeheader()
+    for valuation in valuations:
+        writer.writerow(valuation)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -1,18 +1,103 @@
+import asyncio
 import requests
 import json
 import re
+import threading
 import time
 from datetime import datetime, date, timedelta
-from lxml import etree
-from bs4 import BeautifulSoup
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, Optional, List, Any
-from core.database import redis_client
+from core.database import redis_client, async_redis_client, redis_bytes_client, async_redis_bytes_client
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+from core.logging_config import sampled
+from utils.upstream import upstream_get, is_available, latency_percentile, UpstreamUnavailable
+from utils.fund_data_manager import fund_data_manager
+from utils.hot_funds import record_access, is_hot
+from utils.local_cache import LocalTTLCache
+from utils.nav_codec import encode_nav_series, decode_nav_series
+from utils.portfolio_view import PortfolioView
+from utils.fund_parsers import parse_lof_page, parse_recent_changes, parse_nav_history
+from utils.parse_executor import run_parse
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 请求线程内获取行情的最多尝试次数（失败后立即重试，不 sleep；重试与否由熔断与并发限制决定）
+REQUEST_ATTEMPTS = 2
+
+# 对冲请求线程池（主数据源与备用数据源并发请求）
+_hedge_executor = ThreadPoolExecutor(max_workers=settings.HEDGE_WORKERS, thread_name_prefix="quote-hedge")
+# 对冲统计由多个线程同时更新，读写都需持有锁
+_hedge_stats_lock = threading.Lock()
+# queue_waits / queue_wait_ms: 主请求在对冲线程池中排队超过 1ms 的次数与累计排队时间（不计入对冲延迟）
+hedge_stats = {"requests": 0, "hedged": 0, "secondary_wins": 0, "queue_waits": 0, "queue_wait_ms": 0.0}
+# 异步路径中正在进行的上游拉取（按缓存键合并并发请求）
+_inflight_fetches: Dict[str, "asyncio.Future"] = {}
+# 热门基金行情的进程内缓存（只有热门基金才写入，见 utils/hot_funds.py）
+_quote_l1 = LocalTTLCache(settings.HOT_FUNDS_L1_SIZE, settings.HOT_FUNDS_L1_SECONDS)
+# KEYS: 失败计数, 负缓存键; ARGV: 基础时长, 最长时长。按失败次数指数退避写入负缓存
+_negative_cache_script = redis_client.register_script("""
+local failures = tonumber(redis.call('GET', KEYS[1]))
+local ttl = math.min(tonumber(ARGV[1]) * 2 ^ (failures - 1), tonumber(ARGV[2]))
+redis.call('SETEX', KEYS[2], math.floor(ttl), failures)
+return failures
+""")
+
+
+def _count_hedge(name: str, value=1):
+    with _hedge_stats_lock:
+        hedge_stats[name] += value
+
+
+def get_hedge_stats() -> Dict:
+    with _hedge_stats_lock:
+        stats = dict(hedge_stats)
+    stats["queue_wait_ms"] = round(stats["queue_wait_ms"], 2)
+    return stats
+
+
+def shutdown_hedge_executor():
+    """关闭对冲请求线程池（不再等待未完成的备用请求）"""
+    _hedge_executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FundCodeUnresolved(Exception):
+    """基金代码无法在数据源中解析（已退市、代码错误或数据源不支持该类型）"""
+
+
+# 数据源路由: fundgz（实时估值，对冲 pingzhongdata）/ pingzhongdata / lof（基金页面）
+SOURCE_BASE_URLS = {
+    "fundgz": lambda: settings.FUNDGZ_BASE_URL,
+    "pingzhongdata": lambda: settings.EASTMONEY_BASE_URL,
+    "lof": lambda: settings.EASTMONEY_BASE_URL,
+}
+# fundgz 不提供估值的基金类型（关键字匹配目录中的 fund_type / raw_type）
+NO_ESTIMATE_TYPES = ("货币", "理财")
+
+# 统一行情字段
+QUOTE_FIELDS = ("fundcode", "name", "jzrq", "dwjz", "gsz", "gszzl", "gztime", "source")
+
+
+def normalize_quote(raw: Dict, fund_code: str, source: str) -> Dict:
+    """
+    把不同数据源的行情统一为同一结构:
+        fundcode / name / jzrq / dwjz 必有；gsz / gszzl / gztime 只有实时估值源（fundgz）提供
+    """
+    if "value" in raw and "dwjz" not in raw:
+        # LOF页面（及旧版缓存）格式: {'name', 'value', 'data'}
+        date_match = re.search(r"\d{4}-\d{2}-\d{2}", raw.get("data", ""))
+        raw = {
+            "name": raw.get("name"),
+            "dwjz": raw.get("value"),
+            "jzrq": date_match.group(0) if date_match else raw.get("data"),
+        }
+    quote = {field: raw[field] for field in QUOTE_FIELDS if raw.get(field) not in (None, "")}
+    quote.setdefault("fundcode", fund_code)
+    quote.setdefault("source", source)
+    return quote
+
+
 class FundCalculator:
     """基金计算器类，封装所有基金计算功能"""
     
@@ -24,6 +109,10 @@ class FundCalculator:
         self.full_today_holding_amount = 0
         self.yesterday_holding_amount = 0
         
+        # 缓存命中统计（用于性能剖析标签）
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
         # 日期相关
         self.yesterday = str(date.today() + timedelta(days=-1))
         self.six_days_ago = str(date.today() + timedelta(days=-11))
@@ -33,94 +122,370 @@ class FundCalculator:
         cache_key = f"fund_info:{fund_code}"
         cached_data = redis_client.get(cache_key)
         if cached_data:
+            self.cache_hits += 1
             return json.loads(cached_data)
+        self.cache_misses += 1
         return None
 
-    def _set_cached_fund_info(self, fund_code: str, data: Dict, expire: int = 300):
-        """缓存基金信息（5分钟）"""
+    def _get_local_quote(self, fund_code: str) -> Optional[Dict]:
+        """从进程内缓存获取热门基金行情"""
+        quote = _quote_l1.get(fund_code)
+        if quote is None:
+            return None
+        self.cache_hits += 1
+        return dict(quote)
+
+    @staticmethod
+    def _admit_local_quote(fund_code: str, quote: Dict):
+        """热门基金的行情写入进程内缓存"""
+        if is_hot(fund_code):
+            _quote_l1.set(fund_code, dict(quote))
+
+    def _set_cached_fund_info(self, fund_code: str, data: Dict, expire: Optional[int] = None, fallback: bool = False):
+        """
+        缓存基金信息（5分钟，热门基金 HOT_FUNDS_INFO_TTL 秒）
+
+        fallback: 有估值的基金由备用数据源返回的行情（没有估值），只缓存 HEDGE_FALLBACK_CACHE_TTL 秒，
+        不写入进程内缓存，也不覆盖过期副本
+        """
+        if fallback:
+            expire = settings.HEDGE_FALLBACK_CACHE_TTL
+        elif expire is None:
+            expire = settings.HOT_FUNDS_INFO_TTL if is_hot(fund_code) else 300
         cache_key = f"fund_info:{fund_code}"
-        redis_client.setex(cache_key, expire, json.dumps(data))
+        payload = json.dumps(data)
+        pipe = redis_client.pipeline()
+        pipe.setex(cache_key, expire, payload)
+        if not fallback:
+            self._admit_local_quote(fund_code, normalize_quote(data, fund_code, data.get("source", "cache")))
+            # 同时保留一份较长有效期的过期副本，上游不可用时兜底
+            pipe.setex(f"fund_info_stale:{fund_code}", settings.STALE_CACHE_TTL, payload)
+        pipe.execute()
+
+    def _get_stale_fund_info(self, fund_code: str) -> Optional[Dict]:
+        """获取过期的基金信息缓存（上游降级时使用）"""
+        cached_data = redis_client.get(f"fund_info_stale:{fund_code}")
+        if cached_data:
+            logger.info("上游不可用，返回过期缓存: %s", fund_code, extra=sampled(fund_code=fund_code))
+            stale_info = json.loads(cached_data)
+            return normalize_quote(stale_info, fund_code, stale_info.get("source", "cache"))
+        return None
 
     def get_fund_info(self, fund_code: str) -> Optional[Dict]:
         """获取基金信息"""
+        record_access((fund_code,))
+        local_quote = self._get_local_quote(fund_code)
+        if local_quote:
+            return local_quote
         # 先尝试从缓存获取
         cached_info = self._get_cached_fund_info(fund_code)
         if cached_info:
-            return cached_info
+            quote = normalize_quote(cached_info, fund_code, cached_info.get("source", "cache"))
+            self._admit_local_quote(fund_code, quote)
+            return quote
+        return self._fetch_fund_info(fund_code)
+
+    def refresh_fund_info(self, fund_code: str) -> Optional[Dict]:
+        """忽略缓存从上游获取最新基金信息（同时更新缓存），供提醒刷新器与热门基金刷新使用"""
+        return self._fetch_fund_info(fund_code)
+
+    def get_fund_infos(self, fund_codes: List[str], workers: int = 8, batch_size: int = 500) -> Dict[str, Optional[Dict]]:
+        """
+        批量获取基金信息（供批处理任务使用）
+
+        缓存按批 MGET 读取，未命中的基金在线程池中请求上游；不计入热门基金统计。
+        """
+        quotes: Dict[str, Optional[Dict]] = {}
+        missing = []
+        for i in range(0, len(fund_codes), batch_size):
+            batch = fund_codes[i:i + batch_size]
+            for code, cached_data in zip(batch, redis_client.mget([f"fund_info:{code}" for code in batch])):
+                if cached_data:
+                    self.cache_hits += 1
+                    cached_info = json.loads(cached_data)
+                    quotes[code] = normalize_quote(cached_info, code, cached_info.get("source", "cache"))
+                else:
+                    self.cache_misses += 1
+                    missing.append(code)
+        if missing:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-batch") as pool:
+                quotes.update(zip(missing, pool.map(self._fetch_fund_info, missing)))
+        return quotes
+
+    async def get_fund_info_async(self, fund_code: str, limiter: Optional[asyncio.Semaphore] = None) -> Optional[Dict]:
+        """
+        获取基金信息（异步版本）
+
+        缓存读取走异步Redis，不阻塞事件循环；未命中时在线程池中请求上游，limiter 用于限制并发拉取数。
+        """
+        record_access((fund_code,))
+        local_quote = self._get_local_quote(fund_code)
+        if local_quote:
+            return local_quote
+        cached_data = await async_redis_client.get(f"fund_info:{fund_code}")
+        if cached_data:
+            self.cache_hits += 1
+            cached_info = json.loads(cached_data)
+            quote = normalize_quote(cached_info, fund_code, cached_info.get("source", "cache"))
+            self._admit_local_quote(fund_code, quote)
+            return quote
+        self.cache_misses += 1
+        return await self._fetch_in_threadpool(limiter, f"fund_info:{fund_code}", self._fetch_fund_info, fund_code)
+
+    @staticmethod
+    async def _fetch_in_threadpool(limiter: Optional[asyncio.Semaphore], key: str, func, *args):
+        """
+        在线程池中执行上游拉取；同一进程内相同 key 的拉取只执行一次，并发请求共享结果，
+        避免多个请求同时未命中缓存时重复请求上游
+        """
+        task = _inflight_fetches.get(key)
+        if task is None:
+            async def run():
+                if limiter is None:
+                    return await run_in_threadpool(func, *args)
+                async with limiter:
+                    return await run_in_threadpool(func, *args)
+
+            task = asyncio.ensure_future(run())
+            _inflight_fetches[key] = task
+            task.add_done_callback(lambda _: _inflight_fetches.pop(key, None))
+        # shield: 某个请求被取消时不影响共享同一拉取的其他请求
+        return await asyncio.shield(task)
+
+    def _fetch_fund_info(self, fund_code: str) -> Optional[Dict]:
+        """缓存未命中时从上游获取基金信息"""
+        # 近期已确认无法解析的代码直接返回，不再请求上游
+        if redis_client.exists(f"fund_neg:{fund_code}"):
+            return self._get_stale_fund_info(fund_code)
+
+        source = self._resolve_source(fund_code)
+
+        # 上游熔断或并发已满时直接返回过期缓存，不阻塞请求线程
+        if source in SOURCE_BASE_URLS and not is_available(SOURCE_BASE_URLS[source]()):
+            stale_info = self._get_stale_fund_info(fund_code)
+            if stale_info:
+                return stale_info
 
         try:
-            if fund_code.startswith(('OF', 'F', 'SH', 'SZ')):
+            if source == "lof":
                 fund_info = self._get_lof_fund_info(fund_code)
+            elif source == "pingzhongdata":
+                fund_info = self._get_pingzhongdata_fund_info(fund_code)
+            elif source == "fundgz":
+                fund_info = self._get_quote_hedged(fund_code)
             else:
-                fund_info = self._get_common_fund_info(fund_code)
+                raise FundCodeUnresolved(f"无效的基金代码: {fund_code}")
             
-            # 缓存结果
+            # 缓存结果（fundgz 的基金由 pingzhongdata 对冲返回时没有估值，只短暂缓存）
             if fund_info:
-                self._set_cached_fund_info(fund_code, fund_info)
+                self._set_cached_fund_info(fund_code, fund_info,
+                                           fallback=source == "fundgz" and "gsz" not in fund_info)
+                redis_client.delete(f"fund_neg:{fund_code}", f"fund_neg_count:{fund_code}")
             return fund_info
+        except FundCodeUnresolved as e:
+            self._set_negative_cache(fund_code)
+            logger.warning("基金代码无法解析: %s, 错误: %s", fund_code, e)
+            return self._get_stale_fund_info(fund_code)
         except Exception as e:
-            logger.error(f"获取基金信息失败: {fund_code}, 错误: {str(e)}")
+            logger.error("获取基金信息失败: %s, 错误: %s", fund_code, e)
+            return self._get_stale_fund_info(fund_code)
+
+    def _resolve_source(self, fund_code: str) -> str:
+        """
+        确定基金代码的行情数据源:
+        1. 之前探测成功的数据源（fund_route:{code}）
+        2. 带交易所前缀的代码（OF/F/SH/SZ）走基金页面
+        3. 非6位数字代码视为无效
+        4. 目录中的货币型/理财型基金 fundgz 无估值，直接走 pingzhongdata
+        5. 其余走 fundgz
+        """
+        learned = redis_client.get(f"fund_route:{fund_code}")
+        if learned:
+            return learned
+        if fund_code.startswith(('OF', 'F', 'SH', 'SZ')):
+            return "lof"
+        if not (len(fund_code) == 6 and fund_code.isdigit()):
+            return "invalid"
+        fund_type = fund_data_manager.get_fund_type(fund_code) or ""
+        if any(keyword in fund_type for keyword in NO_ESTIMATE_TYPES):
+            return "pingzhongdata"
+        return "fundgz"
+
+    def _set_negative_cache(self, fund_code: str):
+        """记录无法解析的基金代码，按失败次数指数退避（60s, 120s, 240s ... 上限 NEGATIVE_CACHE_MAX_SECONDS）"""
+        count_key = f"fund_neg_count:{fund_code}"
+        # 计数、续期与写入负缓存在一次管道往返中完成；负缓存时长依赖计数，由脚本在 Redis 端计算
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incr(count_key)
+        pipe.expire(count_key, 86400)
+        _negative_cache_script(keys=[count_key, f"fund_neg:{fund_code}"],
+                               args=[settings.NEGATIVE_CACHE_BASE_SECONDS, settings.NEGATIVE_CACHE_MAX_SECONDS],
+                               client=pipe)
+        pipe.execute()
+
+    def _hedge_delay(self) -> float:
+        """对冲延迟（秒）：主数据源近期 p95 耗时，数据不足时使用默认值"""
+        p95 = latency_percentile(settings.FUNDGZ_BASE_URL, 95)
+        delay_ms = p95 if p95 is not None else settings.HEDGE_DEFAULT_DELAY_MS
+        return max(delay_ms, settings.HEDGE_MIN_DELAY_MS) / 1000.0
+
+    def _get_quote_hedged(self, fund_code: str) -> Dict:
+        """
+        对冲获取普通基金行情：
+        先请求 fundgz，若超过 p95 耗时仍未返回（或已失败），再向 pingzhongdata 发出备用请求，
+        取先成功返回的结果。只有慢尾请求会触发对冲，上游请求量增加很少。
+        """
+        _count_hedge("requests")
+        if not settings.HEDGE_ENABLED:
+            return self._get_common_fund_info(fund_code)
+
+        primary_started = threading.Event()
+
+        def run_primary():
+            primary_started.set()
+            return self._get_common_fund_info(fund_code)
+
+        submitted = time.perf_counter()
+        primary = _hedge_executor.submit(run_primary)
+        # 对冲延迟从主请求开始执行时算起：线程池排队的时间不计入，否则线程池繁忙时会误发备用请求
+        while not primary_started.wait(0.05) and not primary.done():
+            pass
+        queue_ms = (time.perf_counter() - submitted) * 1000
+        if queue_ms > 1:
+            _count_hedge("queue_waits")
+            _count_hedge("queue_wait_ms", queue_ms)
+        done, _ = wait([primary], timeout=self._hedge_delay())
+        if done and primary.exception() is None:
+            return primary.result()
+        primary_unresolved = done and isinstance(primary.exception(), FundCodeUnresolved)
+
+        secondary_url = f"{settings.EASTMONEY_BASE_URL}/pingzhongdata/{fund_code}.js"
+        if not is_available(secondary_url):
+            return primary.result()
+
+        _count_hedge("hedged")
+        secondary = _hedge_executor.submit(self._get_pingzhongdata_fund_info, fund_code)
+        pending = {primary, secondary}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+                if future is secondary:
+                    _count_hedge("secondary_wins")
+                    # fundgz 明确不支持该代码时，记住备用数据源，下次直接请求
+                    # （主请求未完成时不检查，exception() 会阻塞到慢请求结束）
+                    if primary_unresolved or (primary.done() and isinstance(primary.exception(), FundCodeUnresolved)):
+                        redis_client.setex(f"fund_route:{fund_code}", settings.FUND_ROUTE_TTL, "pingzhongdata")
+                return future.result()
+        if isinstance(primary.exception(), FundCodeUnresolved) and isinstance(secondary.exception(), FundCodeUnresolved):
+            raise FundCodeUnresolved(f"所有数据源均无法解析: {fund_code}")
+        raise last_error
+
+    def cache_hit_ratio(self) -> Optional[float]:
+        """本次计算的缓存命中率"""
+        total = self.cache_hits + self.cache_misses
+        if total == 0:
             return None
+        return round(self.cache_hits / total, 4)
 
     def _get_common_fund_info(self, fund_code: str) -> Dict:
         """获取普通基金信息"""
-        url = f"http://fundgz.1234567.com.cn/js/{fund_code}.js"
+        url = f"{settings.FUNDGZ_BASE_URL}/js/{fund_code}.js"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Connection': 'close'
         }
         
-        for i in range(3):  # 重试3次
+        # 请求线程内不等待重试：失败后只在上游仍可用（未熔断、有并发余量）时立即重试一次
+        for i in range(REQUEST_ATTEMPTS):
             try:
-                response = requests.get(url, headers=headers, timeout=5)
+                response = upstream_get(url, headers=headers, timeout=5)
+                if response.status_code == 404:
+                    raise FundCodeUnresolved(f"fundgz不存在该基金: {fund_code}")
                 response.raise_for_status()
                 
                 # 提取JSON数据
                 pattern = r'^jsonpgz\((.*)\)'
                 content = re.findall(pattern, response.text)
-                if content:
-                    return json.loads(content[0])
+                if content and content[0].strip():
+                    return normalize_quote(json.loads(content[0]), fund_code, "fundgz")
+                # 返回 jsonpgz(); 说明 fundgz 没有该基金的估值，重试没有意义
+                raise FundCodeUnresolved(f"fundgz无该基金估值: {fund_code}")
                 
+            except UpstreamUnavailable:
+                raise
             except (requests.RequestException, json.JSONDecodeError) as e:
-                logger.warning(f"获取基金信息失败 {fund_code}, 重试 {i+1}/3: {str(e)}")
-                time.sleep(1)
+                logger.warning("获取基金信息失败 %s, 第 %d/%d 次: %s", fund_code, i + 1, REQUEST_ATTEMPTS, e)
+                if not is_available(url):
+                    break
         
         raise Exception(f"无法获取基金信息: {fund_code}")
 
     def _get_lof_fund_info(self, fund_code: str) -> Dict:
         """获取LOF基金信息"""
-        url = f'http://fund.eastmoney.com/{fund_code}.html'
+        url = f'{settings.EASTMONEY_BASE_URL}/{fund_code}.html'
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Connection': 'close'
         }
         
-        for i in range(3):  # 重试3次
+        for i in range(REQUEST_ATTEMPTS):
             try:
-                response = requests.get(url, headers=headers, timeout=10)
+                response = upstream_get(url, headers=headers, timeout=10)
+                if response.status_code == 404:
+                    raise FundCodeUnresolved(f"基金页面不存在: {fund_code}")
                 response.raise_for_status()
                 
-                soup = BeautifulSoup(response.content, 'html.parser')
+                # 在解析进程池中解析页面
+                page_info = run_parse(parse_lof_page, response.content, url)
+                if page_info is None:
+                    # 页面结构中没有净值数据，说明该代码不是可解析的基金页面
+                    raise FundCodeUnresolved(f"无法解析LOF基金页面: {fund_code}")
                 
-                # 解析基金名称
-                name_element = soup.find('a', href=url, target="_self")
-                name = name_element.getText() if name_element else "未知基金"
-                
-                # 解析基金净值
-                value_element = soup.find_all('dd', {'class': 'dataNums'})[1].find('span')
-                value = value_element.getText() if value_element else "0.00"
-                
-                # 解析日期
-                date_element = soup.find('dl', {'class': "dataItem02"}).find('p')
-                date_str = date_element.getText() if date_element else "未知日期"
-                
-                return {'name': name, 'value': value, 'data': date_str}
-            except (requests.RequestException, IndexError, AttributeError) as e:
-                logger.warning(f"获取LOF基金信息失败 {fund_code}, 重试 {i+1}/3: {str(e)}")
-                time.sleep(1)
+                return normalize_quote(page_info, fund_code, "lof")
+            except UpstreamUnavailable:
+                raise
+            except requests.RequestException as e:
+                logger.warning("获取LOF基金信息失败 %s, 第 %d/%d 次: %s", fund_code, i + 1, REQUEST_ATTEMPTS, e)
+                if not is_available(url):
+                    break
         
         raise Exception(f"无法获取LOF基金信息: {fund_code}")
 
+    def _get_pingzhongdata_fund_info(self, fund_code: str) -> Dict:
+        """从 pingzhongdata 获取最新单位净值（备用数据源，无实时估值）"""
+        url = f"{settings.EASTMONEY_BASE_URL}/pingzhongdata/{fund_code}.js"
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': f'{settings.EASTMONEY_BASE_URL}/{fund_code}.html',
+        }
+
+        response = upstream_get(url, headers=headers, timeout=5)
+        if response.status_code == 404:
+            raise FundCodeUnresolved(f"pingzhongdata不存在该基金: {fund_code}")
+        response.raise_for_status()
+        text = response.text
+
+        name_match = re.search(r'var fS_name\s*=\s*"(.*?)";', text)
+        trend_start = text.find("Data_netWorthTrend")
+        if not name_match or trend_start < 0:
+            raise FundCodeUnresolved(f"无法解析pingzhongdata: {fund_code}")
+
+        # 净值走势按时间升序，只需取数组中最后一个点
+        trend_end = text.find("];", trend_start)
+        points = re.findall(r'\{"x":(\d+),"y":([\d.]+)', text[trend_start:trend_end])
+        if not points:
+            raise FundCodeUnresolved(f"pingzhongdata无净值数据: {fund_code}")
+        timestamp, unit_nav = points[-1]
+        nav_date = (datetime.utcfromtimestamp(int(timestamp) / 1000) + timedelta(hours=8)).strftime("%Y-%m-%d")
+
+        return normalize_quote(
+            {'name': name_match.group(1), 'dwjz': unit_nav, 'jzrq': nav_date},
+            fund_code,
+            "pingzhongdata",
+        )
+
     def get_change_recent_days(self, fund_code: str) -> str:
         """获取基金最近涨跌情况"""
         cache_key = f"fund_recent:{fund_code}"
@@ -128,35 +493,25 @@ class FundCalculator:
         if cached_data:
             return cached_data
 
-        url = f"http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code={fund_code}&page=1&sdate={self.six_days_ago}&edate={self.yesterday}&per=20"
+        url = f"{settings.EASTMONEY_BASE_URL}/f10/F10DataApi.aspx?type=lsjz&code={fund_code}&page=1&sdate={self.six_days_ago}&edate={self.yesterday}&per=20"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Connection': 'close'
         }
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = upstream_get(url, headers=headers, timeout=10)
             response.raise_for_status()
             
-            # 提取内容
-            content = re.findall(r'content:"(.*?)",records:', response.text)
-            if not content:
+            # 在解析进程池中提取涨跌百分比
+            result = run_parse(parse_recent_changes, response.content, response.encoding)
+            if result is None:
                 return "无数据"
-                
-            # 解析HTML
-            html = etree.HTML(content[0])
-            html_data = html.xpath('//tr/td/text()')
             
-            # 提取涨跌百分比
-            rise_fall_list = [num for num in html_data if num.endswith('%')]
-            rise_fall_list.reverse()
-            
-            result = ' , '.join(rise_fall_list)
             # 缓存结果（10分钟）
             redis_client.setex(cache_key, 600, result)
             return result
         except Exception as e:
-            logger.error(f"获取近期涨跌失败: {fund_code}, 错误: {str(e)}")
+            logger.error("获取近期涨跌失败: %s, 错误: %s", fund_code, e)
             return "获取失败"
     
     def get_fund_nav_history_simple(self, fund_code: str, days: int = 30) -> List[Dict[str, Any]]:
@@ -179,153 +534,256 @@ class FundCalculator:
             ]
         """
         # 计算日期范围
+        sdate, edate = self._nav_date_range(days)
+        
+        # 缓存键（每个基金一个，日期范围记录在缓存值中）
+        cache_key = self._nav_cache_key(fund_code, days)
+        result = self._fresh_nav_history(redis_bytes_client.get(cache_key), sdate, edate)
+        if result is not None:
+            self.cache_hits += 1
+            return result
+        self.cache_misses += 1
+        return self._fetch_nav_history(fund_code, days, sdate, edate, cache_key)
+
+    async def get_fund_nav_history_simple_async(self, fund_code: str, days: int = 30,
+                                                limiter: Optional[asyncio.Semaphore] = None) -> List[Dict[str, Any]]:
+        """获取基金历史净值数据（异步版本，返回结构同 get_fund_nav_history_simple）"""
+        sdate, edate = self._nav_date_range(days)
+        cache_key = self._nav_cache_key(fund_code, days)
+        result = self._fresh_nav_history(await async_redis_bytes_client.get(cache_key), sdate, edate)
+        if result is not None:
+            self.cache_hits += 1
+            return result
+        self.cache_misses += 1
+        return await self._fetch_in_threadpool(limiter, cache_key, self._fetch_nav_history, fund_code, days,
+                                               sdate, edate, cache_key)
+
+    @staticmethod
+    def _nav_cache_key(fund_code: str, days: int) -> str:
+        return f"fund_nav:{fund_code}:{days}"
+
+    @staticmethod
+    def _fresh_nav_history(cached_data: Optional[bytes], sdate: str, edate: str) -> Optional[List[Dict[str, Any]]]:
+        """缓存中日期范围相同且未超过 NAV_CACHE_TTL 的净值历史，否则返回 None"""
+        if not cached_data:
+            return None
+        try:
+            series = decode_nav_series(cached_data)
+        except ValueError:
+            return None
+        return series.rows if series.is_fresh(sdate, edate, settings.NAV_CACHE_TTL) else None
+
+    @staticmethod
+    def _nav_date_range(days: int):
+        """净值历史的日期范围（开始日期, 结束日期）"""
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
+        return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+    def get_fund_nav_range(self, fund_code: str, sdate: str, edate: str) -> List[Dict[str, Any]]:
+        """
+        获取指定日期区间的净值（只请求一页，区间应不超过 50 个交易日；不缓存，供补录快照等按日期查询使用）
+        返回结构同 get_fund_nav_history_simple，请求失败时抛出异常
+        """
+        url = f"{settings.EASTMONEY_BASE_URL}/f10/F10DataApi.aspx?type=lsjz&code={fund_code}&page=1&sdate={sdate}&edate={edate}&per=50"
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': f'{settings.EASTMONEY_BASE_URL}/{fund_code}.html',
+        }
+        response = upstream_get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+        parsed = run_parse(parse_nav_history, response.content, response.encoding)
+        if parsed is None:
+            return []
+        return [
+            {"date": nav_date, "unit_nav": unit_nav, "daily_growth": daily_growth, "daily_growth_value": daily_growth_value}
+            for nav_date, unit_nav, daily_growth, daily_growth_value in parsed[0]
+        ]
+
+    def _fetch_nav_history(self, fund_code: str, days: int, sdate: str, edate: str,
+                           cache_key: str) -> List[Dict[str, Any]]:
+        """缓存未命中时从上游获取净值历史"""
+        url = f"{settings.EASTMONEY_BASE_URL}/f10/F10DataApi.aspx?type=lsjz&code={fund_code}&page=1&sdate={sdate}&edate={edate}&per=50"
         
-        # 格式化日期字符串
-        sdate = start_date.strftime("%Y-%m-%d")
-        edate = end_date.strftime("%Y-%m-%d")
-        
-        # 缓存键
-        cache_key = f"fund_nav_simple:{fund_code}:{sdate}:{edate}"
-        cached_data = redis_client.get(cache_key)
-        
-        if cached_data:
-            try:
-                return json.loads(cached_data)
-            except json.JSONDecodeError:
-                pass
-        
-        url = f"http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code={fund_code}&page=1&sdate={sdate}&edate={edate}&per=50"
+        # 上游降级时直接返回过期数据
+        if not is_available(url):
+            return self._get_stale_nav_history(cache_key)
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': f'http://fund.eastmoney.com/{fund_code}.html',
-            'Connection': 'close'
+            'Referer': f'{settings.EASTMONEY_BASE_URL}/{fund_code}.html',
         }
         
         result = []
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = upstream_get(url, headers=headers, timeout=10)
             response.raise_for_status()
             
-            # 提取内容
-            pattern = r'content:"(.*?)",records:'
-            match = re.search(pattern, response.text, re.DOTALL)
-            
-            if not match:
-                logger.warning(f"未匹配到基金净值数据: {fund_code}")
+            # 在解析进程池中解析净值表格，返回紧凑的元组列表
+            parsed = run_parse(parse_nav_history, response.content, response.encoding)
+            if parsed is None:
+                logger.warning("未匹配到基金净值数据: %s", fund_code)
                 return result
             
-            content = match.group(1)
+            rows, skipped = parsed
+            if skipped:
+                logger.warning("解析基金净值行数据失败: %s, 跳过 %d 行", fund_code, skipped)
             
-            # 清理HTML内容
-            content = content.replace('\\r\\n', '\n').replace('\\t', '\t')
-            
-            # 解析HTML表格
-            html = etree.HTML(content)
-            
-            # 使用XPath获取表格行
-            rows = html.xpath('//tr')
-            
-            for row in rows[1:]:  # 跳过表头行
-                # 获取所有单元格
-                cells = row.xpath('./td')
-                if len(cells) < 4:  # 至少需要前4列数据
-                    continue
-                    
-                try:
-                    # 提取日期、单位净值、增长率
-                    date = cells[0].xpath('string(.)').strip()
-                    unit_nav_str = cells[1].xpath('string(.)').strip()
-                    daily_growth = cells[3].xpath('string(.)').strip()
-                    
-                    # 转换单位净值
-                    unit_nav = None
-                    if unit_nav_str and unit_nav_str != '-':
-                        try:
-                            unit_nav = float(unit_nav_str)
-                        except ValueError:
-                            pass
-                    
-                    # 提取增长率数值（去掉百分号）
-                    daily_growth_value = None
-                    if daily_growth and daily_growth != '-':
-                        try:
-                            daily_growth_value = float(daily_growth.rstrip('%'))
-                        except ValueError:
-                            pass
-                    
-                    # 只添加有净值数据的数据
-                    if unit_nav is not None:
-                        nav_data = {
-                            "date": date,
-                            "unit_nav": unit_nav,
-                            "daily_growth": daily_growth,
-                            "daily_growth_value": daily_growth_value
-                        }
-                        result.append(nav_data)
-                        
-                except Exception as e:
-                    logger.warning(f"解析基金净值行数据失败: {fund_code}, 行数据: {etree.tostring(row)}, 错误: {str(e)}")
-                    continue
-            
-            # 按日期排序（最新的在前面）
-            result.sort(key=lambda x: x["date"], reverse=True)
+            result = [
+                {
+                    "date": nav_date,
+                    "unit_nav": unit_nav,
+                    "daily_growth": daily_growth,
+                    "daily_growth_value": daily_growth_value
+                }
+                for nav_date, unit_nav, daily_growth, daily_growth_value in rows
+            ]
             
-            # 缓存结果（15分钟）
-            redis_client.setex(cache_key, 900, json.dumps(result, ensure_ascii=False))
+            # 缓存结果：NAV_CACHE_TTL 内直接使用，之后作为过期副本保留到 STALE_CACHE_TTL
+            redis_bytes_client.setex(cache_key, settings.STALE_CACHE_TTL, encode_nav_series(
+                result, sdate, edate, settings.NAV_CACHE_COMPRESS_MIN_BYTES))
             
-            logger.info(f"获取基金净值历史成功: {fund_code}, 记录数: {len(result)}")
+            logger.info("获取基金净值历史成功: %s, 记录数: %d", fund_code, len(result),
+                        extra=sampled(fund_code=fund_code, rows=len(result)))
             return result
             
         except requests.exceptions.Timeout:
-            logger.error(f"获取基金净值超时: {fund_code}")
-            return []
+            logger.error("获取基金净值超时: %s", fund_code)
+            return self._get_stale_nav_history(cache_key)
         except requests.exceptions.RequestException as e:
-            logger.error(f"获取基金净值网络错误: {fund_code}, 错误: {str(e)}")
-            return []
+            logger.error("获取基金净值网络错误: %s, 错误: %s", fund_code, e)
+            return self._get_stale_nav_history(cache_key)
         except Exception as e:
-            logger.error(f"获取基金净值失败: {fund_code}, 错误: {str(e)}")
+            logger.error("获取基金净值失败: %s, 错误: %s", fund_code, e)
             return []
 
-    def calculate_portfolio(self, funds_data: List[Dict]) -> Dict:
-        """计算投资组合"""
+    def _get_stale_nav_history(self, cache_key: str) -> List[Dict[str, Any]]:
+        """获取过期的净值历史缓存（上游降级时使用，不检查日期范围与获取时间）"""
+        cached_data = redis_bytes_client.get(cache_key)
+        if cached_data:
+            try:
+                return decode_nav_series(cached_data).rows
+            except ValueError:
+                pass
+        return []
+
+    def calculate_portfolio(self, funds_data: List[Dict], view: Optional[PortfolioView] = None) -> Dict:
+        """计算投资组合（view 决定返回哪些基金明细，默认全部按涨跌幅由大到小排序）"""
+        # 重置累计数据
+        self.__init__()
+        summary = self._summarize(funds_data, self.get_fund_info, view)
+        for detail in summary['fund_details']:
+            detail['recent_changes'] = self.get_fund_nav_history_simple(detail['fund_code'])
+        return summary
+
+    def calculate_portfolio_with_quotes(self, funds_data: List[Dict], quotes: Dict[str, Optional[Dict]],
+                                        view: Optional[PortfolioView] = None) -> Dict:
+        """用已获取的行情计算投资组合（不获取净值历史，recent_changes 为空，供批量估值使用）"""
+        self.__init__()
+        return self._summarize(funds_data, quotes.get, view)
+
+    async def calculate_portfolio_async(self, funds_data: List[Dict], view: Optional[PortfolioView] = None) -> Dict:
+        """
+        计算投资组合（异步版本）
+
+        所有基金的行情缓存通过异步Redis批量读取（热门基金的行情先查进程内缓存），
+        净值历史只为 view 选出的这一页基金读取；缓存未命中的基金在线程池中请求上游，
+        并发数受 PORTFOLIO_FETCH_CONCURRENCY 限制。
+        """
+        self.__init__()
+        codes = list(dict.fromkeys(fund['fund_code'] for fund in funds_data))
+        if not codes:
+            return self._summarize(funds_data, {}.get, view)
+        record_access(codes)
+
+        quotes: Dict[str, Optional[Dict]] = {}
+        for code in codes:
+            local_quote = self._get_local_quote(code)
+            if local_quote:
+                quotes[code] = local_quote
+        quote_codes = [code for code in codes if code not in quotes]
+
+        # 行情用一次 MGET 批量读取缓存
+        cached_quotes = await async_redis_client.mget([f"fund_info:{code}" for code in quote_codes]) if quote_codes else []
+
+        limiter = asyncio.Semaphore(settings.PORTFOLIO_FETCH_CONCURRENCY)
+        pending = []
+        for code, cached_quote in zip(quote_codes, cached_quotes):
+            if cached_quote:
+                self.cache_hits += 1
+                cached_info = json.loads(cached_quote)
+                quotes[code] = normalize_quote(cached_info, code, cached_info.get("source", "cache"))
+                self._admit_local_quote(code, quotes[code])
+            else:
+                self.cache_misses += 1
+                pending.append((quotes, code, self._fetch_in_threadpool(
+                    limiter, f"fund_info:{code}", self._fetch_fund_info, code)))
+        await self._gather_pending(pending)
+        summary = self._summarize(funds_data, quotes.get, view)
+
+        # 只为返回的这一页读取净值历史
+        page_codes = list(dict.fromkeys(detail['fund_code'] for detail in summary['fund_details']))
+        if not page_codes:
+            return summary
+        days = 30
+        sdate, edate = self._nav_date_range(days)
+        nav_keys = [self._nav_cache_key(code, days) for code in page_codes]
+        cached_navs = await async_redis_bytes_client.mget(nav_keys)
+
+        nav_histories: Dict[str, List[Dict[str, Any]]] = {}
+        pending = []
+        for code, cached_nav, nav_key in zip(page_codes, cached_navs, nav_keys):
+            nav_history = self._fresh_nav_history(cached_nav, sdate, edate)
+            if nav_history is not None:
+                self.cache_hits += 1
+                nav_histories[code] = nav_history
+            else:
+                self.cache_misses += 1
+                pending.append((nav_histories, code, self._fetch_in_threadpool(
+                    limiter, nav_key, self._fetch_nav_history, code, days, sdate, edate, nav_key)))
+
+        await self._gather_pending(pending)
+        for detail in summary['fund_details']:
+            detail['recent_changes'] = nav_histories.get(detail['fund_code'])
+        return summary
+
+    @staticmethod
+    async def _gather_pending(pending: List):
+        """缓存未命中的基金在线程池中并发请求上游，结果写回 (目标字典, 基金代码, 拉取任务) 中的目标字典"""
+        results = await asyncio.gather(*(fetch for _, _, fetch in pending))
+        for (target, code, _), result in zip(pending, results):
+            target[code] = result
+
+    def _summarize(self, funds_data: List[Dict], get_quote, view: Optional[PortfolioView] = None) -> Dict:
+        """
+        根据行情汇总组合数据
+
+        汇总数据按整个组合计算；fund_details 只包含 view 选出的这一页（不含 recent_changes，由调用方按页补充）
+        """
         low_fund_list = []
         high_fund_list = []
         fund_details = []
-        
-        # 重置累计数据
-        self.__init__()
 
         for fund_data in funds_data:
             fund_code = fund_data['fund_code']
             cost_price = fund_data['cost_price']
             share = fund_data['shares']
             
-            fund_info = self.get_fund_info(fund_code)
+            fund_info = get_quote(fund_code)
             if not fund_info:
                 continue
                 
             # 基础计算
             count = round(cost_price * share, 2)  # 成本
             
-            # 金额计算
-            if 'dwjz' in fund_info:  # 普通基金
-                amount = round(float(fund_info['dwjz']) * share, 2)
-                today_value = float(fund_info.get('gsz', fund_info['dwjz']))
-                fund_name = fund_info['name']
-                shangrijingzhi = float(fund_info.get('dwjz'))
-            else:  # LOF基金
-                amount = round(float(fund_info['value']) * share, 2)
-                today_value = float(fund_info['value'])
-                fund_name = fund_info['name']
+            # 金额计算（行情已统一为 dwjz/gsz 结构，无实时估值时按单位净值计算）
+            shangrijingzhi = float(fund_info['dwjz'])
+            amount = round(shangrijingzhi * share, 2)
+            today_value = float(fund_info.get('gsz', fund_info['dwjz']))
+            fund_name = fund_info['name']
             
             # 今日收益计算
-            if 'dwjz' in fund_info:
-                today_revenue = round((today_value - float(fund_info['dwjz'])) * share, 2)
-            else:
-                today_revenue = 0
+            today_revenue = round((today_value - shangrijingzhi) * share, 2)
             
             # 总收益计算
             total_revenue = round((today_value - cost_price) * share, 2)
@@ -341,9 +799,6 @@ class FundCalculator:
                 gszzl = 0
                 change_rate = "--"
             
-            # 近期涨跌
-            rise_fall = self.get_fund_nav_history_simple(fund_code)
-            
             # 更新汇总数据
             self.full_cost += count
             self.yesterday_holding_amount += amount
@@ -371,18 +826,17 @@ class FundCalculator:
                 'today_revenue': today_revenue,
                 'total_revenue': total_revenue,
                 'profit_loss_ratio': profit_and_loss_ratio,
-                'recent_changes': rise_fall
             }
             fund_details.append(fund_detail)
 
-        # 按照涨跌幅度（change_rate_value）由大到小排序
-        fund_details.sort(key=lambda x: x['change_rate_value'], reverse=True)
-        # 删除排序用的临时字段（可选）
+        fund_count = len(fund_details)
+        # 按 view 筛选、排序并分页（默认全部按涨跌幅度由大到小排序）
+        view = view or PortfolioView()
+        fund_details, matched_count = view.select(fund_details)
+        # 删除排序用的临时字段
         for detail in fund_details:
             detail.pop('change_rate_value', None)
 
-        fund_count = len(fund_details)
-
         # 汇总信息
         summary = {
             'fund_count': fund_count,
@@ -394,6 +848,9 @@ class FundCalculator:
             'low_fund_list': low_fund_list,
             'high_fund_list': high_fund_list,
             'fund_details': fund_details,
+            'matched_count': matched_count,
+            'page': view.page,
+            'limit': view.limit,
         }
 
         return summary
\ No newline at end of file
@@ -1,6 +1,7 @@
 # utils/fund_data_manager.py
 import json
 import os
+import threading
 from typing import List, Dict, Optional
 import logging
 from datetime import datetime
@@ -8,18 +9,38 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 class FundDataManager:
+    """
+    基金目录
+
+    目录文件在首次使用时才加载（或由应用启动预热调用 load 提前加载），
+    导入模块本身不解析目录JSON，避免拖慢进程启动。
+    """
+
     def __init__(self, data_file: str = "data/funds.json"):
         self.data_file = data_file
         self.funds_data = []
-        self._load_data()
+        self._code_index: Dict[str, Dict] = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    def load(self):
+        """加载基金目录（只加载一次，可重复调用）"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load_data()
+                self._loaded = True
     
     def _load_data(self):
         """加载基金数据"""
         try:
             if os.path.exists(self.data_file):
                 with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.funds_data = json.load(f)
-                logger.info(f"加载了 {len(self.funds_data)} 个基金数据")
+                    data = json.load(f)
+                # 兼容 get_funds_data.py 生成的 {"metadata": ..., "funds": [...]} 格式
+                self.funds_data = data.get("funds", []) if isinstance(data, dict) else data
+                logger.info("加载了 %d 个基金数据", len(self.funds_data))
             else:
                 # 创建数据目录并初始化数据
                 os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
@@ -27,8 +48,13 @@ class FundDataManager:
                 self._save_data()
                 logger.info("创建了初始基金数据文件")
         except Exception as e:
-            logger.error(f"加载基金数据失败: {e}")
+            logger.error("加载基金数据失败: %s", e)
             self.funds_data = self._get_initial_data()
+        self._build_index()
+    
+    def _build_index(self):
+        """建立基金代码索引"""
+        self._code_index = {fund.get("fund_code"): fund for fund in self.funds_data}
     
     def _get_initial_data(self) -> List[Dict]:
         """获取初始基金数据"""
@@ -60,12 +86,13 @@ class FundDataManager:
         try:
             with open(self.data_file, 'w', encoding='utf-8') as f:
                 json.dump(self.funds_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"保存了 {len(self.funds_data)} 个基金数据")
+            logger.info("保存了 %d 个基金数据", len(self.funds_data))
         except Exception as e:
-            logger.error(f"保存基金数据失败: {e}")
+            logger.error("保存基金数据失败: %s", e)
     
     def search(self, keyword: str, limit: int = 20) -> List[Dict]:
         """搜索基金"""
+        self.load()
         if not keyword:
             return self.funds_data[:limit]
         
@@ -91,21 +118,28 @@ class FundDataManager:
     
     def get_by_code(self, fund_code: str) -> Optional[Dict]:
         """根据基金代码获取基金信息"""
-        for fund in self.funds_data:
-            if fund.get("fund_code") == fund_code:
-                return fund
-        return None
+        self.load()
+        return self._code_index.get(fund_code)
+    
+    def get_fund_type(self, fund_code: str) -> Optional[str]:
+        """获取基金类型（优先使用原始类型，如“货币型-普通货币”、“QDII-普通股票”）"""
+        self.load()
+        fund = self._code_index.get(fund_code)
+        if not fund:
+            return None
+        return fund.get("raw_type") or fund.get("fund_type")
     
     def add_fund(self, fund_code: str, fund_name: str, fund_type: str = "其他"):
         """添加新的基金数据"""
+        self.load()
         # 检查是否已存在
-        for fund in self.funds_data:
-            if fund.get("fund_code") == fund_code:
-                # 更新现有基金
-                fund["fund_name"] = fund_name
-                fund["fund_type"] = fund_type
-                self._save_data()
-                return True
+        fund = self._code_index.get(fund_code)
+        if fund:
+            # 更新现有基金
+            fund["fund_name"] = fund_name
+            fund["fund_type"] = fund_type
+            self._save_data()
+            return True
         
         # 添加新基金
         new_fund = {
@@ -114,6 +148,7 @@ class FundDataManager:
             "fund_type": fund_type
         }
         self.funds_data.append(new_fund)
+        self._code_index[fund_code] = new_fund
         self._save_data()
         return True
     
@@ -0,0 +1,125 @@
+# utils/fund_parsers.py
+"""
+上游响应解析函数
+
+这些函数只接收原始响应字节、返回紧凑的结果（元组/字典），不依赖 Redis、配置等应用状态，
+可以直接在解析进程池（utils/parse_executor.py）中执行，也可以在请求线程内联执行。
+bs4 / lxml 在函数内按需导入，只有实际解析的进程才会加载。
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+# 净值历史行: (净值日期, 单位净值, 日增长率文本, 日增长率数值)
+NavRow = Tuple[str, float, str, Optional[float]]
+
+
+def _decode(content: bytes, encoding: Optional[str]) -> str:
+    return content.decode(encoding or "utf-8", errors="replace")
+
+
+def parse_lof_page(content: bytes, url: str) -> Optional[Dict]:
+    """解析LOF基金页面，返回 {'name', 'value', 'data'}；页面中没有净值数据时返回 None"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+
+    try:
+        # 解析基金名称
+        name_element = soup.find('a', href=url, target="_self")
+        name = name_element.getText() if name_element else "未知基金"
+
+        # 解析基金净值
+        value_element = soup.find_all('dd', {'class': 'dataNums'})[1].find('span')
+        value = value_element.getText() if value_element else "0.00"
+
+        # 解析日期
+        date_element = soup.find('dl', {'class': "dataItem02"}).find('p')
+        date_str = date_element.getText() if date_element else "未知日期"
+    except (IndexError, AttributeError):
+        return None
+
+    return {'name': name, 'value': value, 'data': date_str}
+
+
+def parse_recent_changes(content: bytes, encoding: Optional[str]) -> Optional[str]:
+    """解析 F10DataApi lsjz 响应中的日增长率，返回按时间升序拼接的字符串；无数据时返回 None"""
+    from lxml import etree
+
+    matches = re.findall(r'content:"(.*?)",records:', _decode(content, encoding))
+    if not matches:
+        return None
+
+    html = etree.HTML(matches[0])
+    html_data = html.xpath('//tr/td/text()') if html is not None else []
+
+    # 提取涨跌百分比
+    rise_fall_list = [num for num in html_data if num.endswith('%')]
+    rise_fall_list.reverse()
+    return ' , '.join(rise_fall_list)
+
+
+def parse_nav_history(content: bytes, encoding: Optional[str]) -> Optional[Tuple[List[NavRow], int]]:
+    """
+    解析 F10DataApi lsjz 响应的净值表格
+
+    Returns:
+        (按日期倒序的净值行列表, 解析失败跳过的行数)；响应中没有表格内容时返回 None
+    """
+    from lxml import etree
+
+    match = re.search(r'content:"(.*?)",records:', _decode(content, encoding), re.DOTALL)
+    if not match:
+        return None
+
+    # 清理HTML内容
+    html_content = match.group(1).replace('\\r\\n', '\n').replace('\\t', '\t')
+
+    # 解析HTML表格
+    html = etree.HTML(html_content)
+    rows = html.xpath('//tr') if html is not None else []
+
+    result: List[NavRow] = []
+    skipped = 0
+    for row in rows[1:]:  # 跳过表头行
+        cells = row.xpath('./td')
+        if len(cells) < 4:  # 至少需要前4列数据
+            continue
+
+        try:
+            nav_date = cells[0].xpath('string(.)').strip()
+            unit_nav_str = cells[1].xpath('string(.)').strip()
+            daily_growth = cells[3].xpath('string(.)').strip()
+
+            # 转换单位净值
+            unit_nav = None
+            if unit_nav_str and unit_nav_str != '-':
+                try:
+                    unit_nav = float(unit_nav_str)
+                except ValueError:
+                    pass
+
+            # 提取增长率数值（去掉百分号）
+            daily_growth_value = None
+            if daily_growth and daily_growth != '-':
+                try:
+                    daily_growth_value = float(daily_growth.rstrip('%'))
+                except ValueError:
+                    pass
+
+            # 只添加有净值数据的数据
+            if unit_nav is not None:
+                result.append((nav_date, unit_nav, daily_growth, daily_growth_value))
+        except Exception:
+            skipped += 1
+
+    # 按日期排序（最新的在前面）
+    result.sort(key=lambda x: x[0], reverse=True)
+    return result, skipped
+
+
+def parse_nav_page_count(content: bytes, encoding: Optional[str]) -> Optional[Tuple[int, int]]:
+    """F10DataApi lsjz 响应中的 (总记录数, 总页数)；响应中没有分页信息（限流页、错误页等）时返回 None"""
+    match = re.search(r'records:(\d+),pages:(\d+)', _decode(content, encoding))
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
@@ -0,0 +1,135 @@
+# utils/holdings_io.py
+"""
+持仓导入/导出
+
+支持两种格式:
+    CSV  - 表头包含 fund_code, cost_price, shares（fund_name 可选），也接受中文表头 基金代码/成本价/份额/基金名称
+    JSON - 持仓对象数组，或 {"funds": [...]}（与导出格式一致）
+"""
+import csv
+import io
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.fund_data_manager import fund_data_manager
+
+EXPORT_FIELDS = ("fund_code", "fund_name", "cost_price", "shares")
+
+# 中文表头映射
+HEADER_ALIASES = {
+    "基金代码": "fund_code",
+    "代码": "fund_code",
+    "基金名称": "fund_name",
+    "名称": "fund_name",
+    "成本价": "cost_price",
+    "持仓成本": "cost_price",
+    "份额": "shares",
+    "持仓份额": "shares",
+}
+
+
+class HoldingsFormatError(ValueError):
+    """导入文件无法解析"""
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """根据文件名或 Content-Type 判断导入格式"""
+    name = (filename or "").lower()
+    if name.endswith(".json") or "json" in (content_type or ""):
+        return "json"
+    return "csv"
+
+
+def _read_records(content: bytes, fmt: str) -> List[Tuple[int, Dict]]:
+    """读取导入文件，返回 [(行号, 记录)]：CSV 为文件中的行号（表头为第1行），JSON 为数组中的序号（从1开始）"""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # 国内平台导出的CSV常为GBK编码
+        text = content.decode("gbk", errors="replace")
+
+    if fmt == "json":
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise HoldingsFormatError(f"JSON格式错误: {e}")
+        records = data.get("funds") if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            raise HoldingsFormatError("JSON内容应为持仓数组或 {\"funds\": [...]}")
+        return list(enumerate(records, start=1))
+
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise HoldingsFormatError("CSV文件为空")
+    reader.fieldnames = [HEADER_ALIASES.get(name.strip(), name.strip()) for name in reader.fieldnames]
+    missing = {"fund_code", "cost_price", "shares"} - set(reader.fieldnames)
+    if missing:
+        raise HoldingsFormatError(f"CSV缺少列: {', '.join(sorted(missing))}")
+    # line_num 是读完该记录时所在的文件行（计入表头、空行与跨行的引号字段）
+    return [(reader.line_num, record) for record in reader]
+
+
+def parse_holdings(content: bytes, fmt: str, max_rows: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    解析并校验导入的持仓
+
+    基金代码需存在于基金目录中；基金名称为空时取目录中的名称。同一基金代码出现多次时以最后一行为准。
+
+    Returns:
+        (有效持仓列表, 错误列表 [{"row": 行号, "fund_code": ..., "error": ...}])
+        行号对CSV是文件中的行号（表头为第1行），对JSON是数组中的序号
+    """
+    records = _read_records(content, fmt)
+    if len(records) > max_rows:
+        raise HoldingsFormatError(f"单次最多导入 {max_rows} 条持仓")
+
+    holdings: Dict[str, Dict] = {}
+    errors = []
+    for index, record in records:
+        if not isinstance(record, dict):
+            errors.append({"row": index, "fund_code": None, "error": "不是有效的持仓对象"})
+            continue
+        fund_code = str(record.get("fund_code") or "").strip()
+        try:
+            cost_price = float(record.get("cost_price"))
+            shares = float(record.get("shares"))
+        except (TypeError, ValueError):
+            errors.append({"row": index, "fund_code": fund_code, "error": "成本价或份额不是数字"})
+            continue
+        # float() 接受 nan / inf，NaN 与任何数比较都为假，会绕过下面的范围检查
+        if not (math.isfinite(cost_price) and math.isfinite(shares)):
+            errors.append({"row": index, "fund_code": fund_code, "error": "成本价或份额不是有效数字"})
+            continue
+        if cost_price < 0 or shares <= 0:
+            errors.append({"row": index, "fund_code": fund_code, "error": "成本价不能为负，份额必须大于0"})
+            continue
+
+        fund = fund_data_manager.get_by_code(fund_code)
+        if fund is None:
+            errors.append({"row": index, "fund_code": fund_code, "error": "基金目录中不存在该代码"})
+            continue
+
+        holdings[fund_code] = {
+            "fund_code": fund_code,
+            # JSON 中的名称可能不是字符串（如数字）
+            "fund_name": str(record.get("fund_name") or "").strip() or fund.get("fund_name"),
+            "cost_price": cost_price,
+            "shares": shares,
+        }
+    return list(holdings.values()), errors
+
+
+def export_holdings_csv(funds: Iterable) -> str:
+    """把持仓导出为CSV文本（可直接再次导入）"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_FIELDS)
+    for fund in funds:
+        writer.writerow([getattr(fund, field) for field in EXPORT_FIELDS])
+    return output.getvalue()
+
+
+def export_holdings_json(funds: Iterable) -> Dict:
+    """把持仓导出为JSON结构（可直接再次导入）"""
+    return {"funds": [{field: getattr(fund, field) for field in EXPORT_FIELDS} for fund in funds]}
@@ -0,0 +1,204 @@
+# utils/hot_funds.py
+"""
+热门基金统计（Space-Saving 近似 Top-K，Redis 有序集合，多个工作进程共享）
+
+fund_info / calculate 每次访问基金行情都会记一次访问:
+    - 访问先在进程内累加，后台任务每 HOT_FUNDS_SYNC_SECONDS 秒用一个 Lua 脚本批量合并到 Redis，
+      请求路径上没有额外的 Redis 往返
+    - Redis 中最多跟踪 HOT_FUNDS_CAPACITY 个基金；已满时新基金替换计数最小的基金，
+      并继承其计数（Space-Saving），被替换的计数记为该基金的误差上限
+    - 计数每 HOT_FUNDS_DECAY_SECONDS 秒衰减一次（乘以 HOT_FUNDS_DECAY_FACTOR），热度随时间变化
+
+计数最高的 HOT_FUNDS_SIZE 个基金（且计数不少于 HOT_FUNDS_MIN_HITS）为热门基金，每个进程定期同步一份:
+    - 热门基金的行情可进入进程内 L1 缓存，并使用更长的缓存有效期（HOT_FUNDS_INFO_TTL）
+    - 后台在缓存变旧前主动刷新热门基金的行情（多个工作进程中只有拿到锁的进程执行）
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, Iterable, List
+import logging
+
+from core.config import settings
+from core.database import redis_client, async_redis_client
+
+logger = logging.getLogger(__name__)
+
+HOT_FUNDS_KEY = "hot_funds"  # 有序集合: 基金代码 -> 访问计数
+HOT_FUNDS_ERROR_KEY = "hot_funds_error"  # 哈希: 基金代码 -> 计数误差上限
+HOT_FUNDS_DECAY_KEY = "hot_funds_decay"  # 存在期间不再衰减
+REFRESHER_LOCK_KEY = "hot_funds_refresher_lock"
+
+# KEYS: 计数有序集合, 误差哈希; ARGV[1]: 最多跟踪的基金数; 之后为 基金代码, 访问次数 成对出现
+_RECORD_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+for i = 2, #ARGV, 2 do
+    local code = ARGV[i]
+    local hits = tonumber(ARGV[i + 1])
+    if redis.call('ZSCORE', KEYS[1], code) then
+        redis.call('ZINCRBY', KEYS[1], hits, code)
+    elseif redis.call('ZCARD', KEYS[1]) < capacity then
+        redis.call('ZADD', KEYS[1], hits, code)
+    else
+        local min = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+        redis.call('ZREM', KEYS[1], min[1])
+        redis.call('HDEL', KEYS[2], min[1])
+        redis.call('ZADD', KEYS[1], tonumber(min[2]) + hits, code)
+        redis.call('HSET', KEYS[2], code, min[2])
+    end
+end
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# KEYS: 计数有序集合, 误差哈希; ARGV[1]: 衰减系数
+# 衰减后计数不足 1 的基金不再跟踪
+_DECAY_SCRIPT = """
+local factor = tonumber(ARGV[1])
+redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', factor)
+local dropped = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(1')
+for _, code in ipairs(dropped) do
+    redis.call('ZREM', KEYS[1], code)
+    redis.call('HDEL', KEYS[2], code)
+end
+local errors = redis.call('HGETALL', KEYS[2])
+for i = 1, #errors, 2 do
+    redis.call('HSET', KEYS[2], errors[i], tonumber(errors[i + 1]) * factor)
+end
+return #dropped
+"""
+
+_record_script = redis_client.register_script(_RECORD_SCRIPT)
+_decay_script = redis_client.register_script(_DECAY_SCRIPT)
+
+# 尚未合并到 Redis 的访问次数
+_pending: Counter = Counter()
+_pending_lock = threading.Lock()
+# 本进程的热门基金（定期从 Redis 同步）
+_hot_codes: FrozenSet[str] = frozenset()
+hot_stats = {"synced_at": None, "flushed": 0, "decayed": 0, "refreshed": 0, "refresh_seconds": None}
+
+
+def record_access(fund_codes: Iterable[str]):
+    """记录基金行情访问（只在进程内累加）"""
+    if not settings.HOT_FUNDS_ENABLED:
+        return
+    with _pending_lock:
+        _pending.update(fund_codes)
+
+
+def is_hot(fund_code: str) -> bool:
+    return fund_code in _hot_codes
+
+
+def get_hot_codes() -> FrozenSet[str]:
+    return _hot_codes
+
+
+def flush_accesses():
+    """把进程内累加的访问次数合并到 Redis"""
+    global _pending
+    with _pending_lock:
+        pending, _pending = _pending, Counter()
+    if not pending:
+        return
+    args: List = [settings.HOT_FUNDS_CAPACITY]
+    for code, hits in pending.items():
+        args.extend((code, hits))
+    try:
+        _record_script(keys=[HOT_FUNDS_KEY, HOT_FUNDS_ERROR_KEY], args=args)
+        hot_stats["flushed"] += sum(pending.values())
+    except Exception as e:
+        # 热度统计只是优化，Redis 不可用时丢弃本批访问
+        logger.warning("热门基金访问合并失败: %s", e)
+
+
+def sync_hot_set():
+    """合并本进程的访问、按需衰减，并同步热门基金集合"""
+    global _hot_codes
+    flush_accesses()
+    if redis_client.set(HOT_FUNDS_DECAY_KEY, os.getpid(), nx=True, ex=settings.HOT_FUNDS_DECAY_SECONDS):
+        # 首次设置时计数刚开始累计，不需要衰减
+        if redis_client.exists(HOT_FUNDS_KEY):
+            dropped = _decay_script(keys=[HOT_FUNDS_KEY, HOT_FUNDS_ERROR_KEY], args=[settings.HOT_FUNDS_DECAY_FACTOR])
+            hot_stats["decayed"] += 1
+            logger.info("热门基金计数已衰减，移除 %d 个基金", dropped)
+    codes = redis_client.zrevrangebyscore(
+        HOT_FUNDS_KEY, "+inf", settings.HOT_FUNDS_MIN_HITS, start=0, num=settings.HOT_FUNDS_SIZE
+    )
+    _hot_codes = frozenset(codes)
+    hot_stats["synced_at"] = time.time()
+
+
+def refresh_hot_quotes() -> Dict:
+    """主动刷新缓存已变旧（或已过期）的热门基金行情"""
+    # 在函数内导入，避免与 fund_calculator 循环导入
+    from utils.fund_calculator import FundCalculator
+
+    start = time.perf_counter()
+    codes = sorted(_hot_codes)
+    if not codes:
+        return {"funds": 0, "refreshed": 0, "seconds": 0.0}
+    pipe = redis_client.pipeline(transaction=False)
+    for code in codes:
+        pipe.ttl(f"fund_info:{code}")
+    # 剩余有效期换算为缓存时长；键不存在时 TTL 为负数，同样需要刷新
+    max_ttl = settings.HOT_FUNDS_INFO_TTL - settings.HOT_FUNDS_REFRESH_AFTER_SECONDS
+    stale = [code for code, ttl in zip(codes, pipe.execute()) if ttl < max_ttl]
+    if stale:
+        calculator = FundCalculator()
+        with ThreadPoolExecutor(max_workers=settings.HOT_FUNDS_REFRESH_WORKERS,
+                                thread_name_prefix="hot-refresh") as pool:
+            list(pool.map(calculator.refresh_fund_info, stale))
+    stats = {"funds": len(codes), "refreshed": len(stale), "seconds": round(time.perf_counter() - start, 2)}
+    hot_stats["refreshed"] += len(stale)
+    hot_stats["refresh_seconds"] = stats["seconds"]
+    logger.info("热门基金行情刷新: %s", stats)
+    return stats
+
+
+async def run_maintainer():
+    """后台循环：同步热门基金集合，并（拿到锁时）刷新热门基金行情"""
+    interval = settings.HOT_FUNDS_SYNC_SECONDS
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        try:
+            await loop.run_in_executor(None, sync_hot_set)
+            # 锁的有效期即刷新间隔，多个工作进程合计每 HOT_FUNDS_REFRESH_SECONDS 秒刷新一轮
+            if await async_redis_client.set(REFRESHER_LOCK_KEY, os.getpid(), nx=True,
+                                            ex=max(1, int(settings.HOT_FUNDS_REFRESH_SECONDS))):
+                await loop.run_in_executor(None, refresh_hot_quotes)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("热门基金维护失败: %s", e)
+        await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+
+
+def get_hot_funds(limit: int = 100) -> Dict:
+    """当前跟踪的热门基金（计数为近似值，guaranteed 为扣除误差后的保证下限），用于容量规划"""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrevrange(HOT_FUNDS_KEY, 0, limit - 1, withscores=True)
+    pipe.hgetall(HOT_FUNDS_ERROR_KEY)
+    pipe.zcard(HOT_FUNDS_KEY)
+    ranked, errors, tracked = pipe.execute()
+    funds = []
+    for code, hits in ranked:
+        error = float(errors.get(code, 0))
+        funds.append({
+            "fund_code": code,
+            "hits": round(hits, 2),
+            "error": round(error, 2),
+            "guaranteed": round(hits - error, 2),
+            "hot": code in _hot_codes,
+        })
+    return {
+        "tracked": tracked,
+        "capacity": settings.HOT_FUNDS_CAPACITY,
+        "hot_size": len(_hot_codes),
+        "stats": dict(hot_stats),
+        "funds": funds,
+    }
@@ -0,0 +1,158 @@
+# utils/nav_codec.py
+"""
+净值历史缓存的紧凑编码
+
+原来的缓存值是字典列表的 JSON，每行都重复 date / unit_nav / daily_growth / daily_growth_value 四个键。
+这里按列存储:
+    - 日期转为序数，第一行存原值，之后各行只存与上一行的差（交易日连续时几乎都是 1 或 3）
+    - 单位净值、日增长率按 4 位小数放大为整数（None 用哨兵值表示）
+    - 日增长率文本可由数值还原（"1.23%"）时不存储，无法还原时才单独存一列
+    - 编码后的内容超过 NAV_CACHE_COMPRESS_MIN_BYTES 时再用 zlib 压缩，差分后的列重复很多，压缩率很高
+编码中同时记录数据的日期范围与获取时间，同一基金只用一个缓存键，由读取方判断是否仍然新鲜。
+
+不能无损编码的数据（如日期格式异常、净值超过 4 位小数）退回 JSON（同样带日期范围与获取时间），
+decode 兼容这两种格式以及旧的字典列表 JSON。
+"""
+import json
+import struct
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Union
+
+_MAGIC = b"NV1"
+_FLAG_ZLIB = 1
+_FLAG_GROWTH_TEXT = 2
+# 行数, 首行日期序数, 开始日期序数, 结束日期序数, 获取时间（Unix 秒）
+_HEADER = struct.Struct("<IIIII")
+_SCALE = 10000
+_NONE = -2 ** 31
+_INT32_MAX = 2 ** 31 - 1
+_TEXT_SEPARATOR = "\x1f"
+
+
+@dataclass
+class NavSeries:
+    rows: List[Dict[str, Any]]
+    sdate: Optional[str] = None
+    edate: Optional[str] = None
+    fetched_at: Optional[float] = None  # 旧格式（JSON）没有获取时间
+
+    def is_fresh(self, sdate: str, edate: str, max_age: float) -> bool:
+        """日期范围相同且获取时间未超过 max_age 秒"""
+        return (
+            self.fetched_at is not None
+            and (self.sdate, self.edate) == (sdate, edate)
+            and time.time() - self.fetched_at < max_age
+        )
+
+
+def _scaled(value: Optional[float]) -> int:
+    if value is None:
+        return _NONE
+    scaled = round(value * _SCALE)
+    if abs(scaled) > _INT32_MAX - 1 or scaled / _SCALE != value:
+        raise ValueError(f"无法按 {_SCALE} 倍放大为整数: {value}")
+    return scaled
+
+
+def _unscaled(value: int) -> Optional[float]:
+    return None if value == _NONE else value / _SCALE
+
+
+def _growth_text(value: Optional[float]) -> str:
+    return "" if value is None else f"{value:.2f}%"
+
+
+def _encode_columns(rows: List[Dict[str, Any]], sdate: str, edate: str, fetched_at: float) -> bytes:
+    ordinals = [date.fromisoformat(row["date"]).toordinal() for row in rows]
+    if any(date.fromordinal(ordinal).isoformat() != row["date"] for ordinal, row in zip(ordinals, rows)):
+        raise ValueError("日期不是 YYYY-MM-DD 格式")
+
+    flags = 0
+    deltas = array("i", (prev - cur for prev, cur in zip(ordinals, ordinals[1:])))
+    navs = array("i", (_scaled(row["unit_nav"]) for row in rows))
+    growths = array("i", (_scaled(row["daily_growth_value"]) for row in rows))
+    texts = [row["daily_growth"] for row in rows]
+    body = [
+        _HEADER.pack(len(rows), ordinals[0] if ordinals else 0, date.fromisoformat(sdate).toordinal(),
+                     date.fromisoformat(edate).toordinal(), int(fetched_at)),
+        deltas.tobytes(),
+        navs.tobytes(),
+        growths.tobytes(),
+    ]
+    if any(text != _growth_text(row["daily_growth_value"]) for text, row in zip(texts, rows)):
+        flags |= _FLAG_GROWTH_TEXT
+        body.append(_TEXT_SEPARATOR.join(texts).encode("utf-8"))
+    return bytes([flags]) + b"".join(body)
+
+
+def encode_nav_series(rows: List[Dict[str, Any]], sdate: str, edate: str, compress_min_bytes: int = 0,
+                      fetched_at: Optional[float] = None) -> bytes:
+    """
+    编码净值历史（行结构同 FundCalculator.get_fund_nav_history_simple 的返回值）
+
+    compress_min_bytes: 编码后超过该大小才压缩，小于 0 表示不压缩
+    """
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    try:
+        payload = _encode_columns(rows, sdate, edate, fetched_at)
+    except (KeyError, TypeError, ValueError):
+        return json.dumps({"sdate": sdate, "edate": edate, "fetched_at": fetched_at, "rows": rows},
+                          ensure_ascii=False).encode("utf-8")
+    if 0 <= compress_min_bytes < len(payload):
+        compressed = zlib.compress(payload[1:])
+        if len(compressed) < len(payload) - 1:
+            payload = bytes([payload[0] | _FLAG_ZLIB]) + compressed
+    return _MAGIC + payload
+
+
+def decode_nav_series(value: Union[bytes, str]) -> NavSeries:
+    """解码净值历史缓存，格式无效时抛出 ValueError"""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if not value.startswith(_MAGIC):
+        data = json.loads(value)
+        if isinstance(data, dict) and isinstance(data.get("rows"), list):
+            return NavSeries(data["rows"], data.get("sdate"), data.get("edate"), data.get("fetched_at"))
+        # 旧格式: 字典列表的 JSON
+        if not isinstance(data, list):
+            raise ValueError("净值历史缓存格式无效")
+        return NavSeries(data)
+
+    try:
+        flags = value[len(_MAGIC)]
+        body = value[len(_MAGIC) + 1:]
+        if flags & _FLAG_ZLIB:
+            body = zlib.decompress(body)
+        count, first, sdate, edate, fetched_at = _HEADER.unpack_from(body)
+        offset = _HEADER.size
+        columns = []
+        for length in (max(count - 1, 0), count, count):
+            column = array("i")
+            column.frombytes(body[offset:offset + length * column.itemsize])
+            offset += length * column.itemsize
+            columns.append(column)
+        deltas, navs, growths = columns
+        texts = body[offset:].decode("utf-8").split(_TEXT_SEPARATOR) if flags & _FLAG_GROWTH_TEXT else None
+    except (IndexError, struct.error, zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f"净值历史缓存格式无效: {e}")
+    if len(navs) != count or len(growths) != count or (texts is not None and len(texts) != count):
+        raise ValueError("净值历史缓存内容不完整")
+
+    rows = []
+    ordinal = first
+    for i in range(count):
+        if i:
+            ordinal -= deltas[i - 1]
+        growth = _unscaled(growths[i])
+        rows.append({
+            "date": date.fromordinal(ordinal).isoformat(),
+            "unit_nav": _unscaled(navs[i]),
+            "daily_growth": texts[i] if texts is not None else _growth_text(growth),
+            "daily_growth_value": growth,
+        })
+    return NavSeries(rows, date.fromordinal(sdate).isoformat(), date.fromordinal(edate).isoformat(),
+                     float(fetched_at))
@@ -0,0 +1,121 @@
+# utils/notifier.py
+"""
+提醒通知
+
+提醒引擎只依赖 Notifier.send 接口，通过 ALERT_NOTIFIER 选择实现:
+    local               - 保存在服务端（Redis，所有工作进程共享），通过 /api/alerts/notifications 查看
+    webhook             - 以JSON POST到 ALERT_WEBHOOK_URL（对接企业微信/钉钉机器人或消息服务）
+    package.module:Class - 自定义实现（无参构造，提供 send 方法）
+"""
+import importlib
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+import logging
+
+import requests
+
+from core.config import settings
+from core.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class Notifier(ABC):
+    """通知接口"""
+
+    @abstractmethod
+    def send(self, event: Dict) -> None:
+        """发送一条提醒事件（字段见 schemas.AlertEvent）"""
+
+
+class LocalNotifier(Notifier):
+    """
+    服务端通知：按用户在 Redis 列表中保存最近的提醒，并同步调用本进程订阅的回调
+
+    提醒刷新只在一个工作进程中运行，保存在 Redis 中其他工作进程的 /api/alerts/notifications 才能读到。
+    """
+
+    EVENTS_KEY_PREFIX = "alert_events"
+
+    def __init__(self, max_events_per_user: int = 100, ttl: int = 86400 * 7):
+        self.max_events_per_user = max_events_per_user
+        self.ttl = ttl
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.EVENTS_KEY_PREFIX}:{user_id}"
+
+    def send(self, event: Dict) -> None:
+        key = self._key(event["user_id"])
+        pipe = redis_client.pipeline()
+        pipe.lpush(key, json.dumps(dict(event, triggered_at=event["triggered_at"].isoformat()), ensure_ascii=False))
+        pipe.ltrim(key, 0, self.max_events_per_user - 1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error("提醒回调执行失败: %s", e)
+
+    def subscribe(self, listener: Callable[[Dict], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def recent(self, user_id: int, limit: int = 50) -> List[Dict]:
+        """用户最近的提醒（新的在前）"""
+        return [json.loads(item) for item in redis_client.lrange(self._key(user_id), 0, limit - 1)]
+
+    def clear(self) -> None:
+        keys = list(redis_client.scan_iter(match=f"{self.EVENTS_KEY_PREFIX}:*"))
+        if keys:
+            redis_client.delete(*keys)
+
+
+class WebhookNotifier(Notifier):
+    """以JSON POST提醒事件到 webhook 地址"""
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 5):
+        self.url = url or settings.ALERT_WEBHOOK_URL
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, event: Dict) -> None:
+        payload = dict(event, triggered_at=event["triggered_at"].isoformat())
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+_notifier: Optional[Notifier] = None
+_notifier_lock = threading.Lock()
+
+
+def _create_notifier(name: str) -> Notifier:
+    if name == "local":
+        return LocalNotifier()
+    if name == "webhook":
+        return WebhookNotifier()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_notifier() -> Notifier:
+    """当前配置的通知实现（进程内单例）"""
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = _create_notifier(settings.ALERT_NOTIFIER)
+            logger.info("提醒通知方式: %s", type(_notifier).__name__)
+        return _notifier
+
+
+def set_notifier(notifier: Notifier) -> None:
+    """替换通知实现（测试中注入 LocalNotifier 等）"""
+    global _notifier
+    with _notifier_lock:
+        _notifier = notifier
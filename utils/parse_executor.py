@@ -0,0 +1,113 @@
+# utils/parse_executor.py
+"""
+解析进程池
+
+BeautifulSoup / lxml 解析是CPU密集型操作，在请求线程中执行会持有GIL，与请求处理争抢CPU。
+run_parse 把原始响应字节提交到有界进程池中解析，多核机器上吞吐可以随核数扩展。
+
+以下情况回退为在当前线程内联解析:
+    - PARSE_WORKERS 为 0（关闭进程池）
+    - 响应体很小（进程间传输的开销大于解析本身）
+    - 排队任务数已达上限 PARSE_MAX_PENDING（有界，避免无限堆积）
+    - 进程池异常或超时
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+import logging
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_stats = {"pooled": 0, "inline": 0, "fallback": 0, "pending": 0}
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if settings.PARSE_WORKERS <= 0:
+        return None
+    with _lock:
+        if _executor is None:
+            # spawn 模式避免在多线程进程中 fork
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("启动解析进程池, 进程数: %d", settings.PARSE_WORKERS)
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _release_pending(_future):
+    with _lock:
+        _stats["pending"] -= 1
+
+
+def run_parse(func: Callable, content: bytes, *args):
+    """解析响应内容（优先在进程池中执行，必要时内联执行）"""
+    executor = None
+    if len(content) >= settings.PARSE_INLINE_MAX_BYTES:
+        executor = _get_executor()
+
+    if executor is not None:
+        with _lock:
+            admitted = _stats["pending"] < settings.PARSE_MAX_PENDING
+            if admitted:
+                _stats["pending"] += 1
+        if admitted:
+            future = None
+            try:
+                future = executor.submit(func, content, *args)
+                # 排队名额在进程池任务结束时才释放（包括超时后仍在执行的任务），PARSE_MAX_PENDING 才能真正限制进程池积压
+                future.add_done_callback(_release_pending)
+                try:
+                    result = future.result(timeout=settings.PARSE_TIMEOUT_SECONDS)
+                except FutureTimeoutError:
+                    # 任务还在排队时取消，之后内联解析不会重复解析；已在执行时再等一个超时周期，比内联重新解析更省CPU
+                    if future.cancel():
+                        raise
+                    result = future.result(timeout=settings.PARSE_TIMEOUT_SECONDS)
+                with _lock:
+                    _stats["pooled"] += 1
+                return result
+            except BrokenProcessPool:
+                logger.error("解析进程池异常，重建进程池并内联解析")
+                _reset_executor(executor)
+            except FutureTimeoutError:
+                logger.warning("进程池解析超时，改为内联解析: %s", func.__name__)
+            finally:
+                if future is None:
+                    _release_pending(None)
+        with _lock:
+            _stats["fallback"] += 1
+
+    with _lock:
+        _stats["inline"] += 1
+    return func(content, *args)
+
+
+def get_parse_stats() -> Dict:
+    """解析进程池统计（进程池解析数、内联解析数、回退次数、当前排队数）"""
+    with _lock:
+        return dict(_stats, workers=settings.PARSE_WORKERS)
+
+
+def shutdown_parse_executor():
+    """关闭解析进程池"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,7 +1,38 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import logging
+
 from passlib.context import CryptContext
 
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4)
+def _get_context(rounds: int) -> CryptContext:
+    """
+    创建密码上下文
+
+    最小/最大轮数都固定为当前配置，旧的哈希（轮数不同）在登录验证时会被标记为需要更新，
+    从而在调整 BCRYPT_ROUNDS 后透明地重新哈希。
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
 # 创建密码上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = _get_context(settings.BCRYPT_ROUNDS)
 
 def verify_password(plain_password, hashed_password):
     """验证密码"""
@@ -9,4 +40,108 @@ def verify_password(plain_password, hashed_password):
 
 def get_password_hash(password):
     """生成密码哈希"""
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+# ---- 哈希进程池 ----
+# bcrypt 每次约 250ms 的纯CPU计算，放在 FastAPI 共享线程池中会占满线程，
+# 导致组合计算等请求排队。这里使用独立的有界进程池，并在排队过多时直接拒绝（降载）。
+
+class HashingOverloaded(Exception):
+    """哈希任务排队已满"""
+
+
+def _hash_in_worker(password: str, rounds: int) -> str:
+    return _get_context(rounds).hash(password)
+
+def _verify_and_update_in_worker(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _get_context(rounds).verify_and_update(password, hashed_password)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_stats = {"queued": 0, "completed": 0, "rejected": 0, "total_wait_ms": 0.0}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("启动密码哈希进程池, 进程数: %d", settings.HASH_WORKERS)
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_hashing(func, *args):
+    """提交哈希任务；排队数超过 HASH_MAX_QUEUE 时抛出 HashingOverloaded"""
+    with _lock:
+        if _stats["queued"] >= settings.HASH_MAX_QUEUE:
+            _stats["rejected"] += 1
+            raise HashingOverloaded("密码哈希任务排队已满")
+        _stats["queued"] += 1
+
+    start = time.perf_counter()
+    executor = _get_executor()
+    try:
+        future = executor.submit(func, *args, settings.BCRYPT_ROUNDS)
+        return await asyncio.wrap_future(future)
+    except BrokenProcessPool:
+        # 进程池异常时重建，并在线程中完成本次哈希
+        logger.error("密码哈希进程池异常，重建进程池")
+        _reset_executor(executor)
+        return await asyncio.to_thread(func, *args, settings.BCRYPT_ROUNDS)
+    finally:
+        with _lock:
+            _stats["queued"] -= 1
+            _stats["completed"] += 1
+            _stats["total_wait_ms"] += (time.perf_counter() - start) * 1000
+
+
+async def hash_password_async(password: str) -> str:
+    """在哈希进程池中生成密码哈希"""
+    return await _run_hashing(_hash_in_worker, password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    在哈希进程池中验证密码
+
+    Returns:
+        (是否验证通过, 新哈希)；当存量哈希的轮数与当前配置不同时返回新哈希，调用方应保存
+    """
+    return await _run_hashing(_verify_and_update_in_worker, plain_password, hashed_password)
+
+
+def get_hash_stats() -> Dict:
+    """哈希进程池统计（当前排队数、完成数、拒绝数、平均耗时）"""
+    with _lock:
+        completed = _stats["completed"]
+        return {
+            "workers": settings.HASH_WORKERS,
+            "max_queue": settings.HASH_MAX_QUEUE,
+            "queue_depth": _stats["queued"],
+            "completed": completed,
+            "rejected": _stats["rejected"],
+            "avg_latency_ms": round(_stats["total_wait_ms"] / completed, 2) if completed else None,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        }
+
+
+def shutdown_hash_executor():
+    """关闭哈希进程池"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,55 @@
+# utils/portfolio_view.py
+"""
+组合明细的排序、筛选与分页
+
+汇总数据始终按整个组合计算，这里只决定返回哪些基金明细。
+分页时只对前 page * limit 条做部分排序（heapq.nlargest / nsmallest），代价随页大小而不是持仓数增长；
+净值历史（recent_changes）也只为返回的这一页获取。
+"""
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from utils.fund_data_manager import fund_data_manager
+
+# 排序字段 -> 基金明细中的字段
+SORT_FIELDS = {
+    "change_rate": "change_rate_value",
+    "today_revenue": "today_revenue",
+    "total_revenue": "total_revenue",
+    "profit_loss_ratio": "profit_loss_ratio",
+    "amount": "amount",
+    "cost": "cost",
+}
+FILTERS = ("gainers", "losers")
+
+
+@dataclass
+class PortfolioView:
+    sort: str = "change_rate"
+    order: str = "desc"
+    filter: Optional[str] = None  # gainers: 今日上涨 / losers: 今日下跌
+    fund_type: Optional[str] = None  # 按基金类型筛选（匹配目录中的类型，如“混合”“货币”）
+    page: int = 1
+    limit: Optional[int] = None  # None 表示返回全部
+
+    def _matches(self, detail: Dict) -> bool:
+        if self.filter == "gainers" and detail["change_rate_value"] <= 0:
+            return False
+        if self.filter == "losers" and detail["change_rate_value"] >= 0:
+            return False
+        if self.fund_type and self.fund_type not in (fund_data_manager.get_fund_type(detail["fund_code"]) or ""):
+            return False
+        return True
+
+    def select(self, fund_details: List[Dict]) -> Tuple[List[Dict], int]:
+        """返回 (当前页的明细, 符合筛选条件的总数)"""
+        matched = [detail for detail in fund_details if self._matches(detail)]
+        field = SORT_FIELDS[self.sort]
+        key = lambda detail: detail[field]
+        if self.limit is None:
+            return sorted(matched, key=key, reverse=self.order == "desc"), len(matched)
+
+        end = self.page * self.limit
+        top = heapq.nlargest(end, matched, key=key) if self.order == "desc" else heapq.nsmallest(end, matched, key=key)
+        return top[end - self.limit:], len(matched)
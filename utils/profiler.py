@@ -0,0 +1,201 @@
+# utils/profiler.py
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+import logging
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cprofile", "sample")
+# 同一时间只运行一个 cProfile（Python 3.12 起同时只能有一个剖析器启用），其余请求改用栈采样
+_cprofile_lock = threading.Lock()
+
+
+class _StackSampler(threading.Thread):
+    """后台采样线程：定期抓取目标线程的调用栈，开销远低于cProfile"""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfiler:
+    """
+    单次请求的性能剖析器
+
+    mode:
+        None       - 不做剖析（默认，零开销）
+        "cprofile" - 确定性剖析，保存 .prof（可用 snakeviz / flameprof 查看）
+        "sample"   - 栈采样剖析，保存 .collapsed（flamegraph.pl / speedscope 格式）
+
+    两种模式都只记录进入剖析器的线程，应在同步代码中使用；异步接口把被剖析的部分放到
+    run_in_threadpool 中执行，而不是包住事件循环线程上的 await。
+    """
+
+    def __init__(self, mode: Optional[str] = None, label: str = ""):
+        self.mode = mode if mode in PROFILE_MODES else None
+        self.label = label
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.tags: Dict[str, Any] = {}
+        self.duration_ms = 0.0
+        self._profile = None
+        self._sampler = None
+        self._start = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    @classmethod
+    def for_request(cls, request, user=None, label: str = "") -> "RequestProfiler":
+        """
+        根据请求决定剖析模式：
+        1. 管理员通过 X-Profile 请求头或 ?profile= 参数显式开启
+        2. 否则按 PROFILE_SAMPLE_RATE 每N个请求随机采样1个（低开销的栈采样模式）
+        """
+        from core.dependencies import is_admin
+
+        requested = request.headers.get("X-Profile") or request.query_params.get("profile")
+        if requested and is_admin(user):
+            mode = "cprofile" if requested in ("1", "true", "cprofile") else requested
+            return cls(mode, label)
+
+        rate = settings.PROFILE_SAMPLE_RATE
+        if rate > 0 and random.randrange(rate) == 0:
+            return cls("sample", label)
+        return cls(None, label)
+
+    def __enter__(self):
+        if self.mode == "cprofile":
+            if _cprofile_lock.acquire(blocking=False):
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            else:
+                logger.info("已有请求在运行 cProfile，改用栈采样: %s", self.profile_id)
+                self.mode = "sample"
+        if self.mode == "sample":
+            self._sampler = _StackSampler(
+                threading.get_ident(),
+                settings.PROFILE_SAMPLE_INTERVAL_MS / 1000.0,
+            )
+            self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        if self._profile is not None:
+            self._profile.disable()
+            _cprofile_lock.release()
+        if self._sampler is not None:
+            self._sampler.stop()
+        return False
+
+    def tag(self, **tags):
+        """附加标签（如持仓数量、缓存命中率）"""
+        self.tags.update(tags)
+
+    def save(self) -> Optional[str]:
+        """保存剖析结果到 PROFILE_DIR，返回主文件路径"""
+        if not self.enabled:
+            return None
+        try:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            base = os.path.join(settings.PROFILE_DIR, self.profile_id)
+
+            if self._profile is not None:
+                path = f"{base}.prof"
+                self._profile.dump_stats(path)
+                # 同时保存一份按累计耗时排序的文本摘要
+                stream = io.StringIO()
+                pstats.Stats(self._profile, stream=stream).sort_stats("cumulative").print_stats(40)
+                with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                    f.write(stream.getvalue())
+            else:
+                path = f"{base}.collapsed"
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, count in self._sampler.stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+
+            meta = {
+                "profile_id": self.profile_id,
+                "mode": self.mode,
+                "label": self.label,
+                "created_at": datetime.now().isoformat(),
+                "duration_ms": round(self.duration_ms, 2),
+                "file": os.path.basename(path),
+                "tags": self.tags,
+            }
+            if self._sampler is not None:
+                meta["samples"] = self._sampler.samples
+            with open(f"{base}.json", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            logger.info("保存性能剖析: %s (%s, %.1fms)", self.profile_id, self.mode, self.duration_ms)
+            return path
+        except Exception as e:
+            logger.error("保存性能剖析失败: %s, 错误: %s", self.profile_id, e)
+            return None
+
+
+def list_profiles(limit: int = 50) -> List[Dict]:
+    """列出最近保存的剖析结果"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    metas = []
+    for name in os.listdir(settings.PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(settings.PROFILE_DIR, name), "r", encoding="utf-8") as f:
+                metas.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    metas.sort(key=lambda m: m.get("created_at", ""), reverse=True)
+    return metas[:limit]
+
+
+def get_profile_file(profile_id: str) -> Optional[str]:
+    """根据剖析ID获取结果文件路径"""
+    if not profile_id.isalnum():
+        return None
+    meta_path = os.path.join(settings.PROFILE_DIR, f"{profile_id}.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return os.path.join(settings.PROFILE_DIR, meta["file"])
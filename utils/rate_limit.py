@@ -0,0 +1,111 @@
+# utils/rate_limit.py
+"""
+按用户、按接口的令牌桶限流（Redis，多个工作进程共享）
+
+每个 (接口, 用户) 一个令牌桶: 容量 burst 决定允许的突发请求数，每分钟补充 per_minute 个令牌。
+取令牌在 Lua 脚本中原子完成，时间取 Redis 服务器时间，各进程时钟不一致也不影响。
+
+限流不直接返回错误，由接口决定降级方式（如返回上次的计算结果、只查本地目录）。
+Redis 不可用时放行（限流只是保护措施，不应让接口整体不可用）。
+"""
+from dataclasses import dataclass
+import logging
+
+from fastapi import Depends, Response
+
+import schemas
+from core.config import settings
+from core.database import async_redis_client
+from core.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: 令牌桶键; ARGV: 容量, 每秒补充令牌数, 本次消耗令牌数
+# 返回: {是否放行, 剩余令牌数（字符串）, 需要等待的毫秒数}
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, tostring(tokens), retry_after}
+"""
+
+_token_bucket = async_redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float  # 秒
+
+    def apply_headers(self, response: Response):
+        response.headers["X-RateLimit-Remaining"] = str(self.remaining)
+        if not self.allowed:
+            response.headers["Retry-After"] = str(max(1, round(self.retry_after)))
+
+
+class RateLimiter:
+    """
+    令牌桶限流
+
+    作为依赖使用（对当前用户每次请求消耗一个令牌）:
+        limit: RateLimitResult = Depends(calculate_limiter)
+    或在接口内只对需要限流的分支调用 await limiter.acquire(user_id)。
+    """
+
+    def __init__(self, route: str, burst: int, per_minute: float):
+        self.route = route
+        self.burst = burst
+        self.per_minute = per_minute
+
+    async def acquire(self, user_id: int, cost: int = 1) -> RateLimitResult:
+        if not settings.RATE_LIMIT_ENABLED or self.per_minute <= 0:
+            return RateLimitResult(True, self.burst, 0.0)
+        try:
+            allowed, tokens, retry_after_ms = await _token_bucket(
+                keys=[f"rate:{self.route}:{user_id}"],
+                args=[self.burst, self.per_minute / 60, cost],
+            )
+        except Exception as e:
+            logger.warning("限流检查失败，放行请求: %s, 错误: %s", self.route, e)
+            return RateLimitResult(True, self.burst, 0.0)
+        result = RateLimitResult(bool(allowed), int(float(tokens)), int(retry_after_ms) / 1000)
+        if not result.allowed:
+            logger.info("请求被限流: %s, 用户: %s", self.route, user_id,
+                        extra={"route": self.route, "user_id": user_id})
+        return result
+
+    async def __call__(
+        self,
+        response: Response,
+        current_user: schemas.User = Depends(get_current_user)
+    ) -> RateLimitResult:
+        result = await self.acquire(current_user.id)
+        result.apply_headers(response)
+        return result
+
+
+calculate_limiter = RateLimiter(
+    "calculate", settings.RATE_LIMIT_CALCULATE_BURST, settings.RATE_LIMIT_CALCULATE_PER_MINUTE
+)
+search_api_limiter = RateLimiter(
+    "search_api", settings.RATE_LIMIT_SEARCH_API_BURST, settings.RATE_LIMIT_SEARCH_API_PER_MINUTE
+)
@@ -0,0 +1,88 @@
+# utils/search_cache.py
+"""
+基金搜索结果缓存与行情预取
+
+前端每次输入（防抖后）都会调用搜索接口，热门的前缀和关键字被反复查询:
+    - 结果先查进程内 L1，再查 Redis（所有工作进程共享），都未命中才扫描基金目录或调用第三方接口
+    - 目录通过第三方接口新增基金时清空本进程的 L1；Redis 中的结果最长 SEARCH_CACHE_TTL 秒后更新
+
+用户选中搜索结果后通常会查看行情或添加持仓，因此搜索返回后在后台预取前几个结果的行情，
+后续的 fund_info / calculate 请求可以直接命中缓存。预取是推测性的：并发已满时直接跳过，不排队。
+"""
+import asyncio
+import json
+from typing import Dict, List, Optional
+import logging
+
+from core.config import settings
+from core.database import async_redis_client
+from utils.fund_calculator import FundCalculator
+from utils.local_cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+_l1 = LocalTTLCache(settings.SEARCH_CACHE_L1_SIZE, settings.SEARCH_CACHE_L1_SECONDS)
+_prefetch_limiter: Optional[asyncio.Semaphore] = None
+prefetch_stats = {"scheduled": 0, "skipped_cached": 0, "skipped_busy": 0, "fetched": 0}
+
+
+def _cache_key(q: str, limit: int) -> str:
+    return f"search:{limit}:{q.strip().lower()}"
+
+
+async def get_cached_search(q: str, limit: int) -> Optional[List[Dict]]:
+    key = _cache_key(q, limit)
+    results = _l1.get(key)
+    if results is not None:
+        return results
+    cached = await async_redis_client.get(key)
+    if cached is None:
+        return None
+    results = json.loads(cached)
+    _l1.set(key, results)
+    return results
+
+
+async def set_cached_search(q: str, limit: int, results: List[Dict]):
+    key = _cache_key(q, limit)
+    _l1.set(key, results)
+    await async_redis_client.setex(key, settings.SEARCH_CACHE_TTL, json.dumps(results, ensure_ascii=False))
+
+
+def invalidate_local_search_cache():
+    """基金目录变化后清空本进程的搜索缓存"""
+    _l1.clear()
+
+
+def get_search_cache_stats() -> Dict:
+    return {"l1": _l1.stats(), "prefetch": dict(prefetch_stats)}
+
+
+async def prefetch_quotes(fund_codes: List[str]):
+    """在后台预取搜索结果的行情（已缓存的跳过）"""
+    global _prefetch_limiter
+    if not fund_codes:
+        return
+    if _prefetch_limiter is None:
+        _prefetch_limiter = asyncio.Semaphore(settings.SEARCH_PREFETCH_CONCURRENCY)
+
+    cached = await async_redis_client.mget([f"fund_info:{code}" for code in fund_codes])
+    missing = [code for code, value in zip(fund_codes, cached) if value is None]
+    prefetch_stats["skipped_cached"] += len(fund_codes) - len(missing)
+
+    calculator = FundCalculator()
+
+    async def fetch(code: str):
+        # 推测性请求不排队：预取并发已满时放弃
+        if _prefetch_limiter.locked():
+            prefetch_stats["skipped_busy"] += 1
+            return
+        async with _prefetch_limiter:
+            prefetch_stats["scheduled"] += 1
+            try:
+                if await calculator.get_fund_info_async(code):
+                    prefetch_stats["fetched"] += 1
+            except Exception as e:
+                logger.warning("预取行情失败: %s, 错误: %s", code, e)
+
+    await asyncio.gather(*(fetch(code) for code in missing))
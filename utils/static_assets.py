@@ -0,0 +1,146 @@
+# utils/static_assets.py
+"""
+前端静态资源（frontweb/）
+
+启动时一次性读取 frontweb 目录并在内存中构建:
+    - JS/CSS 等资源按内容哈希重命名（app.js -> app.3f2a1b9c0d.js），以 /static/ 路径提供，
+      Cache-Control 为一年且 immutable，内容变化时文件名随之变化，浏览器不需要再校验
+    - HTML 页面中对这些资源的引用改写为带哈希的路径；页面本身 no-cache + ETag，每次校验、未变化时返回 304
+    - 每个文件预先压缩为 gzip 与 brotli（安装了 brotli 包时）版本，请求时按 Accept-Encoding 直接返回，不在请求中压缩
+"""
+import gzip
+import hashlib
+import importlib.util
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 值得压缩的内容类型
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# 压缩后至少节省的比例，否则只保留原文件
+MIN_COMPRESSION_SAVING = 0.1
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PAGE_CACHE_CONTROL = "no-cache"
+
+
+@dataclass
+class Asset:
+    path: str  # 对外路径，如 /static/app.3f2a1b9c0d.js 或 /index.html
+    media_type: str
+    etag: str
+    cache_control: str
+    # 编码 -> 内容（identity 为原始内容）
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+    def select(self, accept_encoding: str):
+        """按客户端 Accept-Encoding 选择预压缩版本，返回 (编码, 内容)；identity 编码返回 None"""
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.bodies:
+                return encoding, self.bodies[encoding]
+        return None, self.bodies["identity"]
+
+
+def _compress(content: bytes, media_type: str) -> Dict[str, bytes]:
+    bodies = {"identity": content}
+    if not media_type.startswith(COMPRESSIBLE_TYPES):
+        return bodies
+    candidates = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if importlib.util.find_spec("brotli") is not None:
+        import brotli
+
+        candidates["br"] = brotli.compress(content, quality=11)
+    for encoding, compressed in candidates.items():
+        if len(compressed) <= len(content) * (1 - MIN_COMPRESSION_SAVING):
+            bodies[encoding] = compressed
+    return bodies
+
+
+def _media_type(name: str) -> str:
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+def _make_asset(path: str, content: bytes, cache_control: str) -> Asset:
+    media_type = _media_type(path)
+    return Asset(
+        path=path,
+        media_type=media_type,
+        # 各压缩版本共用同一个 ETag，使用弱校验
+        etag=f'W/"{hashlib.sha256(content).hexdigest()[:16]}"',
+        cache_control=cache_control,
+        bodies=_compress(content, media_type),
+    )
+
+
+class FrontendAssets:
+    """frontweb 目录构建后的页面与资源"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.pages: Dict[str, Asset] = {}  # 页面文件名 -> Asset
+        self.assets: Dict[str, Asset] = {}  # 带哈希的资源文件名 -> Asset
+        self.hashed_names: Dict[str, str] = {}  # 原文件名 -> 带哈希的文件名
+
+    def build(self) -> "FrontendAssets":
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if os.path.isfile(os.path.join(self.directory, name)) and not name.startswith(".")
+        )
+
+        for name in names:
+            if name.endswith(".html"):
+                continue
+            with open(os.path.join(self.directory, name), "rb") as f:
+                content = f.read()
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+            self.hashed_names[name] = hashed
+            self.assets[hashed] = _make_asset(f"/static/{hashed}", content, IMMUTABLE_CACHE_CONTROL)
+
+        # 把页面中 src="app.js" / href="app.css" 这类引用改写为带哈希的路径
+        reference = re.compile(r'((?:src|href)=["\'])([^"\'/?#]+)(["\'])')
+
+        def rewrite(match):
+            hashed = self.hashed_names.get(match.group(2))
+            return f"{match.group(1)}/static/{hashed}{match.group(3)}" if hashed else match.group(0)
+
+        for name in names:
+            if not name.endswith(".html"):
+                continue
+            with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                html = reference.sub(rewrite, f.read())
+            self.pages[name] = _make_asset(f"/{name}", html.encode("utf-8"), PAGE_CACHE_CONTROL)
+
+        original = sum(len(a.bodies["identity"]) for a in list(self.assets.values()) + list(self.pages.values()))
+        compressed = sum(min(len(body) for body in a.bodies.values())
+                         for a in list(self.assets.values()) + list(self.pages.values()))
+        logger.info("前端资源构建完成: %d 个页面, %d 个资源, %d -> %d 字节",
+                    len(self.pages), len(self.assets), original, compressed)
+        return self
+
+
+_frontend: Optional[FrontendAssets] = None
+
+
+def build_frontend(directory: str) -> Optional[FrontendAssets]:
+    """构建前端资源（应用启动时调用）；目录不存在时返回 None，应用只提供 API"""
+    global _frontend
+    if not os.path.isdir(directory):
+        logger.warning("前端目录不存在，不提供页面: %s", directory)
+        _frontend = None
+    else:
+        _frontend = FrontendAssets(directory).build()
+    return _frontend
+
+
+def get_frontend() -> Optional[FrontendAssets]:
+    return _frontend
@@ -0,0 +1,476 @@
+# utils/upstream.py
+"""
+上游HTTP访问层
+
+所有对 fundgz / eastmoney 的请求统一经过 upstream_get，支持三种模式（UPSTREAM_MODE）:
+    live   - 直接请求上游（默认）
+    record - 请求上游，并把每个响应（URL、状态码、响应体、耗时）追加写入归档文件
+    replay - 不访问网络，从归档文件回放响应，可按原始耗时或缩放后的耗时模拟延迟
+
+归档文件为追加写入的 gzip 多成员文件，每条记录是一行JSON，可直接用 gzip.open 逐行读取。
+
+每个上游主机有独立的熔断器（closed / open / half_open）和 AIMD 自适应并发限制。
+主机熔断或并发已满时直接抛出 UpstreamUnavailable，不在请求线程里排队或重试，
+调用方应立即返回缓存/过期数据。
+
+每个主机复用一个 requests.Session（keep-alive 连接池），应用退出时由 close_sessions 关闭。
+
+此外每个进程有一个全局并发闸门（UPSTREAM_GLOBAL_CONCURRENCY），限制所有主机合计的在途请求数；
+超出时排队等待，最多等待 UPSTREAM_QUEUE_TIMEOUT_SECONDS 秒后抛出 UpstreamUnavailable。
+"""
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 回放时匹配URL忽略的参数（日期窗口、时间戳），使不同日期录制的数据也能命中
+VOLATILE_PARAMS = {"sdate", "edate", "v", "_"}
+
+
+class UpstreamUnavailable(requests.ConnectionError):
+    """上游主机熔断或并发已满，快速失败"""
+
+
+class CircuitBreaker:
+    """单个主机的熔断器"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        """是否允许发出请求（调用方需持有锁）"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        # 半开状态只放行一个探测请求
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def available(self) -> bool:
+        """只读判断当前是否可能放行请求"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not self.probe_in_flight
+
+    def on_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def on_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 自适应并发限制
+
+    成功且耗时低于目标值时加性增加（每个窗口约 +1），
+    失败或耗时超过目标值时乘性减半。
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target_ms: float):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target_ms = latency_target_ms
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, success: bool, latency_ms: float):
+        self.in_flight -= 1
+        if success and latency_ms <= self.latency_target_ms:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        else:
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+def _create_session() -> requests.Session:
+    """创建带连接池的会话（连接池大小与并发上限一致，重试由调用方控制）"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.UPSTREAM_CONCURRENCY_MAX, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HostGuard:
+    """单个上游主机的熔断器 + 并发限制 + 连接池 + 统计"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.lock = threading.Lock()
+        self.session = _create_session()
+        self.breaker = CircuitBreaker(settings.UPSTREAM_BREAKER_FAILURES, settings.UPSTREAM_BREAKER_RESET_SECONDS)
+        self.limiter = AdaptiveLimiter(
+            settings.UPSTREAM_CONCURRENCY_INITIAL,
+            settings.UPSTREAM_CONCURRENCY_MIN,
+            settings.UPSTREAM_CONCURRENCY_MAX,
+            settings.UPSTREAM_LATENCY_TARGET_MS,
+        )
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+        # 最近成功请求的耗时（用于计算对冲延迟）
+        self.latencies = deque(maxlen=256)
+
+    def acquire(self):
+        with self.lock:
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise UpstreamUnavailable(f"上游已熔断: {self.host}")
+            if not self.limiter.try_acquire():
+                self.rejected += 1
+                # 未实际发出请求，归还半开探测名额
+                self.breaker.probe_in_flight = False
+                raise UpstreamUnavailable(f"上游并发已满: {self.host}")
+            self.requests += 1
+
+    def release(self, success: bool, latency_ms: float):
+        with self.lock:
+            self.limiter.release(success, latency_ms)
+            if success:
+                self.latencies.append(latency_ms)
+                self.breaker.on_success()
+            else:
+                self.failures += 1
+                previous_state = self.breaker.state
+                self.breaker.on_failure()
+                if previous_state != CircuitBreaker.OPEN and self.breaker.state == CircuitBreaker.OPEN:
+                    logger.warning("上游熔断打开: %s, 连续失败 %d 次", self.host, self.breaker.consecutive_failures)
+
+    def available(self) -> bool:
+        with self.lock:
+            return self.breaker.available() and self.limiter.in_flight < int(self.limiter.limit)
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        with self.lock:
+            if len(self.latencies) < 20:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def stats(self) -> Dict:
+        p95 = self.latency_percentile(95)
+        with self.lock:
+            return {
+                "host": self.host,
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.consecutive_failures,
+                "concurrency_limit": round(self.limiter.limit, 2),
+                "in_flight": self.limiter.in_flight,
+                "requests": self.requests,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "p95_ms": round(p95, 2) if p95 is not None else None,
+            }
+
+
+class ConcurrencyGate:
+    """进程内所有上游请求共享的并发上限，记录排队等待的统计"""
+
+    def __init__(self, limit: int, timeout: float):
+        self.limit = limit
+        self.timeout = timeout
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.acquired = 0
+        self.queued = 0  # 需要排队才拿到名额的请求数
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.wait_times = deque(maxlen=256)
+
+    def acquire(self):
+        if self.semaphore.acquire(blocking=False):
+            with self.lock:
+                self.in_flight += 1
+                self.acquired += 1
+            return
+
+        with self.lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        start = time.perf_counter()
+        ok = self.semaphore.acquire(timeout=self.timeout)
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.waiting -= 1
+            if not ok:
+                self.rejected += 1
+            else:
+                self.in_flight += 1
+                self.acquired += 1
+                self.queued += 1
+                self.total_wait_ms += wait_ms
+                self.wait_times.append(wait_ms)
+        if not ok:
+            raise UpstreamUnavailable(f"上游全局并发已满，排队超过 {self.timeout} 秒")
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+        self.semaphore.release()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            ordered = sorted(self.wait_times)
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "acquired": self.acquired,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_ms / self.queued, 2) if self.queued else None,
+                "p95_wait_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2) if ordered else None,
+            }
+
+
+_gate = ConcurrencyGate(settings.UPSTREAM_GLOBAL_CONCURRENCY, settings.UPSTREAM_QUEUE_TIMEOUT_SECONDS)
+
+
+def get_gate_stats() -> Dict:
+    """全局并发闸门的在途数、排队数与等待耗时"""
+    return _gate.stats()
+
+
+_guards: Dict[str, HostGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def _get_guard(url: str) -> HostGuard:
+    host = urlsplit(url).netloc
+    with _guards_lock:
+        guard = _guards.get(host)
+        if guard is None:
+            guard = _guards[host] = HostGuard(host)
+        return guard
+
+
+def is_available(url: str) -> bool:
+    """上游主机当前是否可用（未熔断且并发未满）"""
+    if settings.UPSTREAM_MODE == "replay":
+        return True
+    return _get_guard(url).available()
+
+
+def latency_percentile(url: str, pct: float) -> Optional[float]:
+    """上游主机近期成功请求耗时的百分位（毫秒），样本不足时返回 None"""
+    return _get_guard(url).latency_percentile(pct)
+
+
+def get_upstream_stats() -> List[Dict]:
+    """各上游主机的熔断与并发状态"""
+    with _guards_lock:
+        guards = list(_guards.values())
+    return [guard.stats() for guard in guards]
+
+
+def close_sessions():
+    """关闭各上游主机的连接池"""
+    with _guards_lock:
+        guards = list(_guards.values())
+    for guard in guards:
+        guard.session.close()
+
+
+class UpstreamResponse:
+    """回放响应，接口与 requests.Response 常用部分保持一致"""
+
+    def __init__(self, url: str, status_code: int, content: bytes, elapsed_ms: float, encoding: str = "utf-8"):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.elapsed_ms = elapsed_ms
+        self.encoding = encoding
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def _normalize_url(url: str) -> str:
+    """去掉易变参数后的URL，用作回放的兜底匹配键"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ""))
+
+
+def _strip_host(url: str) -> str:
+    """去掉协议和主机，使录制数据可在不同上游地址（如本地模拟服务）下回放"""
+    parts = urlsplit(_normalize_url(url))
+    return urlunsplit(("", "", parts.path, parts.query, ""))
+
+
+class UpstreamArchive:
+    """上游响应归档（追加写入，按URL索引回放）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, List[Dict]]] = None
+        self._cursor: Dict[str, int] = {}
+
+    def append(self, url: str, status_code: int, content: bytes, elapsed_ms: float, encoding: Optional[str]):
+        record = {
+            "ts": round(time.time(), 3),
+            "url": url,
+            "status": status_code,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "encoding": encoding or "utf-8",
+        }
+        try:
+            record["body"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body"] = base64.b64encode(content).decode("ascii")
+            record["b64"] = True
+
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        # 每条记录单独压缩为一个 gzip 成员，追加写入即可，无需重写文件
+        member = gzip.compress(line)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(member)
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        index: Dict[str, List[Dict]] = {}
+        if not os.path.exists(self.path):
+            logger.warning("回放归档不存在: %s", self.path)
+            return index
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 最后一条记录可能在录制进程退出时被截断
+                    continue
+                for key in (record["url"], _normalize_url(record["url"]), _strip_host(record["url"])):
+                    index.setdefault(key, []).append(record)
+        logger.info("加载回放归档: %s, URL数: %d", self.path, len(index))
+        return index
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """查找URL对应的录制响应；同一URL有多条记录时按录制顺序轮流返回"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load()
+            for key in (url, _normalize_url(url), _strip_host(url)):
+                records = self._index.get(key)
+                if records:
+                    position = self._cursor.get(key, 0)
+                    self._cursor[key] = position + 1
+                    return records[position % len(records)]
+        return None
+
+
+_archive: Optional[UpstreamArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> UpstreamArchive:
+    global _archive
+    with _archive_lock:
+        if _archive is None or _archive.path != settings.UPSTREAM_ARCHIVE:
+            _archive = UpstreamArchive(settings.UPSTREAM_ARCHIVE)
+        return _archive
+
+
+def _replay(url: str) -> UpstreamResponse:
+    record = get_archive().lookup(url)
+    if record is None:
+        raise requests.ConnectionError(f"回放归档中没有该URL的记录: {url}")
+
+    delay = record.get("elapsed_ms", 0) * settings.UPSTREAM_REPLAY_SPEED / 1000.0
+    if delay > 0:
+        time.sleep(delay)
+
+    body = record.get("body", "")
+    content = base64.b64decode(body) if record.get("b64") else body.encode("utf-8")
+    return UpstreamResponse(url, record.get("status", 200), content, record.get("elapsed_ms", 0),
+                            record.get("encoding", "utf-8"))
+
+
+def upstream_get(url: str, headers: Optional[Dict] = None, timeout: float = 10):
+    """请求上游（按 UPSTREAM_MODE 直连、录制或回放）"""
+    mode = settings.UPSTREAM_MODE
+    if mode == "replay":
+        return _replay(url)
+
+    guard = _get_guard(url)
+    _gate.acquire()
+    try:
+        guard.acquire()
+        start = time.perf_counter()
+        success = False
+        try:
+            response = guard.session.get(url, headers=headers, timeout=timeout)
+            # 5xx 和 429 视为上游过载，其余状态码说明主机本身可用
+            success = response.status_code < 500 and response.status_code != 429
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            guard.release(success, elapsed_ms)
+    finally:
+        _gate.release()
+
+    if mode == "record":
+        try:
+            get_archive().append(url, response.status_code, response.content, elapsed_ms, response.encoding)
+        except Exception as e:
+            logger.error("写入上游归档失败: %s, 错误: %s", url, e)
+    return response